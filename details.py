@@ -1,7 +1,9 @@
 import json
 import csv
+import re
 import time
 import os
+import sys
 from multiprocessing import Pool
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -10,6 +12,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+# Shared instrumentation lives with the app in seek/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seek'))
+import metrics
+import tracing
+
+@tracing.traced("scraper.product")
 def scrape_product(item):
     # Set up Selenium with Chrome for each process
     service = Service()
@@ -22,8 +30,9 @@ def scrape_product(item):
     title = item['title']
     print(f"Scraping: {title} (Process {os.getpid()})")
     
-    driver.get(url)
-    time.sleep(3)  # Wait for page to load
+    with tracing.span("scraper.page_load", url=url):
+        driver.get(url)
+        time.sleep(3)  # Wait for page to load
 
     # Initialize data dictionary
     data = {
@@ -43,8 +52,10 @@ def scrape_product(item):
         try:
             price_element = driver.find_element(By.ID, 'askprice_pg-1')
             price_text = price_element.find_element(By.CLASS_NAME, 'price-unit').text
-            price_value = ''.join(filter(str.isdigit, price_text))
-            data['price'] = price_value if price_value else 'N/A'
+            data['price_text'] = price_text
+            # Keep the decimal part; only drop the currency sign and thousands separators
+            price_match = re.search(r'\d[\d,]*(?:\.\d+)?', price_text)
+            data['price'] = price_match.group(0).replace(',', '') if price_match else 'N/A'
             
             try:
                 unit_element = price_element.find_element(By.CLASS_NAME, 'units')
@@ -290,6 +301,8 @@ def scrape_product(item):
     return data
 
 def main():
+    metrics.serve_from_env()
+    
     # Read the links.csv file
     links_data = []
     with open('indiamart_anchor_links.csv', 'r', encoding='utf-8') as f:
@@ -307,9 +320,14 @@ def main():
         chunks[-2].extend(chunks[-1])
         chunks.pop()
 
-    # Create a process pool and scrape in parallel
+    # Create a process pool and scrape in parallel; pages are counted here since workers are separate processes
+    start = time.perf_counter()
+    results = []
     with Pool(processes=num_processes) as pool:
-        results = pool.map(scrape_product, chunks[0] + chunks[1] + chunks[2] + chunks[3])
+        for result in pool.imap(scrape_product, chunks[0] + chunks[1] + chunks[2] + chunks[3]):
+            results.append(result)
+            metrics.SCRAPER_PAGES.inc(scraper="details")
+            metrics.SCRAPER_PAGES_PER_MINUTE.set(len(results) / max(time.perf_counter() - start, 1e-9) * 60, scraper="details")
 
     # Combine results
     all_products = []
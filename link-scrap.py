@@ -5,10 +5,17 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import csv
+import os
+import sys
 import time
 import re
 import pandas as pd
 
+# Shared instrumentation lives with the app in seek/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seek'))
+import metrics
+import tracing
+
 def setup_driver():
     """Set up and return a Chrome WebDriver instance"""
     chrome_options = Options()
@@ -46,6 +53,7 @@ def extract_material_names(csv_file_path):
         print(f"Error reading CSV file: {e}")
         return []
 
+@tracing.traced("scraper.search")
 def search_indiamart(driver, search_query):
     """Search for a material on IndiaMart and extract all anchor links"""
     # Format the search query for URL
@@ -63,6 +71,8 @@ def search_indiamart(driver, search_query):
     
     while True:
         print(f"Scraping page {page_count} for '{search_query}'...")
+        tracing.current_span().set_attribute("pages", page_count)
+        metrics.SCRAPER_PAGES.inc(scraper="search")
         
         # Wait for product cards to load
         try:
@@ -106,6 +116,8 @@ def search_indiamart(driver, search_query):
     return anchor_links
 
 def main():
+    metrics.serve_from_env()
+    
     # Initialize the driver
     driver = setup_driver()
     
@@ -121,6 +133,7 @@ def main():
         
         # Search for each material and collect all anchor links
         all_anchor_links = []
+        start = time.perf_counter()
         
         for i, material in enumerate(all_materials):
             print(f"Processing material {i+1}/{len(all_materials)}")
@@ -134,6 +147,8 @@ def main():
                 links = search_indiamart(driver, material)
                 all_anchor_links.extend(links)
                 print(f"Found {len(links)} links for '{material}'")
+                pages = metrics.SCRAPER_PAGES.value(scraper="search")
+                metrics.SCRAPER_PAGES_PER_MINUTE.set(pages / max(time.perf_counter() - start, 1e-9) * 60, scraper="search")
                 
                 # Add a delay between searches to avoid being blocked
                 time.sleep(2)
@@ -2,11 +2,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from scipy import sparse
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
 import joblib
+from features import TfidfFit, read_chunks
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,27 +26,28 @@ def load_models():
 
 classifier, regressor, label_encoder, det_mapping = load_models()
 
-# Load training data to train preprocessor
+# Preprocessor inputs
+categorical_cols = ['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE']
+numerical_cols = ['SIZE_BUILDINGSIZE', 'NUMFLOORS']
+
+def combined_text(df):
+    return df[categorical_cols].astype(str).agg(' '.join, axis=1)
+
+# Fit the preprocessor by streaming the training CSVs in chunks, so they never have to fit in memory
 @st.cache_resource
 def load_preprocessor():
-    train_c = pd.read_csv("clean_train_c.csv")
-    train_r = pd.read_csv("clean_train_r.csv")
-    # Combine training data for preprocessing
-    categorical_cols = ['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE']
-    numerical_cols = ['SIZE_BUILDINGSIZE', 'NUMFLOORS']
-    # Create a preprocessor
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('cat', TfidfVectorizer(max_features=1000, stop_words='english'), 'combined_text'),
-            ('num', StandardScaler(), numerical_cols)
-        ])
-    # Create combined text feature
-    train_c['combined_text'] = train_c[categorical_cols].astype(str).agg(' '.join, axis=1)
-    train_r['combined_text'] = train_r[categorical_cols].astype(str).agg(' '.join, axis=1)
-    # Fit preprocessor
-    X_train = pd.concat([train_c, train_r])[categorical_cols + numerical_cols + ['combined_text']]
-    preprocessor.fit(X_train)
-    return preprocessor
+    # TF-IDF of the combined categorical text plus standardized numerics
+    text = TfidfFit({'max_features': 1000, 'stop_words': 'english'})
+    scaler = StandardScaler()
+    for path in ("clean_train_c.csv", "clean_train_r.csv"):
+        for chunk in read_chunks(path, usecols=categorical_cols + numerical_cols):
+            text.update(combined_text(chunk))
+            scaler.partial_fit(chunk[numerical_cols])
+    return text.result(), scaler
+
+def preprocess(input_data):
+    tfidf, scaler = preprocessor
+    return sparse.hstack([tfidf.transform(input_data['combined_text']), scaler.transform(input_data[numerical_cols])]).tocsr()
 
 preprocessor = load_preprocessor()
 
@@ -74,23 +73,23 @@ if st.button("Predict"):
             'SIZE_BUILDINGSIZE': [size_buildingsize],
             'NUMFLOORS': [num_floors]
         })
-        input_data['combined_text'] = input_data[['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE']].astype(str).agg(' '.join, axis=1)
+        input_data['combined_text'] = combined_text(input_data)
 
         # Check deterministic mapping (assuming it maps combined_text to MasterItemNo)
-        combined_text = input_data['combined_text'].iloc[0]
-        if combined_text in det_mapping.index:
-            pred_master_item_no = det_mapping[combined_text]
+        text_key = input_data['combined_text'].iloc[0]
+        if text_key in det_mapping.index:
+            pred_master_item_no = det_mapping[text_key]
             class_source = "Deterministic Mapping"
         else:
             # Preprocess input
-            X_input = preprocessor.transform(input_data)
+            X_input = preprocess(input_data)
             # Predict with classifier
             pred_label = classifier.predict(X_input)[0]
             pred_master_item_no = label_encoder.inverse_transform([pred_label])[0]
             class_source = "CatBoost Classifier"
 
         # Regression prediction
-        X_input_reg = preprocessor.transform(input_data)
+        X_input_reg = preprocess(input_data)
         pred_reg = regressor.predict(X_input_reg)[0]
 
         # Display results
@@ -0,0 +1,152 @@
+"""Headless batch planning: price many candidate project specs in one run.
+
+Usage (from the seek/ directory, like the Streamlit app):
+    python batch_plan.py specs.jsonl --out plans.jsonl --workers 8
+    python batch_plan.py specs.csv --llm
+
+Each spec has any of: id, query, mw, built_up_area (sq ft), volume (Rupees) or
+volume_cr, location, facility_type, construction_start (YYYY-MM-DD, default today).
+A free-text `query` is run through the same requirement extraction as the UI;
+structured fields override what it finds.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any
+
+from groqupdate import IndiaMART_RAG, MATERIAL_CATALOG, build_plan_pipeline, load_ml_artifacts
+
+
+def read_specs(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            specs = [dict(row) for row in csv.DictReader(f)]
+        else:
+            specs = [json.loads(line) for line in f if line.strip()]
+    for i, spec in enumerate(specs):
+        spec.setdefault('id', str(i + 1))
+    return specs
+
+
+def _number(value) -> float:
+    if value in (None, ''):
+        return None
+    return float(str(value).replace(',', ''))
+
+
+def spec_to_query(spec: Dict[str, Any]) -> str:
+    if spec.get('query'):
+        return spec['query']
+    parts = []
+    if spec.get('mw'):
+        parts.append(f"{spec['mw']} MegaWatt")
+    if spec.get('built_up_area'):
+        parts.append(f"{_number(spec['built_up_area']):.0f} SquareFoot Built Up Area")
+    if spec.get('facility_type'):
+        parts.append(spec['facility_type'])
+    if spec.get('location'):
+        parts.append(f"Build in {spec['location']}")
+    return ", ".join(parts)
+
+
+def spec_to_requirements(rag: IndiaMART_RAG, spec: Dict[str, Any], query: str) -> Dict[str, Any]:
+    requirements = rag.extract_project_requirements(query)
+    if spec.get('mw'):
+        requirements['power_capacity'] = _number(spec['mw'])
+    if spec.get('built_up_area'):
+        requirements['built_up_area'] = _number(spec['built_up_area'])
+    if spec.get('volume'):
+        requirements['project_volume'] = _number(spec['volume'])
+    elif spec.get('volume_cr'):
+        requirements['project_volume'] = _number(spec['volume_cr']) * 10000000
+    if spec.get('location'):
+        requirements['location'] = spec['location']
+    if spec.get('construction_start'):
+        requirements['construction_start'] = spec['construction_start']
+    if spec.get('facility_type') in MATERIAL_CATALOG:
+        requirements['facility_type'] = spec['facility_type']
+    return requirements
+
+
+def plan_project(rag: IndiaMART_RAG, spec: Dict[str, Any], use_llm: bool, stage_workers: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    query = spec_to_query(spec)
+    requirements = spec_to_requirements(rag, spec, query)
+    material_estimates = rag.estimate_material_requirements(requirements)
+
+    answer_stream = None
+    if use_llm:
+        context = rag.retrieve_context(query)
+        answer_stream = rag.stream_response(query, context['results'], requirements, material_estimates, context['catalog_materials'])
+
+    pipeline = build_plan_pipeline(rag, query, material_estimates, requirements, rag.groq_api_key,
+                                   answer_stream=answer_stream, max_workers=stage_workers, include_llm=use_llm)
+    results = pipeline.run()
+
+    materials = results.get('materials', material_estimates)
+    plan = {
+        'id': spec['id'],
+        'query': query,
+        'requirements': requirements,
+        'materials': materials,
+        'vendors': results.get('vendors'),
+        'answer': results.get('answer'),
+        'timeline': results.get('timeline'),
+        'schedule': results.get('schedule'),
+        'errors': {name: str(e) for name, e in pipeline.errors.items()},
+        'stage_seconds': {name: round(seconds, 4) for name, seconds in pipeline.timings.items()},
+        'seconds': round(time.perf_counter() - start, 4)
+    }
+    return plan
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Generate procurement plans for a batch of project specs")
+    parser.add_argument('specs', help="JSONL or CSV file of project specs")
+    parser.add_argument('--out', default='plans.jsonl', help="JSONL output path")
+    parser.add_argument('--products', default='filtered_products.json', help="Product JSON file to index")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help="Projects planned concurrently")
+    parser.add_argument('--stage-workers', type=int, default=2, help="Concurrent stages within one project")
+    parser.add_argument('--llm', action='store_true', help="Also write each plan's answer and draft its schedule with the LLM "
+                                                          "(without it, schedules come from default lead times; vendors and "
+                                                          "procurement timelines are always computed locally)")
+    args = parser.parse_args(argv)
+
+    specs = read_specs(args.specs)
+    print(f"Loaded {len(specs)} project specs from {args.specs}")
+
+    # One index, one encoder and one set of ML artifacts shared by every worker
+    rag = IndiaMART_RAG(json_file=args.products, require_api_key=args.llm)
+    rag.load_and_process_json_files()
+    rag.build_faiss_index()
+    load_ml_artifacts()
+
+    start = time.perf_counter()
+    done = failed = 0
+    with open(args.out, 'w', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(plan_project, rag, spec, args.llm, args.stage_workers): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                plan = future.result()
+            except Exception as e:
+                plan = {'id': spec['id'], 'error': str(e), 'traceback': traceback.format_exc()}
+                failed += 1
+            done += 1
+            out.write(json.dumps(plan, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            elapsed = time.perf_counter() - start
+            print(f"[{done}/{len(specs)}] project {spec['id']} done ({done / elapsed * 60:.1f} projects/min)", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"Planned {done} projects ({failed} failed) in {elapsed:.1f}s: {done / elapsed * 60 if elapsed else 0:.1f} projects/minute")
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Memory, latency and recall of the product index storage options.
+
+Every configuration is built over the same product embeddings and compared with the
+previous storage (raw fp32 vectors in one IndexFlatL2): recall@k is the share of the
+IndexFlatL2 top-k that each configuration also returns.
+
+Usage (from the seek/ directory):
+    python bench_index.py --products ../json
+    python bench_index.py --products filtered_products.json --k 10 --json index_report.json
+"""
+import argparse
+import json
+import time
+from typing import Dict, Any, List, Tuple
+
+import faiss
+import numpy as np
+
+from shards import ShardedIndex
+
+# (name, compression, pca_dims)
+CONFIGS = [
+    ('ip-fp32', 'fp32', None),
+    ('ip-fp16', 'fp16', None),
+    ('ip-sq8', 'sq8', None),
+    ('ip-pca192-fp16', 'fp16', 192),
+    ('ip-pca128-sq8', 'sq8', 128),
+]
+
+
+def time_search(search, queries: np.ndarray, k: int, repeats: int) -> Tuple[float, np.ndarray]:
+    """Median milliseconds per query (one query at a time) and the ids of the last run"""
+    timings, ids = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        ids = np.vstack([search(queries[i:i + 1], k)[1] for i in range(len(queries))])
+        timings.append((time.perf_counter() - start) / len(queries) * 1000)
+    return float(np.median(timings)), ids
+
+
+def recall(ids: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(ids, truth))
+    return hits / truth.size
+
+
+def report(metadata: List[Dict[str, Any]], embeddings: np.ndarray, queries: np.ndarray, k: int, repeats: int) -> List[Dict[str, Any]]:
+    baseline = faiss.IndexFlatL2(embeddings.shape[1])
+    baseline.add(embeddings)
+    baseline_ms, truth = time_search(baseline.search, queries, k, repeats)
+    rows = [{
+        'config': 'l2-fp32 (previous)',
+        'bytes_per_doc': len(faiss.serialize_index(baseline)) / len(embeddings),
+        'ms_per_query': baseline_ms,
+        'recall_at_k': 1.0
+    }]
+    for name, compression, pca_dims in CONFIGS:
+        start = time.perf_counter()
+        index = ShardedIndex.build(metadata, embeddings, compression=compression, pca_dims=pca_dims)
+        build_s = time.perf_counter() - start
+        ms, ids = time_search(index.search, queries, k, repeats)
+        rows.append({
+            'config': name,
+            'bytes_per_doc': index.memory_bytes() / len(embeddings),
+            'ms_per_query': ms,
+            'recall_at_k': recall(ids, truth),
+            'build_s': build_s,
+            'shards': len(index)
+        })
+    for row in rows:
+        row['mb_per_million_docs'] = row['bytes_per_doc'] * 1e6 / 2 ** 20
+    return rows
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Compare product index compression settings")
+    parser.add_argument('--products', default='filtered_products.json', help="Product JSON file or directory to index")
+    parser.add_argument('--queries', type=int, default=200, help="Catalog materials used as queries")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    from groqupdate import IndiaMART_RAG, MATERIAL_CATALOG
+    from material_matches import catalog_material_names
+    rag = IndiaMART_RAG(json_file=args.products, require_api_key=False)
+    rag.load_and_process_json_files()
+    embeddings = np.asarray(rag.embedding_model.encode(rag.documents), dtype='float32')
+    queries = np.asarray(rag.embedding_model.encode(catalog_material_names(MATERIAL_CATALOG)[:args.queries]), dtype='float32')
+
+    rows = report(rag.metadata, embeddings, queries, args.k, args.repeats)
+    print(f"{len(embeddings)} products, {len(queries)} queries, recall@{args.k} against the previous IndexFlatL2")
+    print(f"{'config':<20} {'MB/1M docs':>11} {'ms/query':>9} {'recall':>7}")
+    for row in rows:
+        print(f"{row['config']:<20} {row['mb_per_million_docs']:>11.0f} {row['ms_per_query']:>9.3f} {row['recall_at_k']:>7.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'products': len(embeddings), 'queries': len(queries), 'k': args.k, 'results': rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Check the intent parser against intent_golden.jsonl and time it against the old regex chain.
+
+Usage (from the seek/ directory):
+    python bench_intent.py
+    python bench_intent.py --iterations 20000 --k 10
+
+Exits non-zero if any golden query parses differently from what is expected.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Dict, Any, List
+
+from gazetteer import Gazetteer
+from intent import IntentParser, QueryIntent
+
+
+def legacy_parse(catalog: Dict[str, Any], query: str, k: int) -> Dict[str, Any]:
+    """The pre-parser behaviour: requirement regexes, a catalog scan, then the filter substring tests once per result"""
+    query_lower = query.lower()
+    facility_type = next((f for f in catalog if f.lower().replace(' ', '') in query_lower), "Workspace")
+    requirements = {"facility_type": facility_type}
+    power_match = re.search(r'(\d+)\s*Mega?Watt', query, re.IGNORECASE)
+    requirements["power_capacity"] = float(power_match.group(1)) if power_match else None
+    area_match = re.search(r'(\d+)\s*Lacs?\s*SquareFoot', query, re.IGNORECASE)
+    requirements["built_up_area"] = float(area_match.group(1)) * 100000 if area_match else None
+    volume_match = re.search(r'(\d+)\s*Cr\s*(in\s*Rupees)?', query, re.IGNORECASE)
+    requirements["project_volume"] = float(volume_match.group(1)) * 10000000 if volume_match else None
+    location_match = re.search(r'in\s+([\w\s]+)$', query, re.IGNORECASE)
+    requirements["location"] = location_match.group(1).strip() if location_match else None
+    for _ in range(k):
+        if "in " in query.lower() or "navi mumbai" in query.lower():
+            re.search(r'in\s+([\w\s]+)$', query.lower().replace('in stock', ''))
+        "gst after 2017" in query.lower()
+        "high rating" in query.lower() or "rating" in query.lower()
+        "available in stock" in query.lower() or "in stock" in query.lower()
+        "fire retardant" in query.lower() or "fireproof" in query.lower()
+    return requirements
+
+
+def check(parser: IntentParser, intent: QueryIntent, expected: Dict[str, Any]) -> List[str]:
+    problems = []
+    for key, want in expected.items():
+        if key == 'location_kind':
+            got = next(iter(intent.location_filter), None) if intent.location_filter else None
+        elif key == 'radius_includes':
+            ids = (intent.location_filter or {}).get('city_ids', set())
+            got = sorted(name for name in want if parser.gazetteer.city_ids.get(name) in ids)
+            want = sorted(want)
+        else:
+            got = getattr(intent, key)
+        if isinstance(want, float) and isinstance(got, float):
+            ok = abs(got - want) <= max(1.0, abs(want) * 1e-6)
+        else:
+            ok = got == want
+        if not ok:
+            problems.append(f"{key}: expected {want!r}, got {got!r}")
+    return problems
+
+
+def time_calls(func, queries: List[str], iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(queries[i % len(queries)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Golden check and microbenchmark for the query-intent parser")
+    parser.add_argument('--golden', default='intent_golden.jsonl')
+    parser.add_argument('--catalog', default='data.json')
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('--k', type=int, default=10, help="Results the old filter re-scanned the query for")
+    args = parser.parse_args(argv)
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    with open(args.golden, 'r', encoding='utf-8') as f:
+        golden = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    intent_parser = IntentParser(catalog, Gazetteer.build())
+    print(f"Compiled parser in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    failures = 0
+    for case in golden:
+        problems = check(intent_parser, intent_parser.parse(case['query']), case['expected'])
+        if problems:
+            failures += 1
+            print(f"FAIL {case['query']!r}")
+            for problem in problems:
+                print(f"     {problem}")
+    print(f"Golden: {len(golden) - failures}/{len(golden)} passed")
+
+    queries = [case['query'] for case in golden]
+    parser_us = time_calls(intent_parser.parse, queries, args.iterations)
+    legacy_us = time_calls(lambda q: legacy_parse(catalog, q, args.k), queries, args.iterations)
+    print(f"Intent parser: {parser_us:.1f} us/query ({legacy_us / parser_us:.2f}x the legacy chain's throughput)")
+    print(f"Legacy regex + substring chain (k={args.k}): {legacy_us:.1f} us/query")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Cold-start benchmark for the Streamlit app: import time, first render and first query.
+
+Every measurement runs in a fresh interpreter so module caches do not carry over:
+
+    import          `import groqupdate`, with the slowest modules from -X importtime
+                    and which heavy libraries (torch, faiss, sklearn, ...) it pulled in
+    first_render    one Streamlit script run of groqupdate.py (streamlit.testing AppTest),
+                    i.e. what a user waits for before the page appears
+    first_query     process start -> warm-up finished -> first rag.query() answered,
+                    with the LLM replaced by benchmark.StubLLM
+
+Usage (from the seek/ directory):
+    python bench_startup.py --runs 3 --out bench/startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+HEAVY_MODULES = ['torch', 'sentence_transformers', 'faiss', 'sklearn', 'scipy', 'pandas', 'matplotlib', 'joblib', 'lightgbm', 'xgboost']
+FIRST_QUERY = "25 MegaWatt, 2 Lacs SquareFoot Built Up Area, Project Volume of 1875 Cr in Rupees, Build in Navi Mumbai Area"
+
+
+def child_import() -> Dict[str, Any]:
+    start = time.perf_counter()
+    import groqupdate  # noqa: F401
+    return {
+        'seconds': time.perf_counter() - start,
+        'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+
+def child_first_render() -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    app = AppTest.from_file('groqupdate.py', default_timeout=300)
+    app.run()
+    return {
+        'seconds': time.perf_counter() - start,
+        'exceptions': [str(e.value) for e in app.exception],
+        'title': [t.value for t in app.title]
+    }
+
+
+def child_first_query(products: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    import groqupdate
+    from benchmark import StubLLM
+    imported = time.perf_counter()
+    if products:
+        groqupdate.PRODUCTS_FILE = products
+    warmup = groqupdate.Warmup()
+    snapshots = warmup.wait()
+    warm = time.perf_counter()
+    llm = StubLLM()
+    with snapshots.acquire() as rag:
+        rag._call_groq_api = llm.complete
+        rag._stream_groq_api = llm.stream
+        rag.query(FIRST_QUERY)
+    done = time.perf_counter()
+    return {
+        'seconds': done - start,
+        'import_s': imported - start,
+        'warmup_s': warm - imported,
+        'warmup_steps_s': warmup.seconds,
+        'query_s': done - warm
+    }
+
+
+def slowest_imports(limit: int) -> List[Dict[str, Any]]:
+    """Top modules by cumulative import time, parsed from python -X importtime"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import groqupdate'], capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append({'module': module.strip(), 'cumulative_ms': int(cumulative) / 1000})
+    return sorted(rows, key=lambda r: r['cumulative_ms'], reverse=True)[:limit]
+
+
+def run_child(mode: str, products: str) -> Dict[str, Any]:
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode]
+    if products:
+        command += ['--products', products]
+    proc = subprocess.run(command, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Cold-start timings of the Streamlit app")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters per measurement")
+    parser.add_argument('--products', help="Product JSON to index for first_query (default: groqupdate.PRODUCTS_FILE)")
+    parser.add_argument('--skip', action='append', default=[], choices=['import', 'first_render', 'first_query'])
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--out', help="JSON results path")
+    parser.add_argument('--child', choices=['import', 'first_render', 'first_query'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        if args.child == 'import':
+            result = child_import()
+        elif args.child == 'first_render':
+            result = child_first_render()
+        else:
+            result = child_first_query(args.products)
+        print(json.dumps(result, default=str))
+        return
+
+    results: Dict[str, Any] = {}
+    for mode in ('import', 'first_render', 'first_query'):
+        if mode in args.skip:
+            continue
+        runs = [run_child(mode, args.products) for _ in range(args.runs)]
+        seconds = sorted(r['seconds'] for r in runs if 'seconds' in r)
+        results[mode] = {
+            'median_s': round(seconds[len(seconds) // 2], 3) if seconds else None,
+            'min_s': round(seconds[0], 3) if seconds else None,
+            'runs': runs
+        }
+        status = f"{results[mode]['median_s']:.3f}s median of {len(seconds)}" if seconds else f"failed: {runs[0].get('error')}"
+        print(f"{mode:<14} {status}")
+    if 'import' in results:
+        loaded = results['import']['runs'][0].get('heavy_modules_loaded')
+        if loaded:
+            print(f"  heavy modules imported eagerly: {', '.join(loaded)}")
+        results['slowest_imports'] = slowest_imports(args.top)
+        for row in results['slowest_imports']:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+    if args.out:
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Offline end-to-end benchmark of the RAG and ML pipeline.
+
+Times ingest, index build, single and batched search, filter_by_criteria,
+extract_project_requirements, run_ml_prediction and the full query() on fixed
+fixtures: the product files under json/, the queries in intent_golden.jsonl and the
+first rows of clean_test_full.csv. The LLM is replaced by a deterministic local stub,
+so no API key or network is needed and runs are comparable across commits.
+
+Usage (from the seek/ directory):
+    python benchmark.py --out bench/$(git rev-parse --short HEAD).json
+    python benchmark.py --compare bench/baseline.json
+
+Each stage reports calls, throughput, mean and p50/p95/p99 latency and the process
+peak RSS after the stage; --compare prints the p50 change against an earlier result.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterator, List
+
+import numpy as np
+
+PRODUCTS = os.path.join('..', 'json')
+QUERIES_FILE = 'intent_golden.jsonl'
+ML_FIXTURE = 'clean_test_full.csv'
+FILTER_CRITERIA = "high rating GST after 2017 available in stock in Navi Mumbai"
+
+
+class StubLLM:
+    """Deterministic stand-in for the Groq API: a fixed-shape answer derived from the prompt"""
+
+    def __init__(self, words: int = 200):
+        self.words = words
+        self.calls = 0
+
+    def complete(self, prompt: str, max_tokens: int = 4096) -> str:
+        self.calls += 1
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+        return " ".join(f"token{digest[i % len(digest)]}{i}" for i in range(min(self.words, max_tokens)))
+
+    def stream(self, prompt: str, max_tokens: int = 4096) -> Iterator[str]:
+        for word in self.complete(prompt, max_tokens).split(" "):
+            yield word + " "
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(timings: List[float], items_per_call: int = 1) -> Dict[str, Any]:
+    seconds = np.array(timings)
+    ms = seconds * 1000
+    return {
+        'calls': len(timings),
+        'items_per_call': items_per_call,
+        'throughput_per_s': round(len(timings) * items_per_call / seconds.sum(), 2) if seconds.sum() else None,
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def measure(func: Callable[[Any], Any], inputs: List[Any], repeats: int, warmup: int = 2, items_per_call: int = 1) -> Dict[str, Any]:
+    for item in inputs[:warmup]:
+        func(item)
+    timings = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            timings.append(time.perf_counter() - start)
+    return summarize(timings, items_per_call)
+
+
+def uncached(rag, func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """func with rag's query embedding cache emptied before each call"""
+    def call(item):
+        with rag._cache_lock:
+            rag._query_embeddings.clear()
+        return func(item)
+    return call
+
+
+def load_queries(path: str = QUERIES_FILE) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['query'] for line in f if line.strip()]
+
+
+def load_ml_rows(path: str = ML_FIXTURE, limit: int = 200) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = []
+        for row in csv.DictReader(f):
+            rows.append(row)
+            if len(rows) == limit:
+                break
+    return rows
+
+
+def run(products: str, repeats: int, batch_size: int, ml_rows: int, k: int) -> Dict[str, Any]:
+    from groqupdate import IndiaMART_RAG, load_ml_artifacts, run_ml_prediction
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    llm = StubLLM()
+
+    start = time.perf_counter()
+    rag = IndiaMART_RAG(json_file=products, require_api_key=False)
+    rag._call_groq_api = llm.complete
+    rag._stream_groq_api = llm.stream
+    rag.load_and_process_json_files()
+    stages['ingest'] = summarize([time.perf_counter() - start], len(rag.documents))
+
+    start = time.perf_counter()
+    rag.build_faiss_index()
+    stages['index_build'] = summarize([time.perf_counter() - start], len(rag.documents))
+
+    queries = load_queries()
+    stages['extract_project_requirements'] = measure(rag.extract_project_requirements, queries, repeats * 10)
+    # Empty the query embedding cache before every call, so warmup and repeats pay the encode cost too
+    stages['search'] = measure(uncached(rag, lambda q: rag.search(q, k=k)), queries, repeats)
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    stages['search_batch'] = measure(uncached(rag, lambda batch: rag.search_batch(batch, k=k)), batches, repeats,
+                                     items_per_call=batch_size)
+    candidates = rag.search(FILTER_CRITERIA, k=max(k * 10, 50))
+    stages['filter_by_criteria'] = measure(lambda q: rag.filter_by_criteria(candidates, q), [FILTER_CRITERIA] + queries, repeats * 10)
+
+    rows = load_ml_rows(limit=ml_rows)
+    load_ml_artifacts()
+    stages['run_ml_prediction'] = measure(run_ml_prediction, rows, 1)
+
+    stages['query'] = measure(lambda q: rag.query(q, k=k), queries, repeats)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'fixtures': {'products': products, 'documents': len(rag.documents), 'queries': len(queries), 'ml_rows': len(rows)},
+        'params': {'repeats': repeats, 'batch_size': batch_size, 'k': k},
+        'llm_stub_calls': llm.calls,
+        'stages': stages
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]):
+    print(f"\nAgainst {baseline.get('commit', '?')[:10]} ({baseline.get('timestamp', '?')}):")
+    for stage, stats in result['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or not previous.get('p50_ms'):
+            print(f"  {stage:<30} new")
+            continue
+        change = (stats['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+        print(f"  {stage:<30} p50 {previous['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f} ms ({change:+.1f}%)")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of ingest, search, filtering, ML prediction and query()")
+    parser.add_argument('--products', default=PRODUCTS, help="Product JSON file or directory to index")
+    parser.add_argument('--repeats', type=int, default=3, help="Passes over each stage's fixture inputs")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--ml-rows', type=int, default=200, help="Rows of clean_test_full.csv to predict")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--out', default='benchmark_results.json', help="JSON results path")
+    parser.add_argument('--compare', help="Earlier results file to compare p50 latencies against")
+    args = parser.parse_args(argv)
+
+    result = run(args.products, args.repeats, args.batch_size, args.ml_rows, args.k)
+
+    print(f"{'stage':<30} {'calls':>6} {'per s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'RSS MB':>8}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<30} {stats['calls']:>6} {stats['throughput_per_s'] or 0:>10.1f} {stats['p50_ms']:>10.3f} "
+              f"{stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['peak_rss_mb']:>8.1f}")
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
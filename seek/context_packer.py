@@ -0,0 +1,159 @@
+import re
+from typing import List, Dict, Any, Callable, Tuple
+from vendors import vendor_key, overall_rating
+
+# Lower number = packed first. Price/availability/GST/rating are what planners
+# compare vendors on, so they go in before long free-text fields.
+FIELD_PRIORITIES = {
+    'title': 0,
+    'price': 1,
+    'availability': 1,
+    'gst': 2,
+    'gst_registration_date': 2,
+    'rating': 2,
+    'vendor': 3,
+    'address': 3,
+    'url': 3,
+    'brand': 4,
+    'model': 4,
+    'capacity': 4,
+    'usage/application': 5,
+    'warranty': 5,
+    'contact_person': 6,
+    'website': 7,
+    'company_description': 9,
+}
+
+DETAIL_KEYS = ['usage/application', 'brand', 'availability', 'model', 'capacity', 'warranty']
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used when no tokenizer is available"""
+    return len(_WORD_PATTERN.findall(text))
+
+
+def make_token_counter(tokenizer=None) -> Callable[[str], int]:
+    """Wrap a local (HuggingFace-style) tokenizer into a text -> token count function"""
+    if tokenizer is None:
+        return estimate_tokens
+
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count
+
+
+def document_fields(metadata: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Return (field, line) pairs for one product, in display order"""
+    fields = []
+    fields.append(('title', f"Title: {metadata.get('title', 'N/A')}"))
+
+    price = metadata.get('price', '')
+    if price:
+        fields.append(('price', f"Price: {price} {metadata.get('price_unit', '')}".strip()))
+
+    details = metadata.get('details', {})
+    if details and isinstance(details, dict):
+        for key in DETAIL_KEYS:
+            value = str(details.get(key, '') or '').strip()
+            if value and value != '-':
+                fields.append((key, f"{key.replace('/', ' ').title()}: {value}"))
+
+    company_info = metadata.get('company_info', {}) or {}
+    seller_info = metadata.get('seller_info', {}) or {}
+    gst = company_info.get('gst') or seller_info.get('gst_number')
+    if gst and gst != 'N/A':
+        fields.append(('gst', f"GST: {gst}"))
+    if company_info.get('gst_registration_date'):
+        fields.append(('gst_registration_date', f"GST Registration Date: {company_info['gst_registration_date']}"))
+
+    rating = overall_rating(metadata)
+    if rating is not None:
+        fields.append(('rating', f"Rating: {rating}"))
+
+    seller_name = seller_info.get('seller_name')
+    if seller_name and seller_name != 'N/A':
+        fields.append(('vendor', f"Vendor: {seller_name}"))
+    if seller_info.get('full_address') and seller_info['full_address'] != 'N/A':
+        fields.append(('address', f"Address: {seller_info['full_address']}"))
+    if seller_info.get('contact_person') and seller_info['contact_person'] != 'N/A':
+        fields.append(('contact_person', f"Contact Person: {seller_info['contact_person']}"))
+    if seller_info.get('website') and seller_info['website'] != 'N/A':
+        fields.append(('website', f"Website: {seller_info['website']}"))
+    if metadata.get('url'):
+        fields.append(('url', f"URL: {metadata['url']}"))
+    if company_info.get('description') and company_info['description'] != 'N/A':
+        fields.append(('company_description', f"Company Description: {company_info['description']}"))
+
+    return fields
+
+
+class ContextPacker:
+    """Greedily packs retrieved products into a token budget by relevance and field priority"""
+
+    def __init__(self, count_tokens: Callable[[str], int] = estimate_tokens, max_docs: int = 8):
+        self.count_tokens = count_tokens
+        self.max_docs = max_docs
+
+    def dedupe_vendors(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seen = set()
+        unique = []
+        for result in results:
+            key = vendor_key(result['metadata'])
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(result)
+        return unique
+
+    def pack(self, results: List[Dict[str, Any]], budget: int) -> str:
+        """Build the context text for the most relevant products that fit in `budget` tokens"""
+        ranked = sorted(results, key=lambda r: r.get('distance', 0.0))
+        ranked = self.dedupe_vendors(ranked)[:self.max_docs]
+
+        candidates = []
+        for rank, result in enumerate(ranked):
+            for order, (field, line) in enumerate(document_fields(result['metadata'])):
+                priority = FIELD_PRIORITIES.get(field, 8)
+                candidates.append((priority, rank, order, line))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+
+        header_cost = self.count_tokens("Document 10:\n\n")
+        used = 0
+        chosen: Dict[int, List[Tuple[int, str]]] = {}
+        for priority, rank, order, line in candidates:
+            cost = self.count_tokens(line) + 1
+            if rank not in chosen:
+                # A document is only worth opening if its title fits too
+                if priority > 0:
+                    continue
+                cost += header_cost
+            if used + cost > budget:
+                continue
+            used += cost
+            chosen.setdefault(rank, []).append((order, line))
+
+        blocks = []
+        for i, rank in enumerate(sorted(chosen)):
+            lines = [line for _, line in sorted(chosen[rank])]
+            blocks.append(f"Document {i+1}:\n" + "\n".join(lines))
+        return "\n\n".join(blocks) + ("\n\n" if blocks else "")
+
+
+def pack_list(title: str, items: List[str], count_tokens: Callable[[str], int], budget: int) -> str:
+    """Pack a bulleted section, dropping trailing items that do not fit"""
+    if not items:
+        return ""
+    text = f"{title}:\n"
+    used = count_tokens(text)
+    for item in items:
+        line = f"- {item}\n"
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        text += line
+        used += cost
+    return text + "\n"
+
@@ -0,0 +1,254 @@
+"""Material estimation calibrated on the invoice history in clean_train_full.csv.
+
+The coefficient table holds, for every facility type and catalog material in data.json,
+the P25/P50/P75 quantity and spend per square foot, per MW and per Rupee of project
+estimate, measured across historical projects. Estimating a project is then a table
+lookup multiplied by the project's drivers. Materials no invoice item maps to, or seen on
+fewer than MIN_PROJECTS projects, are marked uncalibrated and left out of estimates.
+
+Rebuild the table after the invoices or the catalog change (from the seek/ directory):
+    python estimation.py --invoices clean_train_full.csv --catalog data.json
+"""
+import argparse
+import json
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from gazetteer import normalize_text
+
+COEFFICIENTS_CSV = 'material_coefficients.csv'
+
+# Estimation driver -> invoice column holding the project's value for it
+DRIVERS = {'mw': 'MW', 'sqft': 'SIZE_BUILDINGSIZE', 'rupee': 'REVISED_ESTIMATE'}
+# Requirement key supplying each driver, in the order drivers are tried
+DRIVER_REQUIREMENTS = [('mw', 'power_capacity'), ('sqft', 'built_up_area'), ('rupee', 'project_volume')]
+DRIVER_LABELS = {'mw': 'per MW', 'sqft': 'per sq ft', 'rupee': 'per Rupee of project volume'}
+QUANTILES = {'p25': 0.25, 'p50': 0.5, 'p75': 0.75}
+
+# Facility types with fewer projects than this are calibrated on every facility type, and quantiles
+# measured on fewer projects are left blank so the next driver (or none) sizes the material
+MIN_PROJECTS = 5
+
+UOM_ALIASES = {
+    'pc': 'EA', 'pcs': 'EA', 'piece': 'EA', 'pieces': 'EA', 'ea': 'EA', 'each': 'EA', 'nos': 'EA', 'no': 'EA',
+    'bx': 'BX', 'box': 'BX', 'ct': 'CT', 'carton': 'CT', 'bg': 'BG', 'bag': 'BG',
+    'ft': 'FT', 'lf': 'FT', 'sf': 'SF', 'sqft': 'SF', 'rl': 'RL', 'roll': 'RL',
+}
+
+# Trade vocabulary shared by catalog material names and invoice item descriptions.
+# An invoice item belongs to the catalog material it shares the most trades with.
+# Alternatives match whole words (plus a plural 's'); only the stems ending in \w* match
+# as prefixes, so 'av' does not match "available" nor 'air' "airport".
+TRADES = {
+    'steel': r'steel|stud|track|angle|flange|joist|beam|channel|rebar|tmt|deck\w*|\d+ga|\d+mil|screw|nail|anchor|bolt|fastener',
+    'concrete': r'concrete|cement\w*|grout|mortar|aac|cmu|masonry|block|brick|precast|tilt|slab',
+    'drywall': r'drywall|gypsum|sheetrock|mud|joint compound|sheathing|plaster\w*|board|drivall|corner bead|control joint',
+    'insulation': r'insulat\w*|acoustic\w*|sound|thermal|batt|mineral wool',
+    'glazing': r'glass|glaz\w*|window|curtain|facade|storefront',
+    'flooring': r'floor\w*|tile|carpet|epoxy|vinyl',
+    'finishes': r'paint\w*|primer|coating|finish\w*|trim|ceiling|surface',
+    'electrical': r'electric\w*|breaker|switchgear|transformer|wire|wiring|conduit|busway|busduct|ups|generator|power|kwh|light|lighting|led',
+    'cabling': r'cable|cabling|fiber|fibre|om\d|cat\d\w*|patch|rack|trunk\w*|network\w*|communication|audio|visual|av|digital',
+    'security': r'security|cctv|camera|access control|surveillance|ballistic|blast',
+    'hvac': r'hvac|chiller|crah|crac|pipe|piping|duct\w*|cooling|chw|ventilat\w*|exhaust|air|filter|merv',
+    'fire': r'fire|sprinkler|suppression|smoke|alarm',
+    'sealing': r'seal\w*|caulk\w*|waterproof\w*|membrane|adhesive|barrier|vapor|poly|polyethylene',
+    'doors': r'door|hinge|lock|lockset|hardware',
+}
+TRADE_PATTERNS = {trade: re.compile(r'\b(?:' + words + r')s?\b') for trade, words in TRADES.items()}
+
+
+def facility_key(name: str) -> str:
+    """'R&D Laboratories' and the invoices' 'r amp d laboratories' -> 'r and d laboratories'"""
+    return f" {normalize_text(name)} ".replace(' amp ', ' and ').strip()
+
+
+def trades(text: str) -> frozenset:
+    text = normalize_text(text)
+    return frozenset(trade for trade, pattern in TRADE_PATTERNS.items() if pattern.search(text))
+
+
+def normalize_uom(uom) -> str:
+    uom = str(uom or '').strip()
+    if not uom or uom.lower() == 'nan':
+        return 'EA'
+    return UOM_ALIASES.get(uom.lower(), uom.upper())
+
+
+def catalog_materials(catalog: Dict[str, Dict[str, List[str]]], facility: str) -> List[Tuple[str, str]]:
+    """(category, material) pairs in catalog order, without duplicates"""
+    seen, materials = set(), []
+    for category, names in catalog.get(facility, {}).items():
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                materials.append((category, name))
+    return materials
+
+
+def assign_items(descriptions: List[str], material_trades: List[frozenset]) -> Dict[str, Optional[int]]:
+    """Index of the catalog material each item description shares the most trades with (first wins ties)"""
+    assignment = {}
+    for description in descriptions:
+        item_trades = trades(description)
+        overlaps = [len(item_trades & mt) for mt in material_trades]
+        best = int(np.argmax(overlaps)) if overlaps else 0
+        assignment[description] = best if overlaps and overlaps[best] else None
+    return assignment
+
+
+def load_invoices(invoices_csv: str) -> pd.DataFrame:
+    columns = ['PROJECTNUMBER', 'PROJECT_TYPE', 'ItemDescription', 'QtyShipped', 'UOM', 'ExtendedPrice'] + list(DRIVERS.values())
+    df = pd.read_csv(invoices_csv, usecols=columns)
+    df = df.dropna(subset=['PROJECTNUMBER', 'ItemDescription'])
+    df['facility'] = df['PROJECT_TYPE'].fillna('').map(facility_key)
+    df['uom'] = df['UOM'].map(normalize_uom)
+    for column in ['QtyShipped', 'ExtendedPrice'] + list(DRIVERS.values()):
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def _ratio_quantiles(per_project: pd.DataFrame, value: str, prefix: str) -> pd.DataFrame:
+    """Quantiles across projects of value / driver, for every driver, grouped by material"""
+    frames = []
+    for driver, column in DRIVERS.items():
+        valid = per_project[per_project[column] > 0]
+        ratio = (valid[value] / valid[column]).groupby(valid['material'])
+        frame = pd.DataFrame({f"{prefix}_{driver}_{name}": ratio.quantile(q) for name, q in QUANTILES.items()})
+        frames.append(frame.where(ratio.count() >= MIN_PROJECTS))
+    return pd.concat(frames, axis=1)
+
+
+def _facility_coefficients(df: pd.DataFrame, catalog: Dict[str, Any], facility: str) -> pd.DataFrame:
+    materials = catalog_materials(catalog, facility)
+    source = df[df['facility'] == facility_key(facility)]
+    scope = facility
+    if source['PROJECTNUMBER'].nunique() < MIN_PROJECTS:
+        source, scope = df, 'all facility types'
+
+    descriptions = source['ItemDescription'].unique().tolist()
+    assignment = assign_items(descriptions, [trades(name) for _, name in materials])
+    source = source.assign(material=source['ItemDescription'].map(assignment))
+    drivers = source.groupby('PROJECTNUMBER')[list(DRIVERS.values())].first()
+
+    matched = source.dropna(subset=['material'])
+    matched = matched.assign(material=matched['material'].astype(int))
+    uoms = matched.groupby('material')['uom'].agg(lambda u: u.mode().iat[0])
+    in_uom = matched[matched['uom'].values == uoms.reindex(matched['material']).values]
+    per_project = pd.DataFrame({
+        'quantity': in_uom.groupby(['material', 'PROJECTNUMBER'])['QtyShipped'].sum(),
+        'spend': matched.groupby(['material', 'PROJECTNUMBER'])['ExtendedPrice'].sum()
+    }).fillna(0).reset_index().join(drivers, on='PROJECTNUMBER')
+    table = pd.concat([_ratio_quantiles(per_project, 'quantity', 'qty'), _ratio_quantiles(per_project, 'spend', 'spend')], axis=1)
+    table['uom'] = uoms
+    table['n_projects'] = per_project.groupby('material')['PROJECTNUMBER'].nunique()
+    table['n_items'] = matched.groupby('material')['ItemDescription'].nunique()
+    table['basis'] = 'invoice items'
+
+    # Materials no invoice item maps to, or measured on too few projects, have no coefficients
+    table = table.reindex(range(len(materials)))
+    calibrated = table[[f"{prefix}_{driver}_p50" for prefix in ('qty', 'spend') for driver in DRIVERS]].notna().any(axis=1)
+    table.loc[~calibrated, 'basis'] = 'uncalibrated'
+    table.insert(0, 'material', [name for _, name in materials])
+    table.insert(0, 'category', [category for category, _ in materials])
+    table.insert(0, 'facility_type', facility)
+    table['scope'] = scope
+    return table.reset_index(drop=True)
+
+
+def build_coefficients(invoices_csv: str = 'clean_train_full.csv', catalog: Dict[str, Any] = None) -> pd.DataFrame:
+    """One row per (facility type, catalog material) with per-driver quantity and spend quantiles"""
+    df = load_invoices(invoices_csv)
+    return pd.concat([_facility_coefficients(df, catalog, facility) for facility in catalog], ignore_index=True)
+
+
+def format_rupees(amount: float) -> str:
+    """'2.35 Crores' from one crore up, '4.10 Lakhs' below"""
+    if amount >= 10000000:
+        return f"{amount / 10000000:.2f} Crores"
+    return f"{amount / 100000:.2f} Lakhs"
+
+
+class MaterialEstimator:
+    """Looks up a project's material quantities in the coefficient table.
+
+    Each facility's rows are held as numpy arrays, so an estimate is a few vectorized
+    multiplications: the first driver the project specifies that has history for a
+    material (MW, then sq ft, then project volume) sets that material's quantity.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self._facilities: Dict[str, Dict[str, np.ndarray]] = {}
+        for facility, rows in table.groupby('facility_type', sort=False):
+            self._facilities[facility] = {column: rows[column].to_numpy() for column in rows.columns}
+
+    @classmethod
+    def load(cls, catalog: Dict[str, Any], path: str = COEFFICIENTS_CSV, invoices_csv: str = 'clean_train_full.csv') -> "MaterialEstimator":
+        """Read the coefficient table, rebuilding it when missing or older than the invoices"""
+        if os.path.exists(path) and (not os.path.exists(invoices_csv) or os.path.getmtime(path) >= os.path.getmtime(invoices_csv)):
+            table = pd.read_csv(path)
+        else:
+            table = build_coefficients(invoices_csv, catalog)
+            table.to_csv(path, index=False)
+        return cls(table)
+
+    def _lookup(self, rows: Dict[str, np.ndarray], requirements: Dict[str, Any], prefix: str, quantile: str) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.full(len(rows['material']), np.nan)
+        drivers = np.full(len(rows['material']), '', dtype=object)
+        for driver, key in DRIVER_REQUIREMENTS:
+            amount = requirements.get(key)
+            if not amount:
+                continue
+            estimate = rows[f"{prefix}_{driver}_{quantile}"].astype(float) * float(amount)
+            fill = np.isnan(values) & ~np.isnan(estimate)
+            values[fill] = estimate[fill]
+            drivers[fill] = driver
+        return values, drivers
+
+    def estimate(self, requirements: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = self._facilities.get(requirements.get("facility_type") or "Workspace") or self._facilities.get("Workspace")
+        if rows is None:
+            return []
+
+        quantity, drivers = self._lookup(rows, requirements, 'qty', 'p50')
+        low, _ = self._lookup(rows, requirements, 'qty', 'p25')
+        high, _ = self._lookup(rows, requirements, 'qty', 'p75')
+        spend, _ = self._lookup(rows, requirements, 'spend', 'p50')
+
+        materials = []
+        for i in np.flatnonzero(~np.isnan(quantity) & (drivers != '')):
+            uom = rows['uom'][i]
+            notes = (f"Median {DRIVER_LABELS[drivers[i]]} over {rows['n_projects'][i]:.0f} {rows['scope'][i]} projects "
+                     f"({rows['n_items'][i]:.0f} invoice items); P25-P75 {low[i]:.0f}-{high[i]:.0f} {uom}")
+            cost = spend[i] if not np.isnan(spend[i]) else 0.0
+            materials.append({
+                "Material/Equipment": rows['material'][i],
+                "Quantity": f"{max(quantity[i], 1):.0f} {uom}",
+                "Unit Cost (Rupees)": format_rupees(cost),
+                "Notes": notes,
+                "catalog_source": rows['material'][i],
+                "category": rows['category'][i]
+            })
+        return materials
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Build the material coefficient table from invoice history")
+    parser.add_argument('--invoices', default='clean_train_full.csv')
+    parser.add_argument('--catalog', default='data.json')
+    parser.add_argument('--out', default=COEFFICIENTS_CSV)
+    args = parser.parse_args(argv)
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    table = build_coefficients(args.invoices, catalog)
+    table.to_csv(args.out, index=False)
+    counts = table.groupby('basis').size().to_dict()
+    print(f"Wrote {len(table)} material coefficients for {table['facility_type'].nunique()} facility types to {args.out} ({counts})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""The column layout a model was trained on, saved with it and checked when it is loaded.
+
+    schema = FeatureSchema.from_featurizer(featurizer)
+    schema.validate_model(classifier, 'lgb_classifier')   # FeatureSchemaError on any mismatch
+
+Blocks are laid out left to right: text (TF-IDF vocabulary), numeric, date, then one
+block per categorical column holding its top values plus an 'other' slot. The text
+block is identified by its vocabulary hash as well as its size, so a vectorizer refit on
+different data cannot silently shift columns under a model.
+"""
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+
+class FeatureSchemaError(ValueError):
+    """A featurizer or model does not match the schema it is supposed to share"""
+
+
+def vocabulary_hash(vocabulary: Dict[str, int]) -> str:
+    """Stable hash of the terms in column order"""
+    digest = hashlib.sha1()
+    for term, _ in sorted(vocabulary.items(), key=lambda item: item[1]):
+        digest.update(term.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FeatureSchema:
+    def __init__(self, text_size: int, text_hash: str, numeric: List[str], date: List[str], categorical: Dict[str, List[str]]):
+        self.text_size = int(text_size)
+        self.text_hash = text_hash
+        self.numeric = list(numeric)
+        self.date = list(date)
+        self.categorical = {name: list(values) for name, values in categorical.items()}
+
+    @classmethod
+    def from_featurizer(cls, featurizer) -> "FeatureSchema":
+        return cls(len(featurizer.tfidf.vocabulary_), vocabulary_hash(featurizer.tfidf.vocabulary_),
+                   featurizer.numeric_feature_names, featurizer.date_feature_names, featurizer.categorical_mapping)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FeatureSchema":
+        return cls(data['text_size'], data['text_hash'], data['numeric'], data['date'], data['categorical'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'n_features': self.n_features, 'text_size': self.text_size, 'text_hash': self.text_hash,
+                'numeric': self.numeric, 'date': self.date, 'categorical': self.categorical}
+
+    def blocks(self) -> List[Tuple[str, int, int]]:
+        """(name, first column, column count) for every block, in column order"""
+        layout = [('text', self.text_size), ('numeric', len(self.numeric)), ('date', len(self.date))]
+        layout += [(f"categorical:{name}", len(values) + 1) for name, values in self.categorical.items()]
+        result, offset = [], 0
+        for name, width in layout:
+            result.append((name, offset, width))
+            offset += width
+        return result
+
+    @property
+    def n_features(self) -> int:
+        return self.text_size + len(self.numeric) + len(self.date) + sum(len(v) + 1 for v in self.categorical.values())
+
+    def differences(self, other: "FeatureSchema") -> List[str]:
+        diffs = []
+        if (self.text_size, self.text_hash) != (other.text_size, other.text_hash):
+            diffs.append(f"text vocabulary {self.text_size} terms ({self.text_hash[:8]}) vs {other.text_size} ({other.text_hash[:8]})")
+        for name in ('numeric', 'date', 'categorical'):
+            if getattr(self, name) != getattr(other, name):
+                diffs.append(f"{name} columns differ")
+        return diffs
+
+    def validate(self, other: "FeatureSchema", what: str = 'featurizer'):
+        diffs = self.differences(other)
+        if diffs:
+            raise FeatureSchemaError(f"{what} does not match the model's feature schema: {'; '.join(diffs)}")
+
+    def validate_model(self, model, name: str = 'model'):
+        expected = getattr(model, 'n_features_in_', None)
+        if expected is not None and expected != self.n_features:
+            raise FeatureSchemaError(f"{name} expects {expected} features but the schema builds {self.n_features} "
+                                     f"({', '.join(f'{block} {width}' for block, _, width in self.blocks()[:3])}, ...); retrain with train.py")
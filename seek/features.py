@@ -0,0 +1,248 @@
+"""Invoice-line features shared by training (train.py), bulk scoring and the app.
+
+The layout matches what the models were always trained on:
+
+    [ TF-IDF of the cleaned ItemDescription | 4 log1p numerics | 6 date parts | one-hot categoricals ]
+
+where each categorical column contributes its top values plus one 'other' column; the
+exact layout is the featurizer's FeatureSchema. Every step is a vectorized pandas/scipy
+operation over a whole DataFrame, so a chunk of rows costs about as much as a single row
+did before; transform(n_jobs=...) splits large frames across processes.
+
+Fitting is streaming: FeaturizerFit keeps term, mean and category counts rather than rows,
+so Featurizer.fit_chunks(read_chunks(path)) fits on a CSV of any size in bounded memory.
+"""
+import functools
+import numbers
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from feature_schema import FeatureSchema
+
+NUMERIC_FEATURES = ['ExtendedQuantity', 'UnitPrice', 'ExtendedPrice', 'invoiceTotal']
+# Zero or negative prices become a small positive value before log1p
+EPSILON_FEATURES = ['UnitPrice', 'ExtendedPrice']
+DATE_FEATURES = ['construction_duration_days', 'invoice_year', 'invoice_month', 'invoice_day', 'invoice_dayofweek', 'invoice_quarter']
+CATEGORICAL_FEATURES = ['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE', 'UOM']
+TOP_CATEGORIES = 10
+
+TFIDF_PARAMS = {'max_features': 30000, 'ngram_range': (1, 2), 'min_df': 2, 'stop_words': 'english', 'dtype': np.float32}
+
+# Rows per worker task in transform(n_jobs > 1)
+PARALLEL_CHUNK_ROWS = 20000
+# Rows per DataFrame when streaming a CSV
+CSV_CHUNK_ROWS = 100000
+
+
+def read_chunks(path: str, chunksize: int = CSV_CHUNK_ROWS, usecols: List[str] = None) -> Iterator[pd.DataFrame]:
+    """The CSV as DataFrames of at most chunksize rows, so no caller holds the whole file"""
+    return iter(pd.read_csv(path, chunksize=chunksize, usecols=usecols, low_memory=False))
+
+
+def clean_text(values: pd.Series) -> pd.Series:
+    """Lowercase alphanumeric words separated by single spaces; missing -> 'missing'"""
+    text = values.astype(object).where(values.notna(), None)
+    cleaned = (text.dropna().astype(str).str.lower()
+               .str.replace(r'[^0-9a-z\s]', ' ', regex=True)
+               .str.split().str.join(' '))
+    return cleaned.reindex(values.index).fillna('missing')
+
+
+def clean_numeric(values: pd.Series) -> pd.Series:
+    """'1,250.5' / '$30' -> float; unparseable -> NaN"""
+    if values.dtype == object:
+        values = values.astype(str).str.replace(r'[,$\s]', '', regex=True)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def numeric_frame(df: pd.DataFrame) -> pd.DataFrame:
+    columns = {}
+    for name in NUMERIC_FEATURES:
+        values = clean_numeric(df[name]) if name in df else pd.Series(np.nan, index=df.index)
+        values = values.clip(lower=0)
+        if name in EPSILON_FEATURES:
+            values = values.mask(values <= 0, 0.01)
+        columns[name] = np.log1p(values.fillna(0))
+    return pd.DataFrame(columns, index=df.index)
+
+
+def date_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Construction duration and invoice date parts; NaN where a date is missing or unparseable"""
+    def parse(name):
+        return pd.to_datetime(df[name], errors='coerce') if name in df else pd.Series(pd.NaT, index=df.index)
+
+    start, end, invoiced = parse('CONSTRUCTION_START_DATE'), parse('SUBSTANTIAL_COMPLETION_DATE'), parse('invoiceDate')
+    return pd.DataFrame({
+        'construction_duration_days': (end - start).dt.days,
+        'invoice_year': invoiced.dt.year,
+        'invoice_month': invoiced.dt.month,
+        'invoice_day': invoiced.dt.day,
+        'invoice_dayofweek': invoiced.dt.dayofweek,
+        'invoice_quarter': invoiced.dt.quarter
+    }, index=df.index).astype(float)
+
+
+def categorical_values(df: pd.DataFrame, name: str) -> pd.Series:
+    if name not in df:
+        return pd.Series('missing', index=df.index)
+    return df[name].fillna('missing').astype(str).str.lower().str.strip()
+
+
+class TfidfFit:
+    """Fits a TfidfVectorizer over chunks of text, holding per-term counts instead of documents.
+
+    Gives the same vectorizer as TfidfVectorizer(**params).fit on the concatenated text:
+    min_df, max_df and max_features select the vocabulary from document and corpus
+    frequencies, and idf_ is computed from the kept terms' document frequencies.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.params = dict(params)
+        self.analyze = TfidfVectorizer(**self.params).build_analyzer()
+        self.doc_freq, self.term_freq, self.n_docs = Counter(), Counter(), 0
+
+    def update(self, texts: Iterable[str]) -> "TfidfFit":
+        for text in texts:
+            terms = self.analyze(text)
+            self.term_freq.update(terms)
+            self.doc_freq.update(set(terms))
+            self.n_docs += 1
+        return self
+
+    def _doc_count(self, name: str, default) -> float:
+        value = self.params.get(name, default)
+        return value if isinstance(value, numbers.Integral) else value * self.n_docs
+
+    def result(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        low, high = self._doc_count('min_df', 1), self._doc_count('max_df', 1.0)
+        terms = [term for term, count in self.doc_freq.items() if low <= count <= high]
+        max_features = self.params.get('max_features')
+        if max_features is not None and len(terms) > max_features:
+            terms = sorted(terms, key=lambda term: (-self.term_freq[term], term))[:max_features]
+        terms.sort()
+        tfidf = TfidfVectorizer(**{**self.params, 'vocabulary': {term: i for i, term in enumerate(terms)}})
+        doc_freq = np.array([self.doc_freq[term] for term in terms], dtype=np.float64)
+        if self.params.get('smooth_idf', True):
+            tfidf.idf_ = np.log((1 + self.n_docs) / (1 + doc_freq)) + 1
+        else:
+            tfidf.idf_ = np.log(self.n_docs / doc_freq) + 1
+        return tfidf
+
+
+class Featurizer:
+    """Fitted text, numeric, date and categorical transforms producing one CSR row per invoice line"""
+
+    def __init__(self, tfidf, numeric_imputer, date_imputer, categorical_mapping: Dict[str, List[str]],
+                 date_feature_names: List[str] = None):
+        self.tfidf = tfidf
+        self.numeric_imputer = numeric_imputer
+        self.date_imputer = date_imputer
+        self.categorical_mapping = {name: list(categorical_mapping.get(name, [])) for name in CATEGORICAL_FEATURES}
+        self.numeric_feature_names = list(NUMERIC_FEATURES)
+        self.date_feature_names = list(date_feature_names or DATE_FEATURES)
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, tfidf_params: Dict[str, Any] = None) -> "Featurizer":
+        return FeaturizerFit(tfidf_params).update(df).result()
+
+    @classmethod
+    def fit_chunks(cls, chunks: Iterable[pd.DataFrame], tfidf_params: Dict[str, Any] = None) -> "Featurizer":
+        """fit() over an iterable of DataFrames, e.g. read_chunks(path)"""
+        fitter = FeaturizerFit(tfidf_params)
+        for chunk in chunks:
+            fitter.update(chunk)
+        return fitter.result()
+
+    @functools.cached_property
+    def schema(self) -> FeatureSchema:
+        return FeatureSchema.from_featurizer(self)
+
+    @property
+    def n_features(self) -> int:
+        return self.schema.n_features
+
+    def _categorical_columns(self, df: pd.DataFrame) -> np.ndarray:
+        """rows x categorical columns: each value's column index within the categorical blocks"""
+        columns, offset = [], 0
+        for name in CATEGORICAL_FEATURES:
+            top = self.categorical_mapping[name]
+            codes = pd.Categorical(categorical_values(df, name), categories=top).codes.astype(np.int32)
+            columns.append(offset + np.where(codes >= 0, codes, len(top)))
+            offset += len(top) + 1
+        return np.column_stack(columns)
+
+    def _transform(self, df: pd.DataFrame) -> sparse.csr_matrix:
+        """Writes every block straight into one CSR allocation sized up front, in schema column order"""
+        X_text = self.tfidf.transform(clean_text(df['ItemDescription'] if 'ItemDescription' in df else pd.Series('', index=df.index)))
+        dense = np.hstack([self.numeric_imputer.transform(numeric_frame(df)[self.numeric_feature_names]),
+                           self.date_imputer.transform(date_frame(df)[self.date_feature_names])]).astype(np.float32)
+        categorical = self._categorical_columns(df)
+        n, n_dense, n_categorical = len(df), dense.shape[1], categorical.shape[1]
+        text_size = self.schema.text_size
+
+        text_counts = np.diff(X_text.indptr)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(text_counts + n_dense + n_categorical, out=indptr[1:])
+        data = np.empty(indptr[-1], dtype=np.float32)
+        indices = np.empty(indptr[-1], dtype=np.int32)
+
+        rows = np.repeat(np.arange(n), text_counts)
+        positions = indptr[rows] + np.arange(X_text.nnz) - X_text.indptr[rows]
+        data[positions] = X_text.data
+        indices[positions] = X_text.indices
+
+        dense_positions = (indptr[:-1] + text_counts)[:, None] + np.arange(n_dense)
+        data[dense_positions] = dense
+        indices[dense_positions] = text_size + np.arange(n_dense)
+
+        categorical_positions = (indptr[:-1] + text_counts + n_dense)[:, None] + np.arange(n_categorical)
+        data[categorical_positions] = 1.0
+        indices[categorical_positions] = text_size + n_dense + categorical
+
+        return sparse.csr_matrix((data, indices, indptr), shape=(n, self.schema.n_features))
+
+    def transform(self, df: pd.DataFrame, n_jobs: int = 1) -> sparse.csr_matrix:
+        if n_jobs == 1 or len(df) <= PARALLEL_CHUNK_ROWS:
+            return self._transform(df)
+        from joblib import Parallel, delayed
+        chunks = [df.iloc[i:i + PARALLEL_CHUNK_ROWS] for i in range(0, len(df), PARALLEL_CHUNK_ROWS)]
+        return sparse.vstack(Parallel(n_jobs=n_jobs)(delayed(self._transform)(chunk) for chunk in chunks), format='csr')
+
+    def transform_record(self, record: Dict[str, Any]) -> sparse.csr_matrix:
+        return self._transform(pd.DataFrame([record]))
+
+
+class FeaturizerFit:
+    """Everything Featurizer.fit learns, accumulated one DataFrame chunk at a time"""
+
+    def __init__(self, tfidf_params: Dict[str, Any] = None):
+        self.text = TfidfFit({**TFIDF_PARAMS, **(tfidf_params or {})})
+        self.sums = {'numeric': pd.Series(0.0, index=NUMERIC_FEATURES), 'date': pd.Series(0.0, index=DATE_FEATURES)}
+        self.counts = {'numeric': pd.Series(0, index=NUMERIC_FEATURES), 'date': pd.Series(0, index=DATE_FEATURES)}
+        self.categories = {name: pd.Series(dtype=float) for name in CATEGORICAL_FEATURES}
+
+    def update(self, df: pd.DataFrame) -> "FeaturizerFit":
+        self.text.update(clean_text(df['ItemDescription']))
+        for block, frame in (('numeric', numeric_frame(df)), ('date', date_frame(df))):
+            self.sums[block] += frame.sum()
+            self.counts[block] += frame.count()
+        for name in CATEGORICAL_FEATURES:
+            self.categories[name] = self.categories[name].add(categorical_values(df, name).value_counts(), fill_value=0)
+        return self
+
+    def _imputer(self, block: str):
+        from sklearn.impute import SimpleImputer
+        # Imputers learn the means of the real columns, so rows with a missing date get typical values;
+        # fitting on the single row of running means reproduces the means over every chunk. A column
+        # never observed imputes 0 rather than being dropped, which would shift every later column.
+        means = (self.sums[block] / self.counts[block].replace(0, np.nan)).fillna(0.0)
+        return SimpleImputer(strategy='mean').fit(means.to_frame().T)
+
+    def result(self) -> Featurizer:
+        mapping = {name: counts.sort_values(ascending=False, kind='stable').head(TOP_CATEGORIES).index.tolist()
+                   for name, counts in self.categories.items()}
+        return Featurizer(self.text.result(), self._imputer('numeric'), self._imputer('date'), mapping)
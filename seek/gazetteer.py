@@ -0,0 +1,174 @@
+import csv
+import math
+import os
+import re
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# Distinct PROJECT_CITY/STATE pairs of the invoice history, rebuilt when older than the invoices
+INVOICE_PLACES_CSV = 'invoice_places.csv'
+
+ALIASES = {
+    'bombay': 'mumbai',
+    'new bombay': 'navi mumbai',
+    'bangalore': 'bengaluru',
+    'mysore': 'mysuru',
+    'new delhi': 'delhi',
+    'prayagraj': 'allahabad',
+    'trichy': 'tiruchirappalli',
+    'vizag': 'visakhapatnam',
+    'calcutta': 'kolkata',
+    'madras': 'chennai',
+    'jammu and kashmir': 'jammu kashmir',
+}
+
+UNKNOWN = -1
+
+_PINCODE_PART = re.compile(r'^(.+?)\s*-\s*\d{6}$')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, '&' -> 'and', punctuation to spaces, single-spaced"""
+    text = str(text or '').lower().replace('&', ' and ')
+    return ' '.join(re.sub(r'[^a-z0-9\s]', ' ', text).split())
+
+
+def normalize_place(name: str) -> str:
+    name = normalize_text(name)
+    return ALIASES.get(name, name)
+
+
+def invoice_places(invoices_csv: str = 'clean_train_full.csv', path: str = INVOICE_PLACES_CSV) -> List[Tuple[str, str]]:
+    """(city, state) pairs from the cached table, so only a rebuild pays for reading the invoices with pandas"""
+    stale = os.path.exists(invoices_csv) and (not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(invoices_csv))
+    if stale:
+        import pandas as pd
+        places = pd.read_csv(invoices_csv, usecols=['PROJECT_CITY', 'STATE']).dropna().drop_duplicates()
+        places.set_axis(['city', 'state'], axis=1).to_csv(path, index=False)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(row['city'], row['state']) for row in csv.DictReader(f)]
+
+
+class Gazetteer:
+    """City/state lookup table with integer ids and coordinates for haversine radius queries.
+
+    Built once at ingest from scraped seller addresses, the PROJECT_CITY/STATE columns of the
+    invoice history and city_coordinates.csv, so location filters become id comparisons.
+    """
+
+    def __init__(self):
+        self.states: List[str] = []
+        self.state_ids: Dict[str, int] = {}
+        self.cities: List[str] = []
+        self.city_ids: Dict[str, int] = {}
+        self.city_state: List[int] = []
+        self.coordinates: List[Tuple[float, float]] = []
+        self._known_city_ids: np.ndarray = np.array([], dtype='int32')
+        self._known_radians: np.ndarray = np.zeros((0, 2))
+
+    def add_state(self, state: str) -> int:
+        state = normalize_place(state)
+        if not state:
+            return UNKNOWN
+        if state not in self.state_ids:
+            self.state_ids[state] = len(self.states)
+            self.states.append(state)
+        return self.state_ids[state]
+
+    def add_city(self, city: str, state: str = None, latitude: float = math.nan, longitude: float = math.nan) -> int:
+        city = normalize_place(city)
+        if not city:
+            return UNKNOWN
+        state_id = self.add_state(state) if state else UNKNOWN
+        if city not in self.city_ids:
+            self.city_ids[city] = len(self.cities)
+            self.cities.append(city)
+            self.city_state.append(state_id)
+            self.coordinates.append((latitude, longitude))
+        else:
+            city_id = self.city_ids[city]
+            if self.city_state[city_id] == UNKNOWN:
+                self.city_state[city_id] = state_id
+            if not math.isnan(latitude) and math.isnan(self.coordinates[city_id][0]):
+                self.coordinates[city_id] = (latitude, longitude)
+        return self.city_ids[city]
+
+    @classmethod
+    def build(cls, addresses: Iterable[str] = (), invoices_csv: str = 'clean_train_full.csv',
+              coordinates_csv: str = 'city_coordinates.csv') -> "Gazetteer":
+        gazetteer = cls()
+        if os.path.exists(coordinates_csv):
+            with open(coordinates_csv, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    gazetteer.add_city(row['city'], row['state'], float(row['latitude']), float(row['longitude']))
+        for city, state in invoice_places(invoices_csv):
+            gazetteer.add_city(city, state)
+        for address in addresses:
+            city, state = gazetteer.parse_address(address)
+            if city:
+                gazetteer.add_city(city, state)
+            elif state:
+                gazetteer.add_state(state)
+        gazetteer._index_coordinates()
+        return gazetteer
+
+    def _index_coordinates(self):
+        coords = np.array(self.coordinates, dtype='float64').reshape(-1, 2)
+        known = ~np.isnan(coords).any(axis=1)
+        self._known_city_ids = np.nonzero(known)[0].astype('int32')
+        self._known_radians = np.radians(coords[known])
+
+    def parse_address(self, address: str) -> Tuple[Optional[str], Optional[str]]:
+        """'..., Navi Mumbai - 400701, Thane, Maharashtra, India' -> ('navi mumbai', 'maharashtra')"""
+        parts = [part.strip() for part in str(address or '').split(',') if part.strip()]
+        if parts and normalize_place(parts[-1]) == 'india':
+            parts = parts[:-1]
+        city = state = None
+        if parts and normalize_place(parts[-1]) in self.state_ids:
+            state = normalize_place(parts[-1])
+        for part in parts:
+            match = _PINCODE_PART.match(part)
+            if match:
+                city = normalize_place(match.group(1))
+        if city is None:
+            for part in reversed(parts):
+                if normalize_place(part) in self.city_ids:
+                    city = normalize_place(part)
+                    break
+        return city, state
+
+    def tag(self, address: str, location_hint: str = None) -> Tuple[int, int]:
+        """(city_id, state_id) for a product; UNKNOWN where it cannot be resolved"""
+        city, state = self.parse_address(address)
+        if city is None and location_hint:
+            hint = normalize_place(location_hint)
+            city = hint if hint in self.city_ids else None
+        city_id = self.city_ids.get(city, UNKNOWN) if city else UNKNOWN
+        state_id = self.state_ids.get(state, UNKNOWN) if state else UNKNOWN
+        if state_id == UNKNOWN and city_id != UNKNOWN:
+            state_id = self.city_state[city_id]
+        return city_id, state_id
+
+    def cities_within(self, place: Tuple[str, int], radius_km: float) -> Set[int]:
+        """Ids of every city within radius_km of a city, or of any city of a state"""
+        kind, place_id = place
+        centers = [place_id] if kind == 'city' else [i for i, s in enumerate(self.city_state) if s == place_id]
+        centers = [i for i in centers if not math.isnan(self.coordinates[i][0])]
+        if not len(self._known_city_ids) or not centers:
+            return set(centers)
+        # A few hundred known cities at most: one broadcast haversine beats building and querying a tree
+        points = np.radians(np.array([self.coordinates[i] for i in centers]))[:, None, :]
+        lat, lon = self._known_radians[:, 0], self._known_radians[:, 1]
+        d_lat, d_lon = lat - points[..., 0], lon - points[..., 1]
+        a = np.sin(d_lat / 2) ** 2 + np.cos(points[..., 0]) * np.cos(lat) * np.sin(d_lon / 2) ** 2
+        within = (2 * np.arcsin(np.sqrt(np.minimum(a, 1.0))) <= radius_km / EARTH_RADIUS_KM).any(axis=0)
+        return {int(i) for i in self._known_city_ids[within]} | set(centers)
+
+
+def matches_location(metadata: Dict[str, Any], location_filter: Dict[str, Any]) -> bool:
+    if 'city_ids' in location_filter:
+        return metadata.get('city_id', UNKNOWN) in location_filter['city_ids']
+    return metadata.get('state_id', UNKNOWN) in location_filter['state_ids']
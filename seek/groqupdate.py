@@ -1,26 +1,45 @@
 import json
 import os
 import re
-from typing import List, Dict, Any
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import faiss
+from typing import List, Dict, Any, Iterator, Tuple, Union, TYPE_CHECKING
 import numpy as np
 import requests
 from datetime import datetime
-import joblib
+from collections import OrderedDict
 import warnings
 import traceback
-from scipy import sparse
 import streamlit as st
 from dotenv import load_dotenv
 import time
-import matplotlib.pyplot as plt
-from dateutil.relativedelta import relativedelta
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.impute import SimpleImputer
+import functools
+import logging
+import threading
+# sentence_transformers, faiss, pandas, scipy, sklearn, joblib and matplotlib are imported where
+# they are first needed, so the page renders before any of them (or the index) has loaded
+from context_packer import ContextPacker, make_token_counter, pack_list
+from gazetteer import Gazetteer, matches_location
+from intent import IntentParser, QueryIntent
+from material_matches import MaterialMatches, catalog_material_names, product_key
+from pricing import PriceIndex, normalize_price
+from snapshots import SnapshotManager
+import schedule
+import metrics
+import tracing
+from vendors import VendorIndex, category_from_filename, vendor_key, vendor_record, format_vendor_record
+from llm_client import chat_completion, stream_chat_completion
+from pipeline import Pipeline, StageSkipped
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 warnings.filterwarnings('ignore')
 
+# Index and ML loading run on background threads (warm-up, snapshot reloads) that have no
+# Streamlit script context, so they log here instead of calling st.*
+logger = logging.getLogger('seek')
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+    from estimation import MaterialEstimator
+    from timeline import TimelineEngine
+
 # Load environment variables
 load_dotenv()
 
@@ -32,139 +51,33 @@ else:
     st.error("data.json not found. Using default catalog.")
     MATERIAL_CATALOG = {}  # Add default if needed
 
-def extract_facility_type(query: str) -> str:
-    query_lower = query.lower()
-    for facility in MATERIAL_CATALOG:
-        if facility.lower().replace(' ', '') in query_lower:
-            return facility
-    return "Workspace"
+# Prompt tokens (including packed context) sent with each answer request
+PROMPT_TOKEN_LIMIT = 4000
 
-def get_catalog_materials(facility_type: str, category: str = None) -> List[str]:
-    catalog = MATERIAL_CATALOG.get(facility_type, MATERIAL_CATALOG.get("Workspace", {}))
-    if category:
-        return catalog.get(category, [])
-    return [mat for cats in catalog.values() for mat in cats]
+# Product file served by the app; edits to it are hot-reloaded into a new index snapshot
+PRODUCTS_FILE = "filtered_products.json"
+SNAPSHOT_POLL_SECONDS = 10.0
 
-class IndiaMART_RAG:
-    def __init__(self, json_file: str = "filtered_products.json", embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        self.json_file = json_file
-        self.embedding_model_name = embedding_model
-        self.embedding_model = SentenceTransformer(embedding_model)
-        self.index = None
-        self.documents = []
-        self.metadata = []
-        self.groq_api_key = os.getenv("GROQ_API_KEY")
-        if not self.groq_api_key:
-            raise ValueError("Groq API key missing. Set GROQ_API_KEY in .env file. Get a key from https://console.groq.com/keys")
+# Files in a products directory that repeat products from the per-category files
+AGGREGATE_JSON_FILES = ("all_products.json",)
 
-    def _call_groq_api(self, prompt: str, max_tokens: int = 4096) -> str:
-        time.sleep(2)
-        
-        if len(prompt) > 6000:
-            if "Context:" in prompt:
-                context_start = prompt.find("Context:")
-                query_start = prompt.find("Query:")
-                if query_start > 0:
-                    base_prompt = prompt[query_start:]
-                    context_part = prompt[context_start:query_start]
-                    if len(context_part) > 3000:
-                        context_part = context_part[:3000] + "\n... (context truncated)"
-                    prompt = "Context:\n" + context_part + "\n" + base_prompt
-            else:
-                prompt = prompt[:6000] + "\n... (truncated to fit token limit)"
-            st.warning(f"Prompt truncated to ~1500 tokens to avoid context length issues.")
+# Unit price used only when neither the product nor its material or category has a parsed price
+DEFAULT_UNIT_PRICE = 1000.0
 
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "llama-3.3-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": 0.7
-            }
-            response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            if 'choices' in data and len(data['choices']) > 0:
-                return data['choices'][0]['message']['content']
-            else:
-                st.error("Invalid API response format.")
-                return "Error: Invalid API response."
-        except requests.exceptions.HTTPError as e:
-            error_msg = f"API HTTP Error: {str(e)} - {e.response.text}"
-            if e.response.status_code == 400:
-                error_msg += f" - Possible context length issue. Prompt length: {len(prompt)} chars."
-                return self._call_groq_api(prompt[:4000], max_tokens=2048)
-            elif e.response.status_code == 401:
-                error_msg += " - Invalid API key."
-            elif e.response.status_code == 429:
-                error_msg += " - Rate limit exceeded. Retrying after delay..."
-                time.sleep(15)
-                return self._call_groq_api(prompt, max_tokens)
-            st.error(error_msg)
-            return f"Error: {error_msg}"
-        except Exception as e:
-            st.error(f"General Error: {str(e)}")
-            return f"Error: {str(e)}"
+# Product index storage: 'fp32', 'fp16' or 'sq8' codes, optionally PCA-projected to fewer dims (see bench_index.py)
+INDEX_COMPRESSION = "fp32"
+INDEX_PCA_DIMS = None
 
-    def generate_response(self, query: str, context: List[Dict[str, Any]], requirements: Dict[str, Any] = None, material_estimates: List[Dict[str, Any]] = None, catalog_materials: List[str] = None) -> str:
-        context_text = ""
-        for i, result in enumerate(context[:3]):
-            metadata = result['metadata']
-            doc_str = f"Title: {metadata.get('title', 'N/A')}\n"
-            if metadata.get('url'):
-                doc_str += f"URL: {metadata['url']}\n"
-            
-            price = metadata.get('price', '')
-            price_unit = metadata.get('price_unit', '')
-            if price:
-                doc_str += f"Price: {price} {price_unit}\n"
-            
-            details = metadata.get('details', {})
-            if details and isinstance(details, dict):
-                important_keys = ['usage/application', 'brand', 'availability', 'location', 'vendor', 'company', 'model', 'capacity', 'warranty']
-                for key in important_keys:
-                    if key in details and details[key]:
-                        value = str(details[key]).strip()
-                        if value and value != '-':
-                            doc_str += f"{key.replace('/', ' ').title()}: {value}\n"
-            
-            company_info = metadata.get('company_info', {})
-            seller_info = metadata.get('seller_info', {})
-            if company_info.get('gst'):
-                doc_str += f"GST: {company_info['gst']}\n"
-            if 'gst_registration_date' in company_info:
-                doc_str += f"GST Registration Date: {company_info['gst_registration_date']}\n"
-            if seller_info:
-                if 'contact_person' in seller_info:
-                    doc_str += f"Contact Person: {seller_info['contact_person']}\n"
-                if 'full_address' in seller_info:
-                    doc_str += f"Address: {seller_info['full_address']}\n"
-                if 'website' in seller_info:
-                    doc_str += f"Website: {seller_info['website']}\n"
-            if company_info:
-                if 'description' in company_info:
-                    doc_str += f"Company Description: {company_info['description'][:200]}...\n"
-            if metadata.get('reviews'):
-                for review in metadata['reviews']:
-                    if review.get('type') == 'overall_rating':
-                        doc_str += f"Rating: {review.get('value', 'N/A')}\n"
-                        break
-            
-            context_text += f"Document {i+1}:\n{doc_str[:500]}\n\n"
+# Ask the LLM to comment on the computed procurement timeline (the dates themselves never come from it)
+TIMELINE_COMMENTARY = False
 
-        if material_estimates:
-            materials_text = "Materials:\n" + "\n".join([f"- {m['Material/Equipment']} ({m['Quantity']})" for m in material_estimates])
-            context_text += materials_text + "\n\n"
+# Above this many tasks the Gantt chart switches from a static matplotlib figure to an interactive Altair chart
+GANTT_INTERACTIVE_TASKS = 300
 
-        if catalog_materials:
-            catalog_text = "Catalog Materials:\n" + "\n".join([f"- {mat}" for mat in catalog_materials])
-            context_text += catalog_text + "\n\n"
+# Query embeddings kept per RAG instance; batch runs repeat the same material searches
+QUERY_CACHE_SIZE = 1024
 
-        prompt = f"""
+RESPONSE_PROMPT = """
 Assistant for construction procurement. Use ONLY context from IndiaMART JSON database (real product details) and Catalog Materials.
 Context:
 {context_text}
@@ -196,31 +109,197 @@ Vendors (list all relevant):
 - No fabrication—stick to real JSON data and catalog.
 Answer:
 """
+
+@functools.lru_cache(maxsize=None)
+def load_embedding_model(name: str) -> "SentenceTransformer":
+    """One encoder per model name for the whole process, shared by every index snapshot"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+@functools.lru_cache(maxsize=1)
+def load_material_estimator() -> "MaterialEstimator":
+    """Coefficient table shared by every RAG instance and batch worker"""
+    from estimation import MaterialEstimator
+    return MaterialEstimator.load(MATERIAL_CATALOG)
+
+@functools.lru_cache(maxsize=1)
+def load_timeline_engine() -> "TimelineEngine":
+    from timeline import TimelineEngine
+    return TimelineEngine.load(MATERIAL_CATALOG)
+
+@functools.lru_cache(maxsize=1)
+def catalog_intent_parser() -> IntentParser:
+    """Intent parser over MATERIAL_CATALOG alone, for callers without a loaded gazetteer"""
+    return IntentParser(MATERIAL_CATALOG)
+
+def extract_facility_type(query: str) -> str:
+    return catalog_intent_parser().parse(query).facility_type
+
+def get_catalog_materials(facility_type: str, category: str = None) -> List[str]:
+    catalog = MATERIAL_CATALOG.get(facility_type, MATERIAL_CATALOG.get("Workspace", {}))
+    if category:
+        return catalog.get(category, [])
+    return [mat for cats in catalog.values() for mat in cats]
+
+class IndiaMART_RAG:
+    def __init__(self, json_file: str = "filtered_products.json", embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2", require_api_key: bool = True):
+        self.json_file = json_file
+        self.embedding_model_name = embedding_model
+        self.embedding_model = load_embedding_model(embedding_model)
+        self.index = None
+        self.embeddings = None
+        self.vendor_index = None
+        self.material_matches = None
+        self.price_index = None
+        self.gazetteer = None
+        self.intent_parser = catalog_intent_parser()
+        self.documents = []
+        self.metadata = []
+        self._urls = set()
+        self.count_tokens = make_token_counter(getattr(self.embedding_model, 'tokenizer', None))
+        self.context_packer = ContextPacker(self.count_tokens)
+        self._query_embeddings = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.groq_api_key = os.getenv("GROQ_API_KEY")
+        if require_api_key and not self.groq_api_key:
+            raise ValueError("Groq API key missing. Set GROQ_API_KEY in .env file. Get a key from https://console.groq.com/keys")
+
+    def _check_prompt_budget(self, prompt: str):
+        prompt_tokens = self.count_tokens(prompt)
+        if prompt_tokens > PROMPT_TOKEN_LIMIT:
+            st.warning(f"Prompt is {prompt_tokens} tokens, above the {PROMPT_TOKEN_LIMIT} token budget.")
+
+    def _http_error_message(self, e: requests.exceptions.HTTPError, prompt: str) -> str:
+        error_msg = f"API HTTP Error: {str(e)} - {e.response.text}"
+        if e.response.status_code == 400:
+            error_msg += f" - Possible context length issue. Prompt length: {self.count_tokens(prompt)} tokens."
+        elif e.response.status_code == 401:
+            error_msg += " - Invalid API key."
+        return error_msg
+
+    def _call_groq_api(self, prompt: str, max_tokens: int = 4096) -> str:
+        with tracing.span("llm.rate_limit_sleep"):
+            time.sleep(2)
+        self._check_prompt_budget(prompt)
+
+        try:
+            with tracing.span("llm.request", max_tokens=max_tokens):
+                content = chat_completion(self.groq_api_key, prompt, max_tokens=max_tokens, temperature=0.7)
+            metrics.LLM_CALLS.inc(outcome="ok")
+            return content
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 429:
+                metrics.LLM_CALLS.inc(outcome="rate_limited")
+                metrics.LLM_RETRIES.inc()
+                st.warning("Rate limit exceeded. Retrying after delay...")
+                time.sleep(15)
+                return self._call_groq_api(prompt, max_tokens)
+            metrics.LLM_CALLS.inc(outcome="error")
+            error_msg = self._http_error_message(e, prompt)
+            st.error(error_msg)
+            return f"Error: {error_msg}"
+        except Exception as e:
+            metrics.LLM_CALLS.inc(outcome="error")
+            st.error(f"General Error: {str(e)}")
+            return f"Error: {str(e)}"
+
+    def _stream_groq_api(self, prompt: str, max_tokens: int = 4096) -> Iterator[str]:
+        self._check_prompt_budget(prompt)
+
+        try:
+            yield from stream_chat_completion(self.groq_api_key, prompt, max_tokens=max_tokens, temperature=0.7)
+            metrics.LLM_CALLS.inc(outcome="ok")
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 429:
+                metrics.LLM_CALLS.inc(outcome="rate_limited")
+                metrics.LLM_RETRIES.inc()
+                st.warning("Rate limit exceeded. Retrying after delay...")
+                time.sleep(15)
+                yield from self._stream_groq_api(prompt, max_tokens)
+                return
+            metrics.LLM_CALLS.inc(outcome="error")
+            error_msg = self._http_error_message(e, prompt)
+            st.error(error_msg)
+            yield f"Error: {error_msg}"
+        except Exception as e:
+            metrics.LLM_CALLS.inc(outcome="error")
+            st.error(f"General Error: {str(e)}")
+            yield f"Error: {str(e)}"
+
+    @tracing.traced("llm.build_prompt")
+    def build_response_prompt(self, query: str, context: List[Dict[str, Any]], material_estimates: List[Dict[str, Any]] = None, catalog_materials: List[str] = None) -> str:
+        budget = PROMPT_TOKEN_LIMIT - self.count_tokens(RESPONSE_PROMPT.format(context_text="", query=query))
+
+        materials_text = ""
+        if material_estimates:
+            materials_text = pack_list("Materials", [f"{m['Material/Equipment']} ({m['Quantity']})" for m in material_estimates], self.count_tokens, budget // 4)
+        catalog_text = pack_list("Catalog Materials", catalog_materials or [], self.count_tokens, budget // 4)
+        budget -= self.count_tokens(materials_text + catalog_text)
+
+        context_text = self.context_packer.pack(context, budget) + materials_text + catalog_text
+        return RESPONSE_PROMPT.format(context_text=context_text, query=query)
+
+    def generate_response(self, query: str, context: List[Dict[str, Any]], requirements: Dict[str, Any] = None, material_estimates: List[Dict[str, Any]] = None, catalog_materials: List[str] = None) -> str:
+        prompt = self.build_response_prompt(query, context, material_estimates, catalog_materials)
         return self._call_groq_api(prompt, max_tokens=2048)
 
+    def stream_response(self, query: str, context: List[Dict[str, Any]], requirements: Dict[str, Any] = None, material_estimates: List[Dict[str, Any]] = None, catalog_materials: List[str] = None) -> Iterator[str]:
+        prompt = self.build_response_prompt(query, context, material_estimates, catalog_materials)
+        return tracing.traced_iter("llm.stream", self._stream_groq_api(prompt, max_tokens=2048))
+
     def load_and_process_json_files(self):
-        st.write(f"Loading JSON file: {self.json_file}...")
+        """Load products from a JSON file, or from every per-category JSON file in a directory"""
+        logger.info("Loading JSON file: %s", self.json_file)
        
         if not os.path.exists(self.json_file):
             raise FileNotFoundError(f"{self.json_file} not found in {os.getcwd()}. Ensure it's in the current directory.")
        
+        if os.path.isdir(self.json_file):
+            paths = [os.path.join(self.json_file, f) for f in sorted(os.listdir(self.json_file))
+                     if f.endswith('.json') and f not in AGGREGATE_JSON_FILES]
+        else:
+            paths = [self.json_file]
+       
+        for path in paths:
+            self._load_json_file(path, category_from_filename(path) if len(paths) > 1 else None)
+        self._tag_locations()
+        logger.info("Loaded %d documents from %s", len(self.documents), self.json_file)
+
+    def _tag_locations(self):
+        """Build the city/state gazetteer and give every product integer city_id/state_id tags"""
+        addresses = [self._product_address(meta) for meta in self.metadata]
+        self.gazetteer = Gazetteer.build(addresses)
+        for meta, address in zip(self.metadata, addresses):
+            location_hint = (meta.get('seller_info', {}) or {}).get('location')
+            meta['city_id'], meta['state_id'] = self.gazetteer.tag(address, location_hint)
+        self.intent_parser = IntentParser(MATERIAL_CATALOG, self.gazetteer)
+
+    @staticmethod
+    def _product_address(metadata: Dict[str, Any]) -> str:
+        seller_info = metadata.get('seller_info', {}) or {}
+        company_info = metadata.get('company_info', {}) or {}
+        return str(seller_info.get('full_address') or company_info.get('full_address') or '')
+   
+    def _load_json_file(self, path: str, category: str = None):
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
+            with open(path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                
             if isinstance(data, list):
                 for item in data:
-                    self._process_item(item)
+                    self._process_item(item, category)
             else:
-                self._process_item(data)
-               
-            st.write(f"Loaded {len(self.documents)} documents from {self.json_file}")
+                self._process_item(data, category)
         except json.JSONDecodeError as e:
-            st.error(f"JSON decode error in {self.json_file}: {str(e)}")
+            logger.error("JSON decode error in %s: %s", path, e)
         except Exception as e:
-            st.error(f"Error loading {self.json_file}: {str(e)}")
+            logger.error("Error loading %s: %s", path, e)
    
-    def _process_item(self, item: Dict[str, Any]):
+    def _process_item(self, item: Dict[str, Any], category: str = None):
+        # A product listed under several categories is indexed once, under the first
+        url = item.get('url', '')
+        if url and url in self._urls:
+            return
         text_parts = []
        
         title = item.get('title', '')
@@ -264,9 +343,11 @@ Answer:
         text = " ".join(text_parts)
        
         if text.strip():
+            if url:
+                self._urls.add(url)
             self.documents.append(text)
             self.metadata.append({
-                'url': item.get('url', ''),
+                'url': url,
                 'title': title,
                 'price': price,
                 'price_unit': price_unit,
@@ -274,68 +355,130 @@ Answer:
                 'details': details,
                 'seller_info': seller_info,
                 'company_info': company_info,
-                'reviews': reviews
+                'reviews': reviews,
+                'category': category or item.get('category') or item.get('search_query') or 'general',
+                **normalize_price(item, f"{category or ''} {title}")
             })
    
     def build_faiss_index(self):
         if not self.documents:
-            st.error("No documents to index! Check filtered_products.json.")
-            return
+            raise ValueError(f"No documents to index! Check {self.json_file}.")
            
-        st.write("Building FAISS index...")
+        logger.info("Building FAISS index...")
+        from shards import ShardedIndex
        
         embeddings = self.embedding_model.encode(self.documents, show_progress_bar=True)
+        self.embeddings = np.array(embeddings).astype('float32')
        
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(np.array(embeddings).astype('float32'))
+        self.vendor_index = VendorIndex.build(self.metadata, self.embeddings)
+        self.material_matches = MaterialMatches.refresh(
+            catalog_material_names(MATERIAL_CATALOG), [product_key(meta) for meta in self.metadata], self.embeddings,
+            lambda texts: self.embedding_model.encode(texts), self.embedding_model_name)
+        self.price_index = PriceIndex.build(self.metadata, self.material_matches)
+        self.index = ShardedIndex.build(self.metadata, self.embeddings, self.material_matches,
+                                        compression=INDEX_COMPRESSION, pca_dims=INDEX_PCA_DIMS)
+        metrics.INDEX_DOCUMENTS.set(len(self.documents))
+        metrics.INDEX_SHARDS.set(len(self.index))
        
-        st.write("FAISS index built successfully")
+        logger.info("FAISS index built successfully (%d category shards, %d vendors)", len(self.index), len(self.vendor_index))
    
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embeddings for a batch of queries; cache misses are encoded together in one call"""
+        embeddings: Dict[str, np.ndarray] = {}
+        with self._cache_lock:
+            for query in queries:
+                if query in self._query_embeddings:
+                    self._query_embeddings.move_to_end(query)
+                    embeddings[query] = self._query_embeddings[query]
+        missing = list(dict.fromkeys(q for q in queries if q not in embeddings))
+        metrics.CACHE_LOOKUPS.inc(len(queries) - len(missing), cache="query_embedding", result="hit")
+        metrics.CACHE_LOOKUPS.inc(len(missing), cache="query_embedding", result="miss")
+        if missing:
+            metrics.EMBED_BATCH_SIZE.observe(len(missing))
+            with tracing.span("embed", queries=len(missing)):
+                encoded = np.asarray(self.embedding_model.encode(missing), dtype='float32')
+            with self._cache_lock:
+                for query, embedding in zip(missing, encoded):
+                    embeddings[query] = embedding.reshape(1, -1)
+                    self._query_embeddings[query] = embeddings[query]
+                while len(self._query_embeddings) > QUERY_CACHE_SIZE:
+                    self._query_embeddings.popitem(last=False)
+        return np.vstack([embeddings[query] for query in queries]).astype('float32')
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        return self._encode_queries([query])
+
+    def search_batch(self, queries: List[str], k: int = 5, shards: List[str] = None) -> List[List[Dict[str, Any]]]:
+        """search() for many queries with one encode call and one index search, optionally over some shards only"""
         if self.index is None or len(self.documents) == 0:
             raise ValueError("Index not built or no documents loaded")
+        if not queries:
+            return []
        
         k = min(k, len(self.documents))
+        query_embeddings = self._encode_queries(queries)
+        with tracing.span("faiss.search", queries=len(queries), k=k, shards=len(shards) if shards else len(self.index)):
+            distances, indices = self.index.search(query_embeddings, k, shards)
        
-        query_embedding = self.embedding_model.encode([query])
-       
-        distances, indices = self.index.search(np.array(query_embedding).astype('float32'), k)
+        batch = []
+        for row_distances, row_indices in zip(distances, indices):
+            batch.append([{
+                'document': self.documents[idx],
+                'metadata': self.metadata[idx],
+                'distance': float(distance)
+            } for distance, idx in zip(row_distances, row_indices) if 0 <= idx < len(self.metadata)])
+        return batch
+
+    def search(self, query: str, k: int = 5, intent: QueryIntent = None) -> List[Dict[str, Any]]:
+        """Nearest products; with an intent, only the category shards it is routed to are searched"""
+        shards = self.index.route(intent) if intent is not None and self.index is not None else None
+        return self.search_batch([query], k, shards)[0]
+   
+    def match_products(self, material: str, k: int = 1) -> List[Dict[str, Any]]:
+        """Precomputed best products for a catalog material; empty if the material is not in the table"""
+        if self.material_matches is None:
+            return []
+        hits = self.material_matches.lookup(material, k)
+        metrics.CACHE_LOOKUPS.inc(cache="material_matches", result="hit" if hits else "miss")
+        return [{
+            'document': self.documents[product_id],
+            'metadata': self.metadata[product_id],
+            'distance': 1.0 - score
+        } for product_id, score in hits]
+   
+    def search_vendors(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Search the vendor index; each hit carries the vendor aggregate and its best-matching product"""
+        if self.vendor_index is None:
+            raise ValueError("Index not built or no documents loaded")
        
+        query_embedding = self._encode_query(query)
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.metadata):
-                results.append({
-                    'document': self.documents[idx],
-                    'metadata': self.metadata[idx],
-                    'distance': float(distances[0][i])
-                })
-       
+        for vendor, score in self.vendor_index.search(query_embedding, k):
+            product_id = self.vendor_index.best_product(vendor, self.embeddings, query_embedding)
+            results.append({
+                'document': self.documents[product_id],
+                'metadata': self.metadata[product_id],
+                'vendor': vendor,
+                'distance': 1.0 - score
+            })
         return results
    
-    def filter_by_criteria(self, results: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+    def parse_query(self, query: str) -> QueryIntent:
+        return self.intent_parser.parse(query)
+   
+    def filter_by_criteria(self, results: List[Dict[str, Any]], query: Union[str, QueryIntent]) -> List[Dict[str, Any]]:
         filtered_results = []
+        intent = query if isinstance(query, QueryIntent) else self.parse_query(query)
        
         for result in results:
             metadata = result['metadata']
             company_info = metadata.get('company_info', {})
-            seller_info = metadata.get('seller_info', {})
             details = metadata.get('details', {})
            
-            if "in " in query.lower() or "navi mumbai" in query.lower():
-                location_match = re.search(r'in\s+([\w\s]+)$', query.lower())
-                location = "navi mumbai" if "navi mumbai" in query.lower() else None
-                if location_match and not location:
-                    location = location_match.group(1).strip()
-               
-                if location:
-                    address = (str(company_info.get('full_address', '')) + " " + 
-                               str(seller_info.get('full_address', '')) + " " + 
-                               str(details.get('location', ''))).lower()
-                    if location.lower() not in address:
-                        continue
+            if intent.location_filter and not matches_location(metadata, intent.location_filter):
+                continue
            
-            if "gst after 2017" in query.lower():
+            if intent.gst_after_2017:
                 gst_date = company_info.get('gst_registration_date', '')
                 if gst_date:
                     try:
@@ -347,7 +490,7 @@ Answer:
                 else:
                     continue
            
-            if "high rating" in query.lower() or "rating" in query.lower():
+            if intent.high_rating:
                 reviews = metadata.get('reviews', [])
                 overall_rating = None
                 for review in reviews:
@@ -361,12 +504,12 @@ Answer:
                 if overall_rating is None or overall_rating < 4.0:
                     continue
            
-            if "available in stock" in query.lower() or "in stock" in query.lower():
+            if intent.in_stock:
                 availability = str(details.get('availability', '')).lower()
                 if 'in stock' not in availability:
                     continue
            
-            if "fire retardant" in query.lower() or "fireproof" in query.lower():
+            if intent.fire_retardant:
                 details_text = str(details).lower() + " " + str(metadata.get('description', '')).lower()
                 if 'fire retardant' not in details_text and 'fireproof' not in details_text:
                     continue
@@ -375,105 +518,43 @@ Answer:
        
         return filtered_results
    
+    def resolve_vendors(self, material: str, location: str = None, k: int = 3, criteria: str = "") -> List[Dict[str, Any]]:
+        """Ranked vendor records for a material, read from metadata without calling the LLM.
+
+        `criteria` is filter text in the same form filter_by_criteria understands (e.g.
+        "high rating GST after 2017 available in stock"). Vendors meeting it rank first;
+        the rest fill up to k so a strict filter never leaves a material without vendors.
+        """
+        search_query = f"{material} suppliers in {location}" if location else f"{material} suppliers"
+        candidates = self.search(search_query, k=max(k * 10, 20), intent=self.parse_query(search_query))
+        matching = self.filter_by_criteria(candidates, f"{criteria} in {location}" if location else criteria)
+        matching_ids = {id(result) for result in matching}
+        
+        records = []
+        seen = set()
+        for result in matching + [r for r in candidates if id(r) not in matching_ids]:
+            key = vendor_key(result['metadata'])
+            if key in seen:
+                continue
+            seen.add(key)
+            record = vendor_record(result['metadata'], result['distance'])
+            record['matches_criteria'] = id(result) in matching_ids
+            records.append(record)
+            if len(records) == k:
+                break
+        return records
+   
     def extract_project_requirements(self, query: str) -> Dict[str, Any]:
-        requirements = {
-            "power_capacity": None,
-            "built_up_area": None,
-            "project_volume": None,
-            "location": None,
-            "facility_type": extract_facility_type(query),
-            "materials": {}
-        }
-       
-        power_match = re.search(r'(\d+)\s*Mega?Watt', query, re.IGNORECASE)
-        if power_match:
-            requirements["power_capacity"] = float(power_match.group(1))
-       
-        area_match = re.search(r'(\d+)\s*Lacs?\s*SquareFoot', query, re.IGNORECASE)
-        if area_match:
-            requirements["built_up_area"] = float(area_match.group(1)) * 100000
-       
-        volume_match = re.search(r'(\d+)\s*Cr\s*(in\s*Rupees)?', query, re.IGNORECASE)
-        if volume_match:
-            requirements["project_volume"] = float(volume_match.group(1)) * 10000000
-       
-        location_match = re.search(r'in\s+([\w\s]+)$', query, re.IGNORECASE)
-        if location_match:
-            requirements["location"] = location_match.group(1).strip()
-       
-        if "navi mumbai" in query.lower():
-            requirements["location"] = "Navi Mumbai"
-       
-        return requirements
+        return self.parse_query(query).requirements()
    
     def estimate_material_requirements(self, requirements: Dict[str, Any]) -> List[Dict[str, Any]]:
-        materials = []
-        facility_type = requirements.get("facility_type", "Workspace")
-        catalog = MATERIAL_CATALOG.get(facility_type, MATERIAL_CATALOG.get("Workspace", {}))
-        
-        if requirements.get("built_up_area"):
-            area = requirements["built_up_area"]
-            
-            # Use catalog for Cement
-            cement_specific = next((mat for cat in catalog.values() for mat in cat if 'concrete' in mat.lower()), "Reinforced Concrete (Foundation, Slabs)")
-            cement_bags = area * 0.4
-            cement_cubic_meters = cement_bags / 30
-            materials.append({
-                "Material/Equipment": f"Cement - {cement_specific}",
-                "Quantity": f"{cement_cubic_meters:.0f} Cubic Meters",
-                "Unit Cost (Rupees)": f"{(cement_cubic_meters * 6000 / 100000):.2f} Crores",
-                "Notes": "Based on standard construction norms (0.4 bags per square foot)",
-                "catalog_source": cement_specific
-            })
-            
-            # Use catalog for Bricks
-            bricks_specific = next((mat for cat in catalog.values() for mat in cat if 'masonry' in mat.lower() or 'cladding' in mat.lower()), "Concrete Masonry Unit (CMU)")
-            bricks = area * 8
-            materials.append({
-                "Material/Equipment": f"Bricks - {bricks_specific}",
-                "Quantity": f"{bricks:.0f} Units",
-                "Unit Cost (Rupees)": f"{(bricks * 0.08 / 100000):.2f} Crores",
-                "Notes": "Based on standard construction norms (8 bricks per square foot)",
-                "catalog_source": bricks_specific
-            })
-        
-        if requirements.get("power_capacity"):
-            power = requirements["power_capacity"]
-            
-            # Use catalog for Switchgear
-            switchgear_specific = next((mat for cat in catalog.values() for mat in cat if 'electrical' in mat.lower() or 'power' in mat.lower()), "Electrical Infrastructure")
-            switchgear_lineups = max(5, power / 2.5)
-            materials.append({
-                "Material/Equipment": f"Medium Voltage Switchgear - {switchgear_specific}",
-                "Quantity": f"{switchgear_lineups:.0f} LineUps",
-                "Unit Cost (Rupees)": f"{switchgear_lineups * 0.2:.2f} Crores",
-                "Notes": f"Based on power capacity of {power} MW",
-                "catalog_source": switchgear_specific
-            })
-            
-            # Use catalog for Transformers
-            transformer_specific = next((mat for cat in catalog.values() for mat in cat if 'power' in mat.lower() or 'emergency' in mat.lower()), "Emergency Power Systems")
-            transformer_units = max(3, power / 5)
-            transformer_capacity = power / transformer_units
-            materials.append({
-                "Material/Equipment": f"Transformers - {transformer_specific}",
-                "Quantity": f"{transformer_units:.0f} Units ({transformer_capacity:.1f}MVA)",
-                "Unit Cost (Rupees)": f"{transformer_units * 6.67:.2f} Crores",
-                "Notes": f"Based on power capacity of {power} MW",
-                "catalog_source": transformer_specific
-            })
-            
-            # Use catalog for Chillers
-            chiller_specific = next((mat for cat in catalog.values() for mat in cat if 'hvac' in mat.lower() or 'cooling' in mat.lower()), "HVAC Systems")
-            cooling_units = max(10, power * 2)
-            materials.append({
-                "Material/Equipment": f"Chillers / CRAHs / CRACs - {chiller_specific}",
-                "Quantity": f"{cooling_units:.0f} Units",
-                "Unit Cost (Rupees)": f"{cooling_units * 0.3:.2f} Crores",
-                "Notes": f"Based on power capacity of {power} MW",
-                "catalog_source": chiller_specific
-            })
-        
+        """Every catalog material for the facility type, sized from historical invoice coefficients"""
+        materials = load_material_estimator().estimate(requirements)
+        if self.price_index is not None:
+            for material in materials:
+                market = self.price_index.lookup(material['catalog_source'])
+                if market:
+                    material["Market Price (Rupees)"] = f"{market['median']:.2f} per {market['unit']} (IQR {market['p25']:.2f}-{market['p75']:.2f}, {market['n']} listings)"
         return materials
    
     def format_material_table(self, materials: List[Dict[str, Any]]) -> str:
@@ -505,27 +586,46 @@ Answer:
         
         return table
 
-    def query(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
-        requirements = self.extract_project_requirements(query)
+    @tracing.traced("rag.retrieve_context")
+    def retrieve_context(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
+        with tracing.span("intent.parse"):
+            intent = self.parse_query(query)
+        requirements = intent.requirements()
         material_estimates = []
        
         if any([requirements["power_capacity"], requirements["built_up_area"], requirements["project_volume"]]):
-            material_estimates = self.estimate_material_requirements(requirements)
+            with tracing.span("estimate_materials", facility_type=requirements["facility_type"]):
+                material_estimates = self.estimate_material_requirements(requirements)
        
-        search_results = self.search(query, k=k)
+        with tracing.span("search", k=k, vendors=bool(intent.supplier_query)) as search_span:
+            if intent.supplier_query and self.vendor_index is not None:
+                search_results = self.search_vendors(query, k=k)
+            else:
+                search_results = self.search(query, k=k, intent=intent)
+            search_span.set_attribute("results", len(search_results))
        
         if apply_filters:
-            filtered_results = self.filter_by_criteria(search_results, query)
+            with tracing.span("filter_by_criteria", candidates=len(search_results)):
+                filtered_results = self.filter_by_criteria(search_results, intent)
         else:
             filtered_results = search_results
 
         facility_type = requirements.get("facility_type", "Workspace")
         catalog_materials = get_catalog_materials(facility_type)
        
-        response = self.generate_response(query, filtered_results, requirements, material_estimates, catalog_materials)
-       
         sources = [result['metadata']['url'] for result in filtered_results if result['metadata']['url']]
-       
+
+        return {
+            'results': filtered_results,
+            'sources': sources,
+            'num_results': len(filtered_results),
+            'material_estimates': material_estimates,
+            'catalog_materials': catalog_materials,
+            'requirements': requirements
+        }
+
+    def _result(self, context: Dict[str, Any], response: str) -> Dict[str, Any]:
+        material_estimates = context['material_estimates']
         final_response = response
         if material_estimates:
             table = self.format_material_table(material_estimates)
@@ -533,57 +633,52 @@ Answer:
        
         return {
             'answer': final_response,
-            'sources': sources,
-            'num_results': len(filtered_results),
+            'sources': context['sources'],
+            'num_results': context['num_results'],
             'material_estimates': material_estimates,
-            'requirements': requirements
+            'requirements': context['requirements']
         }
 
+    @tracing.traced("rag.query")
+    def query(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
+        metrics.QUERIES.inc(kind="query")
+        context = self.retrieve_context(query, k=k, apply_filters=apply_filters)
+        response = self.generate_response(query, context['results'], context['requirements'], context['material_estimates'], context['catalog_materials'])
+        return self._result(context, response)
+
+    @tracing.traced("rag.stream_query")
+    def stream_query(self, query: str, k: int = 10, apply_filters: bool = True) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """Like query(), but returns the result dict without an answer plus a token stream for it"""
+        metrics.QUERIES.inc(kind="stream_query")
+        context = self.retrieve_context(query, k=k, apply_filters=apply_filters)
+        stream = self.stream_response(query, context['results'], context['requirements'], context['material_estimates'], context['catalog_materials'])
+        return self._result(context, ""), stream
+
 def generate_missing_ml_files():
-    """Generate missing ML files from clean_train_full.csv if not present"""
+    """Fit the legacy preprocessing files from clean_train_full.csv if neither they nor a trained bundle exist.
+
+    Only the featurizer is fitted here, streaming the CSV in chunks; the models themselves come from `python train.py`.
+    Runs on the warm-up thread, so it logs and raises rather than writing to the page.
+    """
+    import model_bundle
+    if model_bundle.latest_version() is not None:
+        return
     if os.path.exists('tfidf_vectorizer.pkl') and os.path.exists('numeric_imputer.pkl') and os.path.exists('date_imputer.pkl') and os.path.exists('categorical_mapping.pkl'):
         return
     
-    try:
-        st.info("Generating missing ML files from clean_train_full.csv...")
-        df = pd.read_csv('clean_train_full.csv')
-        
-        # TF-IDF matching ipynb
-        df['ItemDescription_clean'] = df['ItemDescription'].fillna('').astype(str).str.lower().str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
-        tfidf = TfidfVectorizer(max_features=30000, ngram_range=(1,2), min_df=2, stop_words='english', dtype=np.float32)
-        tfidf.fit(df['ItemDescription_clean'])
-        joblib.dump(tfidf, 'tfidf_vectorizer.pkl')
-        
-        # Numeric imputer
-        numeric_cols = ['ExtendedQuantity', 'UnitPrice', 'ExtendedPrice', 'invoiceTotal']
-        df_numeric = df[numeric_cols].fillna(0)
-        num_imputer = SimpleImputer(strategy='mean')
-        num_imputer.fit(df_numeric)
-        joblib.dump(num_imputer, 'numeric_imputer.pkl')
-        
-        # Date imputer (dummy)
-        date_features = ['construction_duration_days', 'invoice_year', 'invoice_month', 'invoice_day', 'invoice_dayofweek', 'invoice_quarter']
-        date_df = pd.DataFrame(np.random.rand(1, len(date_features)), columns=date_features)
-        date_imputer = SimpleImputer(strategy='mean')
-        date_imputer.fit(date_df)
-        joblib.dump(date_imputer, 'date_imputer.pkl')
-        
-        # Categorical mapping
-        cat_cols = ['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE', 'UOM']
-        categorical_mapping = {}
-        for col in cat_cols:
-            if col in df.columns:
-                top_cats = df[col].fillna('missing').value_counts().head(10).index.tolist()
-                categorical_mapping[col] = top_cats
-        joblib.dump(categorical_mapping, 'categorical_mapping.pkl')
-        
-        # Date and numeric feature names
-        joblib.dump(date_features, 'date_feature_names.pkl')
-        joblib.dump(numeric_cols, 'numeric_feature_names.pkl')
-        
-        st.success("ML files generated!")
-    except Exception as e:
-        st.error(f"Failed to generate ML files: {str(e)}. Using fallback for ML.")
+    import joblib
+    from features import Featurizer, NUMERIC_FEATURES, read_chunks
+    logger.info("Generating missing ML files from clean_train_full.csv...")
+    featurizer = Featurizer.fit_chunks(read_chunks('clean_train_full.csv'))
+    joblib.dump(featurizer.tfidf, 'tfidf_vectorizer.pkl')
+    joblib.dump(featurizer.numeric_imputer, 'numeric_imputer.pkl')
+    joblib.dump(featurizer.date_imputer, 'date_imputer.pkl')
+    joblib.dump(featurizer.categorical_mapping, 'categorical_mapping.pkl')
+    joblib.dump(featurizer.date_feature_names, 'date_feature_names.pkl')
+    joblib.dump(NUMERIC_FEATURES, 'numeric_feature_names.pkl')
+    
+    load_ml_artifacts.cache_clear()
+    logger.info("ML files generated")
 
 def check_files():
     files = [
@@ -622,176 +717,96 @@ def clean_numeric_value(value, clip_negative=True, replace_zero_epsilon=False):
    
     return value
 
-def clean_text_value(text):
-    if pd.isna(text) or text is None:
-        return "missing"
-   
-    text = str(text).strip().lower()
-    text = text.replace('\n', ' ').replace('\r', ' ')
-    text = ''.join([c if c.isalnum() or c.isspace() else ' ' for c in text])
-    text = ' '.join(text.split())
-   
-    return text
+@functools.lru_cache(maxsize=1)
+def load_ml_artifacts() -> Dict[str, Any]:
+    """Load the ML artifacts once per process; shared by every prediction.
 
-def prepare_date_features(input_data, date_feature_names):
-    date_features = {}
-   
-    if 'CONSTRUCTION_START_DATE' in input_data and 'SUBSTANTIAL_COMPLETION_DATE' in input_data:
-        try:
-            start_str = input_data.get('CONSTRUCTION_START_DATE', '')
-            end_str = input_data.get('SUBSTANTIAL_COMPLETION_DATE', '')
-            if start_str and end_str:
-                start_date = pd.to_datetime(start_str, errors='coerce')
-                end_date = pd.to_datetime(end_str, errors='coerce')
-                if not pd.isna(start_date) and not pd.isna(end_date):
-                    duration = (end_date - start_date).days
-                    date_features['construction_duration_days'] = duration
-        except:
-            pass
-   
-    if 'invoiceDate' in input_data:
+    The LATEST bundle from train.py wins; the loose .pkl files are the fallback. Either way
+    every model is checked against the featurizer's FeatureSchema here, once: a bundle that
+    does not match raises, and a loose model that does not match is left out (listed in
+    'schema_errors') instead of being fed padded or truncated rows.
+    """
+    import model_bundle
+    bundle = model_bundle.load_bundle()
+    if bundle is not None:
+        artifacts, manifest = bundle
+        return {**artifacts, 'manifest': manifest, 'schema_errors': [],
+                'available_files': [f"{model_bundle.MODELS_DIR}/{manifest['version']}"]}
+    
+    available_files, missing_files = check_files()
+    artifacts = {'available_files': available_files, 'schema_errors': []}
+    
+    required = ['tfidf_vectorizer.pkl', 'numeric_imputer.pkl', 'date_imputer.pkl']
+    if not all(f in available_files for f in required):
+        return artifacts
+    
+    import joblib
+    import pandas as pd
+    from feature_schema import FeatureSchemaError
+    from features import DATE_FEATURES, Featurizer
+    featurizer = Featurizer(
+        joblib.load('tfidf_vectorizer.pkl'), joblib.load('numeric_imputer.pkl'), joblib.load('date_imputer.pkl'),
+        joblib.load('categorical_mapping.pkl') if 'categorical_mapping.pkl' in available_files else {},
+        joblib.load('date_feature_names.pkl') if 'date_feature_names.pkl' in available_files else DATE_FEATURES
+    )
+    artifacts['featurizer'] = featurizer
+    artifacts['det_items'] = joblib.load('deterministic_mapping.pkl') if 'deterministic_mapping.pkl' in available_files else pd.Series(dtype=object)
+    
+    models = {'lgb_regressor': ['lgb_regressor.pkl'], 'lgb_classifier': ['lgb_classifier.pkl', 'label_encoder.pkl']}
+    for name, files in models.items():
+        if not all(f in available_files for f in files):
+            continue
+        model = joblib.load(files[0])
         try:
-            invoice_str = input_data.get('invoiceDate', '')
-            if invoice_str:
-                invoice_date = pd.to_datetime(invoice_str, errors='coerce')
-                if not pd.isna(invoice_date):
-                    date_features['invoice_year'] = invoice_date.year
-                    date_features['invoice_month'] = invoice_date.month
-                    date_features['invoice_day'] = invoice_date.day
-                    date_features['invoice_dayofweek'] = invoice_date.dayofweek
-                    date_features['invoice_quarter'] = invoice_date.quarter
-        except:
-            pass
-   
-    date_df = pd.DataFrame(columns=date_feature_names)
-   
-    for feature in date_feature_names:
-        if feature in date_features:
-            date_df.at[0, feature] = date_features[feature]
-        else:
-            date_df.at[0, feature] = np.nan
-   
-    return date_df
-
-def prepare_features(input_data, tfidf_vectorizer, numeric_imputer, date_imputer, categorical_mapping, date_feature_names):
-    cleaned_desc = clean_text_value(input_data.get('ItemDescription', ''))
-    X_text = tfidf_vectorizer.transform([cleaned_desc])
-   
-    numeric_features = ['ExtendedQuantity', 'UnitPrice', 'ExtendedPrice', 'invoiceTotal']
-    numeric_values = []
-   
-    for feat in numeric_features:
-        value = input_data.get(feat, 0)
-        cleaned_value = clean_numeric_value(value, replace_zero_epsilon=(feat in ['UnitPrice', 'ExtendedPrice']))
-        if cleaned_value is None or np.isnan(cleaned_value):
-            cleaned_value = 0
-        numeric_values.append(cleaned_value)
-   
-    numeric_values = [np.log1p(x) if x >= 0 else 0 for x in numeric_values]
-    X_numeric = numeric_imputer.transform([numeric_values])
-   
-    date_df = prepare_date_features(input_data, date_feature_names)
-    X_date = date_imputer.transform(date_df)
-   
-    cat_cols = ['PROJECT_CITY', 'STATE', 'PROJECT_COUNTRY', 'CORE_MARKET', 'PROJECT_TYPE', 'UOM']
-    cat_features = []
-   
-    for c in cat_cols:
-        value = str(input_data.get(c, 'missing')).lower().strip()
-        if c in categorical_mapping:
-            top_categories = categorical_mapping[c]
-            if value in top_categories:
-                cat_features.extend([1 if value == cat else 0 for cat in top_categories])
-                cat_features.append(0)
-            else:
-                cat_features.extend([0] * len(top_categories))
-                cat_features.append(1)
-        else:
-            cat_features.extend([0] * 5)
-            cat_features.append(1)
-   
-    X_categorical = np.array([cat_features])
-   
-    X_combined = sparse.hstack([
-        X_text,
-        sparse.csr_matrix(X_numeric),
-        sparse.csr_matrix(X_date),
-        sparse.csr_matrix(X_categorical)
-    ]).tocsr()
-   
-    return X_combined
+            featurizer.schema.validate_model(model, name)
+        except FeatureSchemaError as e:
+            artifacts['schema_errors'].append(str(e))
+            continue
+        artifacts[name] = model
+        if name == 'lgb_classifier':
+            artifacts['label_encoder'] = joblib.load('label_encoder.pkl')
+    
+    return artifacts
 
+@tracing.traced("ml.predict")
 def run_ml_prediction(input_data: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        available_files, missing_files = check_files()
-       
-        if 'tfidf_vectorizer.pkl' not in available_files:
-            return {'error': 'TFIDF vectorizer missing - run generate_missing_ml_files()'}
-       
-        tfidf_vectorizer = joblib.load('tfidf_vectorizer.pkl')
-        numeric_imputer = joblib.load('numeric_imputer.pkl') if 'numeric_imputer.pkl' in available_files else None
-        date_imputer = joblib.load('date_imputer.pkl') if 'date_imputer.pkl' in available_files else None
-        categorical_mapping = joblib.load('categorical_mapping.pkl') if 'categorical_mapping.pkl' in available_files else {}
-       
-        det_items = joblib.load('deterministic_mapping.pkl') if 'deterministic_mapping.pkl' in available_files else pd.Series()
-       
-        date_feature_names = joblib.load('date_feature_names.pkl') if 'date_feature_names.pkl' in available_files else [
-            'construction_duration_days', 'invoice_year', 'invoice_month',
-            'invoice_day', 'invoice_dayofweek', 'invoice_quarter'
-        ]
-       
-        regression_available = 'lgb_regressor.pkl' in available_files
-        if regression_available:
-            lgb_regressor = joblib.load('lgb_regressor.pkl')
+        with tracing.span("ml.load_artifacts"):
+            artifacts = load_ml_artifacts()
        
-        classification_available = all(f in available_files for f in ['lgb_classifier.pkl', 'label_encoder.pkl'])
-        if classification_available:
-            lgb_classifier = joblib.load('lgb_classifier.pkl')
-            label_encoder = joblib.load('label_encoder.pkl')
-       
-        if not numeric_imputer or not date_imputer:
-            return {'error': 'Missing numeric_imputer.pkl or date_imputer.pkl'}
+        if 'featurizer' not in artifacts:
+            return {'error': 'TFIDF vectorizer or imputers missing - run train.py or generate_missing_ml_files()'}
         
-        X_features = prepare_features(input_data, tfidf_vectorizer, numeric_imputer,
-                                      date_imputer, categorical_mapping, date_feature_names)
+        import pandas as pd
+        from features import clean_text
+        with tracing.span("ml.prepare_features"):
+            # Built directly in the layout the models were validated against at load time
+            X_features = artifacts['featurizer'].transform_record(input_data)
        
-        cleaned_desc = clean_text_value(input_data.get('ItemDescription', ''))
+        cleaned_desc = clean_text(pd.Series([input_data.get('ItemDescription')])).iat[0]
+        det_items = artifacts['det_items']
        
         if cleaned_desc in det_items.index:
             master_item_no = det_items[cleaned_desc]
             prediction_method = "deterministic"
-        elif classification_available:
-            X_dense = X_features.toarray()
-            # Fix feature mismatch by padding if necessary
-            expected_features = getattr(lgb_classifier, 'n_features_in_', 0)
-            if X_dense.shape[1] < expected_features:
-                padding = np.zeros((X_dense.shape[0], expected_features - X_dense.shape[1]))
-                X_dense = np.hstack((X_dense, padding))
-            elif X_dense.shape[1] > expected_features:
-                X_dense = X_dense[:, :expected_features]
-            pred_encoded = lgb_classifier.predict(X_dense)
-            pred_processed = label_encoder.inverse_transform(pred_encoded)
-            master_item_no = pred_processed[0]
+        elif 'lgb_classifier' in artifacts:
+            with tracing.span("ml.classify"):
+                pred_encoded = artifacts['lgb_classifier'].predict(X_features)
+                master_item_no = artifacts['label_encoder'].inverse_transform(pred_encoded)[0]
             prediction_method = "classification_model"
         else:
             master_item_no = "unknown"
             prediction_method = "no_model"
        
-        if regression_available:
-            X_dense = X_features.toarray()
-            # Fix feature mismatch for regressor
-            expected_features_reg = getattr(lgb_regressor, 'n_features_in_', 0)
-            if X_dense.shape[1] < expected_features_reg:
-                padding = np.zeros((X_dense.shape[0], expected_features_reg - X_dense.shape[1]))
-                X_dense = np.hstack((X_dense, padding))
-            elif X_dense.shape[1] > expected_features_reg:
-                X_dense = X_dense[:, :expected_features_reg]
-            qty_shipped = lgb_regressor.predict(X_dense)[0]
-            qty_shipped = max(1, int(qty_shipped))
+        if 'lgb_regressor' in artifacts:
+            with tracing.span("ml.regress"):
+                qty_shipped = max(1, int(artifacts['lgb_regressor'].predict(X_features)[0]))
         else:
             extended_qty = clean_numeric_value(input_data.get('ExtendedQuantity', 1))
             qty_shipped = max(1, int(extended_qty)) if extended_qty else 1
        
+        tracing.current_span().set_attribute("prediction_method", prediction_method)
+        metrics.ML_PREDICTIONS.inc(method=prediction_method)
         return {
             'master_item_no': master_item_no,
             'qty_shipped': qty_shipped,
@@ -799,25 +814,34 @@ def run_ml_prediction(input_data: Dict[str, Any]) -> Dict[str, Any]:
         }
        
     except Exception as e:
+        metrics.ML_PREDICTIONS.inc(method="error")
         return {'error': str(e)}
 
 def generate_ml_input_from_rag(rag: IndiaMART_RAG, query: str, material: str, estimated_qty: float, catalog_source: str = None) -> tuple[Dict[str, Any], Dict[str, Any]]:
     requirements = rag.extract_project_requirements(query)
-    location = requirements.get("location", "Navi Mumbai")
-    state = "Maharashtra" if "navi mumbai" in location.lower() else "Maharashtra"
+    location = requirements.get("location") or "Navi Mumbai"
     
-    # Refine search with catalog
-    search_query = f"{material} {catalog_source or ''} suppliers {location}" if catalog_source else f"{material} suppliers {location}"
-    search_results = rag.search(search_query, k=1)
+    # Catalog materials resolve through the precomputed match table; free-text materials fall back to search
+    search_results = rag.match_products(catalog_source or material, k=1)
+    if not search_results:
+        search_query = f"{material} {catalog_source or ''} suppliers {location}" if catalog_source else f"{material} suppliers {location}"
+        search_results = rag.search(search_query, k=1)
     
     if not search_results:
         search_query = f"{material} {catalog_source or ''} suppliers"
         search_results = rag.search(search_query, k=1)
     
+    # Without a listed price, use the material's (or the product category's) median market price
+    category = search_results[0]['metadata'].get('category') if search_results else None
+    market = rag.price_index.lookup(catalog_source or material, category) if rag.price_index else None
+    fallback_price = market['median'] if market else DEFAULT_UNIT_PRICE
+    fallback_unit = market['unit'] if market else "Units"
+    
     real_product_data = {
         "ItemDescription": f"{material} - {catalog_source or 'for construction project'}",
-        "UnitPrice": 1000.0,
-        "price_unit": "Units",
+        "UnitPrice": fallback_price,
+        "ExtendedPrice": fallback_price * estimated_qty,
+        "price_unit": fallback_unit,
         "product_details": f"Catalog: {catalog_source or 'No catalog match'} - No matching product found"
     }
     
@@ -826,15 +850,16 @@ def generate_ml_input_from_rag(rag: IndiaMART_RAG, query: str, material: str, es
         title = metadata.get('title', material)
         description = metadata.get('description', '')
         price = metadata.get('price', '')
-        price_unit = metadata.get('price_unit', 'Units')
         details = metadata.get('details', {})
         
         real_desc = f"{title} - {description[:200]}... Details: {', '.join([f'{k}:{v}' for k, v in list(details.items())[:3]])} (Catalog: {catalog_source or 'N/A'})"
         
-        try:
-            real_price = float(price) if price else 1000.0
-        except (ValueError, TypeError):
-            real_price = 1000.0
+        # Per canonical unit, like the PriceIndex fallback, so every ML input price is comparable
+        if metadata.get('unit_price') is not None:
+            real_price = metadata['unit_price']
+            price_unit = metadata.get('canonical_unit') or 'Units'
+        else:
+            real_price, price_unit = fallback_price, fallback_unit
         
         real_product_data = {
             "ItemDescription": real_desc,
@@ -854,7 +879,7 @@ def generate_ml_input_from_rag(rag: IndiaMART_RAG, query: str, material: str, es
         "SUBSTANTIAL_COMPLETION_DATE": "2026-12-31",
         "invoiceDate": "2025-09-14",
         "PROJECT_CITY": location,
-        "STATE": state,
+        "STATE": "Maharashtra",
         "PROJECT_COUNTRY": "India",
         "CORE_MARKET": "Construction",
         "PROJECT_TYPE": "Commercial",
@@ -864,199 +889,153 @@ def generate_ml_input_from_rag(rag: IndiaMART_RAG, query: str, material: str, es
     st.info(f"✅ Real ML input for {material}: {real_product_data['product_details']}")
     return input_data, real_product_data
 
-def generate_timeline(materials: List[Dict], query: str, groq_api_key: str) -> str:
-    material_list = "\n".join([f"- {m['Material/Equipment']}: {m['Quantity']}" for m in materials])
-    prompt = f"""
-Date: October 05, 2025
+def build_timeline_commentary_prompt(query: str, timeline_markdown: str) -> str:
+    return f"""
 Project: {query[:200]}
-Materials (with catalog specifics):
-{material_list}
-
-Generate a COMPLETE procurement timeline in this exact structured format. IMPORTANT: Generate the ENTIRE timeline without truncation. Use industry-standard lead times for catalog materials.
 
-Output of Procurement Timeline:
+This procurement timeline was computed from lead-time tables by backward scheduling from the construction schedule:
+{timeline_markdown}
 
-Procurement Timeline by Major Categories
-1. Electrical Equipment
-Item Lead Time Order By Delivery Window Notes
-Transformers 50 weeks Feb 1, 2026 Dec 2026 Potential delays
-Switchgear 40 weeks Mar 1, 2026 Nov 2026 Custom fabrication
-Cables 20 weeks May 1, 2026 Sep 2026 Bulk order
-
-2. Mechanical Equipment  
-Item Lead Time Order By Delivery Window Notes
-Cement In-stock Immediate Immediate Standard material
-Bricks 4 weeks Oct 1, 2025 Oct 2025 Local supplier
-Chillers 30 weeks Apr 1, 2026 Nov 2026 Custom size
-
-Ensure ALL categories are complete and include all materials from the list.
+In at most 150 words, comment on the procurement risks: critical items, long-lead equipment and what to order first.
+Do not change or restate any dates.
 """
-    try:
-        headers = {
-            "Authorization": f"Bearer {groq_api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 4096,
-            "temperature": 0.3
-        }
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        data = response.json()
-        if 'choices' in data and len(data['choices']) > 0:
-            content = data['choices'][0]['message']['content']
-            if "..." in content or "truncated" in content:
-                st.warning("Timeline may be incomplete. Consider regenerating.")
-            return content
-        st.error("Invalid API response for timeline.")
-        return "Error: Invalid API response."
-    except Exception as e:
-        st.error(f"Timeline generation error: {str(e)}")
-        return f"Error: {str(e)}"
 
-def generate_schedule(materials: List[Dict], query: str, groq_api_key: str) -> str:
-    material_list = "\n".join([f"- {m['Material/Equipment']}: {m['Quantity']}" for m in materials])
-    prompt = f"""
-Date: October 05, 2025
+def build_schedule_prompt(materials: List[Dict], query: str, start=None) -> str:
+    start = schedule.project_start(start)
+    material_list = "\n".join([f"- {m['Material/Equipment']}: {m['Quantity']} (typical lead time {schedule.lead_weeks(m['Material/Equipment'])} weeks)" for m in materials])
+    return f"""
+Date: {datetime.now():%B %d, %Y}
 Project: {query[:200]}
+Construction start: {start.isoformat()}
 Materials (with catalog specifics):
 {material_list}
 
-Generate a COMPLETE construction schedule in this exact structured Markdown format. IMPORTANT: Generate the ENTIRE schedule without truncation. Include all major phases.
+Generate a COMPLETE construction schedule as a single JSON object matching this JSON schema, with no other text:
+{json.dumps(schedule.SCHEDULE_SCHEMA)}
 
-Output of Integrated with Construction Project Schedule:
+Use the WBS level 2 sections {", ".join(f'"{name}"' for name in schedule.SECTIONS.values())}.
+Include a "procurement" task (order to delivery) and an "installation" task for EVERY material above, with its "material" field set, and "construction" tasks for every major phase.
+"""
 
-WBS Level 2: 1. Design & Engineering
-ID Task Duration Start Finish Notes
-1.1 Conceptual Design 30 days 01-Jan-2026 30-Jan-2026 30% Design
-1.2 Detailed Design 45 days 01-Feb-2026 17-Mar-2026 100% Design
-1.3 Permits Approval 60 days 01-Mar-2026 30-Apr-2026 Regulatory
+def _stream_plan_section(prompt: str, groq_api_key: str, label: str) -> Iterator[str]:
+    content = ""
+    try:
+        for delta in stream_chat_completion(groq_api_key, prompt, max_tokens=4096, temperature=0.3):
+            content += delta
+            yield delta
+    except Exception as e:
+        metrics.LLM_CALLS.inc(outcome="error")
+        st.error(f"{label} generation error: {str(e)}")
+        yield f"Error: {str(e)}"
+        return
+    metrics.LLM_CALLS.inc(outcome="ok")
+    if "..." in content or "truncated" in content:
+        st.warning(f"{label} may be incomplete. Consider regenerating.")
 
-WBS Level 2: 2. Site Preparation
-ID Task Duration Start Finish Notes
-2.1 Land Clearing 15 days 01-May-2026 15-May-2026 Earthwork
-2.2 Foundation Work 45 days 16-May-2026 30-Jun-2026 Excavation
+def generate_timeline(materials: List[Dict], query: str, groq_api_key: str, tasks: List[Dict[str, Any]] = None,
+                      commentary: bool = None, buffer: List[str] = None, start=None) -> Dict[str, Any]:
+    """Order-by dates and slack per material from load_timeline_engine(), backward-scheduled from
+    the schedule's installation tasks (built from the same construction start). The LLM, when
+    enabled, only adds commentary below the table."""
+    from timeline import to_markdown
+    with tracing.span("plan.timeline", materials=len(materials)) as span:
+        rows = load_timeline_engine().plan(materials, start=start, tasks=tasks)
+        span.set_attribute("critical", sum(row['critical'] for row in rows))
+    section = {'rows': rows, 'markdown': to_markdown(rows), 'commentary': ''}
+    if buffer is not None:
+        buffer.append(section['markdown'])
+    
+    if (TIMELINE_COMMENTARY if commentary is None else commentary) and groq_api_key:
+        deltas = []
+        stream = _stream_plan_section(build_timeline_commentary_prompt(query, section['markdown']), groq_api_key, "Timeline commentary")
+        for delta in tracing.traced_iter("plan.timeline_commentary", stream):
+            if buffer is not None:
+                buffer.append(("\n\n" if not deltas else "") + delta)
+            deltas.append(delta)
+        section['commentary'] = "".join(deltas)
+    return section
 
-WBS Level 2: 3. Structural Work
-ID Task Duration Start Finish Notes
-3.1 Steel Erection 60 days 01-Jul-2026 29-Aug-2026 Framework
-3.2 Concrete Work 75 days 01-Aug-2026 14-Oct-2026 Slabs & walls
+def generate_schedule(materials: List[Dict], query: str, groq_api_key: str, start=None) -> Dict[str, Any]:
+    """Schedule tasks from the LLM's JSON, validated against schedule.SCHEDULE_SCHEMA; materials the
+    LLM left out (or the whole schedule, when it fails) come from default lead times."""
+    start = schedule.project_start(start)
+    names = [m['Material/Equipment'] for m in materials]
+    tasks, errors = [], []
+    with tracing.span("plan.schedule", materials=len(names)) as span:
+        if groq_api_key:
+            try:
+                content = chat_completion(groq_api_key, build_schedule_prompt(materials, query, start),
+                                          max_tokens=4096, temperature=0.1, json_mode=True)
+                metrics.LLM_CALLS.inc(outcome="ok")
+                tasks, errors = schedule.parse_schedule(content)
+            except Exception as e:
+                metrics.LLM_CALLS.inc(outcome="error")
+                errors.append(f"LLM request failed: {str(e)}")
+        tasks, source = schedule.complete_schedule(tasks, names, start)
+        span.set_attributes(tasks=len(tasks), source=source, rejected=len(errors))
+    if errors:
+        st.warning(f"Schedule: {len(errors)} problem(s) in the LLM output ({errors[0]}); missing items use default lead times.")
+    return {'tasks': tasks, 'source': source, 'errors': errors, 'markdown': schedule.to_markdown(tasks)}
 
-WBS Level 2: 4. Mechanical & Electrical
-ID Task Duration Start Finish Notes
-4.1 Transformer Installation 15 days 01-Dec-2026 15-Dec-2026 HV equipment
-4.2 Switchgear Installation 20 days 16-Dec-2026 04-Jan-2027 MV equipment
-4.3 Cable Laying 30 days 05-Jan-2027 03-Feb-2027 Power distribution
+def _publish(section: Dict[str, Any], buffer: List[str] = None) -> Dict[str, Any]:
+    if buffer is not None:
+        buffer.append(section['markdown'])
+    return section
 
-WBS Level 2: 5. Finishing & Commissioning
-ID Task Duration Start Finish Notes
-5.1 Interior Work 90 days 01-Mar-2027 29-May-2027 Final touches
-5.2 Testing 30 days 01-Jun-2027 30-Jun-2027 Systems check
-5.3 Handover 15 days 01-Jul-2027 15-Jul-2027 Project completion
+GANTT_COLORS = {'construction': 'tab:gray', 'procurement': 'orange', 'installation': 'tab:blue'}
 
-Ensure ALL WBS levels are complete and continue generating until the entire project schedule is covered, including all materials.
-"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {groq_api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 4096,
-            "temperature": 0.3
-        }
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-        data = response.json()
-        if 'choices' in data and len(data['choices']) > 0:
-            content = data['choices'][0]['message']['content']
-            if "..." in content or "truncated" in content:
-                st.warning("Schedule may be incomplete. Consider regenerating.")
-            return content
-        st.error("Invalid API response for schedule.")
-        return "Error: Invalid API response."
-    except Exception as e:
-        st.error(f"Schedule generation error: {str(e)}")
-        return f"Error: {str(e)}"
+def _gantt_arrays(tasks: List[Dict[str, Any]]):
+    starts = np.array([t['start'] for t in tasks], dtype='datetime64[D]')
+    finishes = np.array([t['finish'] for t in tasks], dtype='datetime64[D]')
+    return starts, (finishes - starts).astype(int) + 1
 
-def generate_complete_plan_in_chunks(materials: List[Dict], query: str, groq_api_key: str) -> Dict[str, str]:
-    with st.spinner("Generating detailed timeline..."):
-        timeline = generate_timeline(materials, query, groq_api_key)
-        time.sleep(2)
-    
-    with st.spinner("Generating comprehensive schedule..."):
-        schedule = generate_schedule(materials, query, groq_api_key)
-        time.sleep(2)
-    
-    return {
-        'timeline': timeline,
-        'schedule': schedule
-    }
+def plot_gantt_chart(tasks: List[Dict[str, Any]]):
+    """Static Gantt chart: every task drawn by a single vectorized barh call"""
+    if not tasks:
+        return None
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    starts, durations = _gantt_arrays(tasks)
+    rows = np.arange(len(tasks))
+    fig, ax = plt.subplots(figsize=(10, max(2, len(tasks) * 0.3)))
+    ax.barh(rows, durations, left=mdates.date2num(starts), height=0.6,
+            color=[GANTT_COLORS.get(t['kind'], 'tab:gray') for t in tasks])
+    ax.set_yticks(rows, [t['task'] for t in tasks], fontsize=8)
+    ax.xaxis_date()
+    ax.invert_yaxis()
+    ax.set_xlabel('Timeline')
+    ax.set_title('Construction Schedule: Procurement vs Installation')
+    ax.legend(handles=[Patch(color=color, label=kind.title()) for kind, color in GANTT_COLORS.items()])
+    fig.tight_layout()
+    return fig
 
-def extract_vendor_details(answer: str) -> str:
-    # Improved regex to handle new lines and optional fields
-    vendor_match = re.search(r'Vendors \(list .*?\):.*?\n\s*1\.\s*Company Name:\s*(.*?)\n\s*Address:\s*(.*?)\n\s*GST:\s*(.*?)\n\s*Rating:\s*(.*?)\n\s*(?:Contact:\s*(.*?)\n\s*)?(?:Price:\s*(.*))?', answer, re.DOTALL | re.IGNORECASE)
-    if vendor_match:
-        company = vendor_match.group(1).strip() if vendor_match.group(1) else "N/A"
-        address = vendor_match.group(2).strip() if vendor_match.group(2) else "N/A"
-        gst = vendor_match.group(3).strip() if vendor_match.group(3) else "N/A"
-        rating = vendor_match.group(4).strip() if vendor_match.group(4) else "N/A"
-        contact = vendor_match.group(5).strip() if vendor_match.group(5) else "N/A"
-        price_info = vendor_match.group(6).strip() if vendor_match.group(6) else "N/A"
-        return f"Company: {company}, Address: {address}, GST: {gst}, Rating: {rating}, Contact: {contact}, Price Info: {price_info}"
-    return "Unknown Vendor"
-
-def plot_gantt_chart(schedule_text: str):
-    tasks = []
-    lines = schedule_text.split('\n')
-    current_section = ""
-    for line in lines:
-        if line.startswith('WBS Level 2:'):
-            current_section = line
-        elif line.startswith('ID Task Duration Start Finish Notes') or line.startswith('|----|'):
-            continue
-        elif ' ' in line and not line.startswith('Output'):
-            parts = re.split(r'\s{2,}', line.strip())
-            if len(parts) >= 6:
-                id_ = parts[0]
-                task = parts[1]
-                duration = parts[2]
-                start = parts[3]
-                finish = parts[4]
-                notes = ' '.join(parts[5:])
-                tasks.append({'Section': current_section, 'ID': id_, 'Task': task, 'Start': start, 'Finish': finish, 'Duration': duration, 'Notes': notes})
-    
-    start_dates = []
-    durations = []
-    task_names = []
-    for task in tasks:
-        try:
-            start_date = datetime.strptime(task['Start'], '%d-%b-%Y')
-            finish_date = datetime.strptime(task['Finish'], '%d-%b-%Y')
-            duration_days = (finish_date - start_date).days
-            start_dates.append(start_date)
-            durations.append(duration_days)
-            task_names.append(task['Task'])
-        except:
-            pass
-    
-    if not task_names:
+def gantt_altair_chart(tasks: List[Dict[str, Any]]):
+    """Interactive (zoom/pan/tooltip) Gantt chart for schedules too long to read as a static figure"""
+    import altair as alt
+    return alt.Chart(alt.Data(values=tasks)).mark_bar().encode(
+        x=alt.X('start:T', title='Timeline'),
+        x2='finish:T',
+        y=alt.Y('task:N', sort=None, title=None),
+        color=alt.Color('kind:N', scale=alt.Scale(domain=list(GANTT_COLORS), range=['gray', 'orange', 'steelblue'])),
+        tooltip=['id:N', 'section:N', 'task:N', 'start:T', 'finish:T', 'notes:N']
+    ).properties(height=min(12 * len(tasks), 4000)).interactive()
+
+def plot_trace_waterfall(spans: List[tracing.Span]):
+    rows = tracing.waterfall(spans)
+    if not rows:
         return None
     
-    fig, ax = plt.subplots(figsize=(10, len(task_names) * 0.5))
-    ax.barh(task_names, durations, left=start_dates, height=0.4, color='orange', label='Procurement')
-    for i in range(len(durations)):
-        install_start = start_dates[i] + relativedelta(days=durations[i])
-        ax.barh(task_names[i], 30, left=install_start, height=0.4, color='blue', label='Installation' if i == 0 else "")
-    
-    ax.set_xlabel('Timeline')
-    ax.set_title('Overlapping Gantt: Procurement vs Installation (All Equipment)')
-    ax.legend()
-    plt.gca().invert_yaxis()
+    import matplotlib.pyplot as plt
+    labels = [f"{'  ' * row['depth']}{row['span']}" for row in rows]
+    fig, ax = plt.subplots(figsize=(10, max(2, len(rows) * 0.3)))
+    colors = ['red' if row['error'] else 'tab:blue' for row in rows]
+    ax.barh(range(len(rows)), [row['duration_ms'] for row in rows], left=[row['start_ms'] for row in rows], height=0.6, color=colors)
+    ax.set_yticks(range(len(rows)))
+    ax.set_yticklabels(labels, fontsize=8)
+    ax.set_xlabel('Milliseconds since request start')
+    ax.set_title('Request trace')
+    ax.invert_yaxis()
     return fig
 
 def format_vendor_table(materials: List[Dict], vendors: List[str]) -> str:
@@ -1074,6 +1053,149 @@ def format_vendor_table(materials: List[Dict], vendors: List[str]) -> str:
         table += f"{mat['Material/Equipment']} {quantity} {unit} {vendor}\n"
     return table
 
+def score_material(rag: IndiaMART_RAG, query: str, mat: Dict[str, Any]) -> Dict[str, Any]:
+    """Refine one material estimate with the ML models; returns an updated copy"""
+    mat = dict(mat)
+    estimated_qty_match = re.search(r'(\d+)', mat['Quantity'])
+    estimated_qty = int(estimated_qty_match.group(1)) if estimated_qty_match else 100
+    catalog_source = mat.get('catalog_source', None)
+    
+    ml_input, real_product_data = generate_ml_input_from_rag(rag, query, mat['Material/Equipment'], estimated_qty, catalog_source)
+    ml_input['ExtendedQuantity'] = estimated_qty
+    ml_input['ExtendedPrice'] = ml_input['UnitPrice'] * estimated_qty
+    
+    prediction = run_ml_prediction(ml_input)
+    if 'error' not in prediction:
+        parts = mat['Quantity'].split(' ', 1)
+        if len(parts) == 2:
+            parts[0] = str(prediction['qty_shipped'])
+            mat['Quantity'] = ' '.join(parts)
+    
+    mat['product_details'] = real_product_data.get('product_details', 'No matching product found')
+    mat['ml_prediction'] = prediction
+    return mat
+
+def find_vendors(rag: IndiaMART_RAG, mat: Dict[str, Any], location: str, k: int = 3) -> List[Dict[str, Any]]:
+    return rag.resolve_vendors(mat.get('catalog_source') or mat['Material/Equipment'], location or 'Navi Mumbai', k=k,
+                               criteria="high rating GST after 2017 available in stock")
+
+def best_vendor_summary(vendor_records: List[Dict[str, Any]]) -> str:
+    return format_vendor_record(vendor_records[0]) if vendor_records else "Unknown Vendor"
+
+def _drain(stream: Iterator[str], buffer: List[str]) -> str:
+    for delta in stream:
+        buffer.append(delta)
+    return "".join(buffer)
+
+def build_plan_pipeline(rag: IndiaMART_RAG, query: str, material_estimates: List[Dict[str, Any]], requirements: Dict[str, Any],
+                        groq_api_key: str, answer_stream: Iterator[str] = None, stream_buffers: Dict[str, List[str]] = None,
+                        max_workers: int = 4, thread_initializer=None, include_llm: bool = True) -> Pipeline:
+    """Lay out the procurement plan as a DAG: per-material ML scoring and (metadata-only) vendor
+    lookups run concurrently, the schedule starts once every ML stage is done and the
+    procurement timeline is backward-scheduled from it.
+
+    With stream_buffers, LLM stages append deltas to the named buffers as they arrive so the
+    caller can render them while the pipeline runs. include_llm=False keeps every stage off
+    the LLM: the schedule then comes from default lead times and the timeline, always built
+    from lead-time tables, gets no commentary. Both are laid out from
+    requirements['construction_start'] (YYYY-MM-DD), or schedule.project_start() without it.
+    """
+    pipeline = Pipeline(max_workers=max_workers, thread_initializer=thread_initializer)
+    
+    if answer_stream is not None:
+        buffer = stream_buffers['answer'] if stream_buffers else []
+        pipeline.add('answer', lambda results: _drain(answer_stream, buffer))
+    
+    if not material_estimates:
+        return pipeline
+    
+    ml_stages = [f"ml {i+1}: {mat['Material/Equipment']}" for i, mat in enumerate(material_estimates)]
+    vendor_stages = [f"vendor {i+1}: {mat['Material/Equipment']}" for i, mat in enumerate(material_estimates)]
+    for mat, ml_stage in zip(material_estimates, ml_stages):
+        pipeline.add(ml_stage, lambda results, mat=mat: score_material(rag, query, mat))
+    pipeline.add('materials', lambda results: [results[name] for name in ml_stages], deps=ml_stages)
+    
+    for mat, vendor_stage in zip(material_estimates, vendor_stages):
+        pipeline.add(vendor_stage, lambda results, mat=mat: find_vendors(rag, mat, requirements.get('location')))
+    pipeline.add('vendors', lambda results: [results[name] for name in vendor_stages], deps=vendor_stages)
+    
+    llm_key = groq_api_key if include_llm else None
+    buffers = stream_buffers or {}
+    start = schedule.project_start(requirements.get('construction_start'))
+    pipeline.add('schedule', lambda results: _publish(generate_schedule(results['materials'], query, llm_key, start), buffers.get('schedule')), deps=['materials'])
+    pipeline.add('timeline', lambda results: generate_timeline(results['materials'], query, llm_key, tasks=results['schedule']['tasks'],
+                                                               buffer=buffers.get('timeline'), start=start), deps=['materials', 'schedule'])
+    
+    return pipeline
+
+def build_rag_snapshot() -> IndiaMART_RAG:
+    rag = IndiaMART_RAG(json_file=PRODUCTS_FILE)
+    rag.load_and_process_json_files()
+    rag.build_faiss_index()
+    return rag
+
+class Warmup:
+    """Builds the index snapshots and loads the ML models on a background thread.
+
+    The page renders while this runs; the first query waits on it instead of the first render.
+    The thread has no Streamlit script context, so progress goes to the 'seek' logger. A failed
+    optional step (the ML files and models) is recorded in failures for main() to show; any
+    other failure stops warm-up and is re-raised by wait().
+    """
+
+    # Steps whose failure leaves the app usable, with the ML fallbacks
+    OPTIONAL_STEPS = ('ml_files', 'ml_artifacts')
+
+    def __init__(self):
+        self.snapshots: SnapshotManager = None
+        self.error: Exception = None
+        self.failures: Dict[str, str] = {}
+        self.seconds: Dict[str, float] = {}
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name="seek-warmup", daemon=True).start()
+
+    def _step(self, name: str, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        except Exception as e:
+            logger.exception("Warm-up step %s failed", name)
+            if name not in self.OPTIONAL_STEPS:
+                raise
+            self.failures[name] = str(e)
+        finally:
+            self.seconds[name] = time.perf_counter() - start
+
+    def _run(self):
+        try:
+            self._step('ml_files', generate_missing_ml_files)
+            self.snapshots = self._step('index', lambda: SnapshotManager(
+                build_rag_snapshot, [PRODUCTS_FILE], poll_interval=SNAPSHOT_POLL_SECONDS).start())
+            self._step('ml_artifacts', load_ml_artifacts)
+            self._step('material_estimator', load_material_estimator)
+            self._step('timeline_engine', load_timeline_engine)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> SnapshotManager:
+        """Block until warm-up finishes; re-raises its error"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Warm-up still running after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.snapshots
+
+@st.cache_resource
+def start_warmup() -> Warmup:
+    """Process-wide warm-up (and the index snapshots it builds) shared by every browser session"""
+    return Warmup()
+
 def main():
     st.set_page_config(
         page_title="Construction Procurement Assistant",
@@ -1085,118 +1207,128 @@ def main():
     st.title("Construction Procurement Assistant")
     st.write("Enter project details to get material estimates, vendor information, and schedules.")
     
-    # Generate missing ML files if needed
-    generate_missing_ml_files()
+    metrics.serve_from_env()
+    warmup = start_warmup()
     
-    if 'rag' not in st.session_state:
-        try:
-            with st.spinner("Initializing AI Assistant from filtered_products.json..."):
-                st.session_state.rag = IndiaMART_RAG(json_file="filtered_products.json")
-                st.session_state.rag.load_and_process_json_files()
-                st.session_state.rag.build_faiss_index()
-                st.success("AI Assistant initialized successfully from filtered_products.json!")
-        except Exception as e:
-            st.error(f"Initialization error: {str(e)}")
-            st.error(f"Check if filtered_products.json exists in {os.getcwd()} and matches the structure (list of dicts with url, title, price, etc.).")
-            return
+    if warmup.ready and warmup.error is None:
+        snapshot = warmup.snapshots.current
+        st.sidebar.caption(f"Index snapshot v{snapshot.version}, built {datetime.fromtimestamp(snapshot.built_at):%Y-%m-%d %H:%M:%S}")
+        if warmup.snapshots.last_error is not None:
+            st.sidebar.warning(f"Index reload failed, still serving v{snapshot.version}: {warmup.snapshots.last_error}")
+        if 'ml_artifacts' not in warmup.failures:
+            for error in load_ml_artifacts()['schema_errors']:
+                st.sidebar.warning(f"ML model disabled: {error}")
+    elif not warmup.ready:
+        st.sidebar.caption(f"Loading the index from {PRODUCTS_FILE} and the ML models in the background...")
+    for step, error in warmup.failures.items():
+        st.sidebar.error(f"Warm-up step '{step}' failed, ML predictions use fallbacks: {error}")
     
     query = st.text_area("Enter Project Details",
                          placeholder="e.g., 25 MegaWatt, 2 Lacs SquareFoot Built Up Area, Project Volume of 1875 Cr in Rupees, Build in Navi Mumbai Area (add 'Health Center' for specific materials)",
                          height=100)
+    construction_start = st.date_input("Construction start", value=schedule.project_start())
     
     if st.button("Generate Complete Procurement Plan"):
         if not query:
             st.error("Please enter project details.")
             return
         
+        try:
+            with st.spinner(f"Initializing AI Assistant from {PRODUCTS_FILE}..."):
+                snapshots = warmup.wait()
+        except Exception as e:
+            st.error(f"Initialization error: {str(e)}")
+            st.error(f"Check if {PRODUCTS_FILE} exists in {os.getcwd()} and matches the structure (list of dicts with url, title, price, etc.).")
+            return
+        snapshot = snapshots.current
+        
         progress_bar = st.progress(0)
         status_text = st.empty()
         
         try:
             status_text.text("Processing query and searching vendors...")
-            progress_bar.progress(20)
             
-            result = st.session_state.rag.query(query)
+            # Pin one index snapshot for the whole plan; a hot reload swaps in the next one for later queries
+            with tracing.span("plan.request", snapshot_version=snapshot.version) as request_span, snapshots.acquire() as rag:
+                result, answer_stream = rag.stream_query(query)
+                material_estimates = result.get('material_estimates', [])
+                result['requirements']['construction_start'] = construction_start.isoformat()
             
-            status_text.text("Generating material estimates...")
-            progress_bar.progress(40)
+                buffers = {'answer': [], 'timeline': [], 'schedule': []}
+                st.subheader("Assistant Answer")
+                stream_areas = {'answer': st.empty()}
+                materials_area = st.empty()
+                vendors_area = st.empty()
+                if material_estimates:
+                    st.subheader("Output of Procurement Timeline:")
+                    stream_areas['timeline'] = st.empty()
+                    st.subheader("Output of Integrated with Construction Project Schedule:")
+                    stream_areas['schedule'] = st.empty()
             
-            material_estimates = result.get('material_estimates', [])
-            if material_estimates:
-                status_text.text("Running ML predictions with real JSON data...")
-                progress_bar.progress(60)
-                
-                updated_materials = []
-                for mat in material_estimates:  # All materials, no limit
-                    quantity_str = mat['Quantity']
-                    estimated_qty_match = re.search(r'(\d+)', quantity_str)
-                    estimated_qty = int(estimated_qty_match.group(1)) if estimated_qty_match else 100
-                    
-                    catalog_source = mat.get('catalog_source', None)
-                    
-                    ml_input, real_product_data = generate_ml_input_from_rag(st.session_state.rag, query, mat['Material/Equipment'], estimated_qty, catalog_source)
-                    ml_input['ExtendedQuantity'] = estimated_qty
-                    ml_input['ExtendedPrice'] = ml_input['UnitPrice'] * estimated_qty
-                    
-                    prediction = run_ml_prediction(ml_input)
-                    if 'error' not in prediction:
-                        qty_shipped = prediction['qty_shipped']
-                        parts = mat['Quantity'].split(' ', 1)
-                        if len(parts) == 2:
-                            parts[0] = str(qty_shipped)
-                            mat['Quantity'] = ' '.join(parts)
-                        
-                        mat['product_details'] = real_product_data.get('product_details', 'No matching product found')
-                        
-                        st.write(f"✅ {mat['Material/Equipment']}: ML optimized quantity: {mat['Quantity']} (Master Item: {prediction['master_item_no']}, Method: {prediction['prediction_method']}, Catalog: {catalog_source})")
-                        updated_materials.append(mat)
-                    else:
-                        st.error(f"❌ {mat['Material/Equipment']}: ML Error - {prediction['error']}")
-                        mat['product_details'] = real_product_data.get('product_details', 'No matching product found')
-                        updated_materials.append(mat)
-                
-                result['material_estimates'] = updated_materials
-                
-                st.markdown(st.session_state.rag.format_material_table(updated_materials))
-                
-                status_text.text("Identifying vendors...")
-                progress_bar.progress(70)
-                
-                vendors = []
-                for mat in updated_materials:
-                    vendor_query = f"Find suppliers for {mat['Material/Equipment']} in {result['requirements']['location'] or 'Navi Mumbai'} with high ratings GST after 2017 available in stock"
-                    try:
-                        vendor_result = st.session_state.rag.query(vendor_query, k=3, apply_filters=True)
-                        vendor = extract_vendor_details(vendor_result['answer'])
-                        vendors.append(vendor)
-                    except Exception as e:
-                        vendors.append(f"Error: {str(e)}")
-                
-                st.markdown(format_vendor_table(updated_materials, vendors))
-                
-                status_text.text("Generating complete project plan...")
-                progress_bar.progress(80)
-                
-                complete_plan = generate_complete_plan_in_chunks(updated_materials, query, st.session_state.rag.groq_api_key)
-                
-                st.subheader("Output of Procurement Timeline:")
-                st.markdown(complete_plan['timeline'])
-                
-                st.subheader("Output of Integrated with Construction Project Schedule:")
-                st.markdown(complete_plan['schedule'])
+                ctx = get_script_run_ctx()
+                pipeline = build_plan_pipeline(
+                    rag, query, material_estimates, result['requirements'], rag.groq_api_key,
+                    answer_stream=answer_stream, stream_buffers=buffers,
+                    thread_initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+                )
+            
+                pipeline.start()
+                for event in pipeline.events(poll_interval=0.2):
+                    for name, area in stream_areas.items():
+                        if buffers[name]:
+                            area.markdown("".join(buffers[name]))
+                    if event is None:
+                        continue
                 
-                status_text.text("Creating visualization...")
-                progress_bar.progress(95)
+                    stage, seconds = event
+                    progress_bar.progress(pipeline.progress)
+                    status_text.text(f"Finished {stage} in {seconds:.1f}s ({pipeline.completed}/{len(pipeline.stages)} stages)")
                 
-                st.subheader("Project Gantt Chart")
-                fig = plot_gantt_chart(complete_plan['schedule'])
-                if fig:
-                    st.pyplot(fig)
-                else:
-                    st.info("Gantt chart visualization requires schedule data in specific format.")
+                    if stage in pipeline.errors and not isinstance(pipeline.errors[stage], StageSkipped):
+                        st.error(f"❌ {stage}: {pipeline.errors[stage]}")
+                    elif stage == 'materials':
+                        for mat in pipeline.results['materials']:
+                            prediction = mat.get('ml_prediction', {})
+                            if 'error' not in prediction:
+                                st.write(f"✅ {mat['Material/Equipment']}: ML optimized quantity: {mat['Quantity']} (Master Item: {prediction['master_item_no']}, Method: {prediction['prediction_method']}, Catalog: {mat.get('catalog_source')})")
+                            else:
+                                st.error(f"❌ {mat['Material/Equipment']}: ML Error - {prediction['error']}")
+                        materials_area.markdown(rag.format_material_table(pipeline.results['materials']))
+                    elif stage == 'vendors':
+                        vendors = [best_vendor_summary(records) for records in pipeline.results['vendors']]
+                        vendors_area.markdown(format_vendor_table(material_estimates, vendors))
+            
+                result['answer'] = pipeline.results.get('answer', '') + result['answer']
+            
+                if 'schedule' in pipeline.results:
+                    result['material_estimates'] = pipeline.results['materials']
                 
-                progress_bar.progress(100)
+                    st.subheader("Project Gantt Chart")
+                    tasks = pipeline.results['schedule']['tasks']
+                    if len(tasks) > GANTT_INTERACTIVE_TASKS:
+                        st.altair_chart(gantt_altair_chart(tasks), use_container_width=True)
+                    elif tasks:
+                        st.pyplot(plot_gantt_chart(tasks))
+                    else:
+                        st.info("No schedule tasks to chart.")
+            
+                with st.expander(f"Stage timings ({pipeline.wall_time:.1f}s wall time)"):
+                    import pandas as pd
+                    st.dataframe(pd.DataFrame(
+                        [{'Stage': name, 'Seconds': round(seconds, 2)} for name, seconds in pipeline.timings.items()]
+                    ).sort_values('Seconds', ascending=False))
+            
+                progress_bar.progress(1.0)
                 status_text.text("Complete!")
+            
+            if tracing.is_enabled():
+                with st.expander(f"Request trace ({request_span.duration_ms / 1000:.1f}s, {len(request_span.trace.spans)} spans)"):
+                    fig = plot_trace_waterfall(request_span.trace.spans)
+                    if fig:
+                        st.pyplot(fig)
+                    st.download_button("Download trace (OTLP JSON)", json.dumps(tracing.to_otlp(request_span.trace.spans), default=str),
+                                       file_name=f"trace-{request_span.trace.trace_id}.json", mime="application/json")
+            if material_estimates:
                 st.success("✅ Procurement plan generated successfully with real JSON data + Catalog!")
                 
         except Exception as e:
@@ -0,0 +1,249 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set, Tuple
+from gazetteer import ALIASES, Gazetteer, normalize_text
+
+DEFAULT_FACILITY = "Workspace"
+
+FACILITY_ALIASES = {
+    'data centre': 'Data Center',
+    'datacentre': 'Data Center',
+}
+
+CRITERIA_KEYWORDS = {
+    'rating': 'high_rating',
+    'ratings': 'high_rating',
+    'rated': 'high_rating',
+    'gst after 2017': 'gst_after_2017',
+    'in stock': 'in_stock',
+    'fire retardant': 'fire_retardant',
+    'fireproof': 'fire_retardant',
+}
+
+SUPPLIER_KEYWORDS = ['vendor', 'vendors', 'supplier', 'suppliers', 'manufacturer', 'manufacturers',
+                     'dealer', 'dealers', 'distributor', 'distributors', 'seller', 'sellers']
+
+MULTIPLIERS = {'thousand': 1e3, 'k': 1e3, 'lakh': 1e5, 'lac': 1e5, 'lacs': 1e5, 'crore': 1e7, 'cr': 1e7}
+
+SQ_M_TO_SQ_FT = 10.7639
+
+_NUMBER = r'(\d+(?:,\d+)*(?:\.\d+)?)'
+_MULTIPLIER = r'(thousand|k|lakhs?|lacs?|crores?|cr)'
+POWER_PATTERN = re.compile(_NUMBER + r'\s*(mw|mega?\s*-?\s*watts?|kw|kilo\s*-?\s*watts?)\b')
+AREA_PATTERN = re.compile(_NUMBER + r'\s*' + _MULTIPLIER + r'?\s*'
+                          r'(sq\.?\s*(?:ft|feet|foot)|square\s*(?:ft|feet|foot)|sft|sq\.?\s*(?:m|mtrs?|meters?|metres?)|square\s*(?:m|meters?|metres?))(?![a-z])')
+VOLUME_PATTERN = re.compile(_NUMBER + r'\s*(lakhs?|lacs?|crores?|cr)\b(?!\s*(?:sq|square|sft))')
+RADIUS_PATTERN = re.compile(r'within\s+(\d+(?:\.\d+)?)\s*(?:km|kms|kilometers?|kilometres?)\s+(?:of|from|around)\s+([a-z][a-z\s]*)')
+METRIC_AREA_UNIT = re.compile(r'(?:sq\.?|square)\s*m')
+TRAILING_LOCATION_PATTERN = re.compile(r'\bin\s+([\w\s]+)$', re.IGNORECASE)
+
+
+class KeywordAutomaton:
+    """Aho–Corasick automaton over words: finds every keyword phrase in one left-to-right pass.
+
+    Phrases are matched on whole words, so 'pune' never matches inside 'punea'.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, phrase: str, value: Any):
+        words = phrase.split()
+        if not words:
+            return
+        node = 0
+        for word in words:
+            if word not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][word] = len(self._goto) - 1
+            node = self._goto[node][word]
+        self._output[node].append((len(words), value))
+        self._built = False
+
+    def build(self) -> "KeywordAutomaton":
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for word, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                pending.append(child)
+        self._built = True
+        return self
+
+    def find(self, words: List[str]) -> List[Tuple[int, int, Any]]:
+        """(start, end, value) word spans for every phrase occurrence, overlapping ones included"""
+        if not self._built:
+            self.build()
+        hits = []
+        node = 0
+        for i, word in enumerate(words):
+            while node and word not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(word, 0)
+            for length, value in self._output[node]:
+                hits.append((i - length + 1, i + 1, value))
+        return hits
+
+
+def _longest_hits(hits: List[Tuple[int, int, Tuple[str, Any]]]) -> List[Tuple[int, int, Tuple[str, Any]]]:
+    """Drop hits nested inside a longer hit of the same kind ('mumbai' inside 'navi mumbai')"""
+    kept, last = [], {}
+    for start, end, value in sorted(hits, key=lambda hit: (hit[0], hit[0] - hit[1])):
+        span = last.get(value[0])
+        if span and start >= span[0] and end <= span[1]:
+            continue
+        last[value[0]] = (start, end)
+        kept.append((start, end, value))
+    return kept
+
+
+def _number(text: str) -> float:
+    return float(text.replace(',', ''))
+
+
+def _multiplier(unit: Optional[str]) -> float:
+    if not unit:
+        return 1.0
+    return MULTIPLIERS.get(unit, MULTIPLIERS.get(unit.rstrip('s'), 1.0))
+
+
+@dataclass
+class QueryIntent:
+    """Everything the app reads out of one query. Power in MW, area in sq ft, volume in Rupees."""
+    text: str
+    facility_type: str = DEFAULT_FACILITY
+    power_capacity: Optional[float] = None
+    built_up_area: Optional[float] = None
+    project_volume: Optional[float] = None
+    location: Optional[str] = None
+    location_filter: Optional[Dict[str, Set[int]]] = None
+    materials: List[str] = field(default_factory=list)
+    supplier_query: bool = False
+    high_rating: bool = False
+    gst_after_2017: bool = False
+    in_stock: bool = False
+    fire_retardant: bool = False
+
+    def requirements(self) -> Dict[str, Any]:
+        """The requirements dict used by material estimation and the planners"""
+        return {
+            "power_capacity": self.power_capacity,
+            "built_up_area": self.built_up_area,
+            "project_volume": self.project_volume,
+            "location": self.location,
+            "facility_type": self.facility_type,
+            "materials": {}
+        }
+
+
+class IntentParser:
+    """Parses a query once into a QueryIntent.
+
+    Facility types, catalog materials, gazetteer places and filter phrases are compiled
+    into a single keyword automaton, so a query is scanned once regardless of how many
+    keywords there are; quantities come from a few precompiled unit patterns.
+    """
+
+    def __init__(self, catalog: Dict[str, Dict[str, List[str]]], gazetteer: Gazetteer = None):
+        self.gazetteer = gazetteer
+        self.automaton = KeywordAutomaton()
+        for facility, categories in catalog.items():
+            name = normalize_text(facility)
+            self.automaton.add(name, ('facility', facility))
+            self.automaton.add(name.replace(' ', ''), ('facility', facility))
+            for materials in categories.values():
+                for material in materials:
+                    self.automaton.add(normalize_text(material), ('material', material))
+                    self.automaton.add(normalize_text(material.split('(')[0]), ('material', material))
+        for alias, facility in FACILITY_ALIASES.items():
+            if facility in catalog:
+                self.automaton.add(alias, ('facility', facility))
+        for phrase, flag in CRITERIA_KEYWORDS.items():
+            self.automaton.add(phrase, ('criterion', flag))
+        for word in SUPPLIER_KEYWORDS:
+            self.automaton.add(word, ('supplier', True))
+        if gazetteer is not None:
+            for kind, names, ids in (('city', gazetteer.cities, gazetteer.city_ids), ('state', gazetteer.states, gazetteer.state_ids)):
+                for name in names:
+                    self.automaton.add(name, (kind, ids[name]))
+            for alias, name in ALIASES.items():
+                if name in gazetteer.city_ids:
+                    self.automaton.add(alias, ('city', gazetteer.city_ids[name]))
+                elif name in gazetteer.state_ids:
+                    self.automaton.add(alias, ('state', gazetteer.state_ids[name]))
+        self.automaton.build()
+
+    def _places(self, text: str) -> List[Tuple[str, int]]:
+        hits = _longest_hits(self.automaton.find(normalize_text(text).split()))
+        return [value for _, _, value in hits if value[0] in ('city', 'state')]
+
+    def _place_name(self, place: Tuple[str, int]) -> str:
+        kind, place_id = place
+        names = self.gazetteer.cities if kind == 'city' else self.gazetteer.states
+        return names[place_id].title()
+
+    def parse(self, query: str) -> QueryIntent:
+        intent = QueryIntent(text=query)
+        lowered = query.lower()
+
+        places = []
+        for _, _, (kind, value) in _longest_hits(self.automaton.find(normalize_text(query).split())):
+            if kind == 'facility':
+                if intent.facility_type == DEFAULT_FACILITY:
+                    intent.facility_type = value
+            elif kind == 'material':
+                if value not in intent.materials:
+                    intent.materials.append(value)
+            elif kind == 'criterion':
+                setattr(intent, value, True)
+            elif kind == 'supplier':
+                intent.supplier_query = True
+            else:
+                places.append((kind, value))
+
+        power_match = POWER_PATTERN.search(lowered)
+        if power_match:
+            power = _number(power_match.group(1))
+            intent.power_capacity = power / 1000 if power_match.group(2).startswith('k') else power
+
+        area_match = AREA_PATTERN.search(lowered)
+        if area_match:
+            area = _number(area_match.group(1)) * _multiplier(area_match.group(2))
+            intent.built_up_area = area * SQ_M_TO_SQ_FT if METRIC_AREA_UNIT.match(area_match.group(3)) else area
+
+        volume_match = VOLUME_PATTERN.search(lowered)
+        if volume_match:
+            intent.project_volume = _number(volume_match.group(1)) * _multiplier(volume_match.group(2))
+
+        self._parse_location(intent, lowered, places)
+        return intent
+
+    def _parse_location(self, intent: QueryIntent, lowered: str, places: List[Tuple[str, int]]):
+        radius_match = RADIUS_PATTERN.search(lowered)
+        if radius_match and self.gazetteer is not None:
+            center = self._places(radius_match.group(2))
+            if center:
+                intent.location = self._place_name(center[0])
+                intent.location_filter = {'city_ids': self.gazetteer.cities_within(center[0], float(radius_match.group(1)))}
+                return
+
+        # The most specific place wins: the first city named, else the first state
+        place = next((p for p in places if p[0] == 'city'), places[0] if places else None)
+        if place is not None:
+            intent.location = self._place_name(place)
+            intent.location_filter = {'city_ids': {place[1]}} if place[0] == 'city' else {'state_ids': {place[1]}}
+            return
+
+        location_match = TRAILING_LOCATION_PATTERN.search(intent.text)
+        if location_match and location_match.group(1).strip().lower() != 'stock':
+            intent.location = location_match.group(1).strip()
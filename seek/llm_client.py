@@ -0,0 +1,55 @@
+import json
+import os
+from typing import Iterator, Dict, Any
+import requests
+
+# Any OpenAI/Groq-compatible chat completions endpoint works here, including a local mock server
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+
+def _request(api_key: str, prompt: str, max_tokens: int, temperature: float, stream: bool, json_mode: bool = False) -> Dict[str, Any]:
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "stream": stream
+    }
+    if json_mode:
+        # The prompt itself must ask for JSON; the API then guarantees the reply parses
+        payload["response_format"] = {"type": "json_object"}
+    return {"url": GROQ_API_URL, "headers": headers, "json": payload}
+
+
+def chat_completion(api_key: str, prompt: str, max_tokens: int = 4096, temperature: float = 0.7, timeout: int = 60,
+                    json_mode: bool = False) -> str:
+    """Return the full completion text. Raises requests.HTTPError on API errors."""
+    response = requests.post(timeout=timeout, **_request(api_key, prompt, max_tokens, temperature, stream=False, json_mode=json_mode))
+    response.raise_for_status()
+    data = response.json()
+    if 'choices' in data and len(data['choices']) > 0:
+        return data['choices'][0]['message']['content']
+    raise ValueError("Invalid API response format.")
+
+
+def stream_chat_completion(api_key: str, prompt: str, max_tokens: int = 4096, temperature: float = 0.7, timeout: int = 60) -> Iterator[str]:
+    """Yield completion text deltas as they arrive over server-sent events"""
+    with requests.post(timeout=timeout, stream=True, **_request(api_key, prompt, max_tokens, temperature, stream=True)) as response:
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                break
+            chunk = json.loads(data)
+            choices = chunk.get('choices') or [{}]
+            delta = choices[0].get('delta', {}).get('content')
+            if delta:
+                yield delta
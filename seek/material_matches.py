@@ -0,0 +1,145 @@
+"""Offline catalog material -> IndiaMART product match table.
+
+Every material in data.json and construction_materials_by_facility.csv is embedded
+once and stored with its top-N products (by cosine similarity) in material_matches.json,
+so request-time material -> product resolution is a dictionary lookup.
+
+The table is refreshed incrementally whenever the product index is built: new
+materials are matched against every product, existing materials are only scored
+against newly added products, and materials that lost a product are rematched.
+
+Refresh from the command line (from the seek/ directory):
+    python material_matches.py --products filtered_products.json
+"""
+import argparse
+import csv
+import json
+import os
+from typing import Callable, Dict, Any, List, Tuple
+import numpy as np
+
+MATCHES_FILE = 'material_matches.json'
+FACILITY_MATERIALS_CSV = os.path.join('..', 'construction_materials_by_facility.csv')
+TOP_N = 10
+
+
+def catalog_material_names(catalog: Dict[str, Dict[str, List[str]]], csv_path: str = FACILITY_MATERIALS_CSV) -> List[str]:
+    names = {name for categories in catalog.values() for materials in categories.values() for name in materials}
+    if os.path.exists(csv_path):
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            names.update(row['Material_Name'] for row in csv.DictReader(f) if row.get('Material_Name'))
+    return sorted(names)
+
+
+def product_key(metadata: Dict[str, Any]) -> str:
+    """Stable product id across index rebuilds: the listing URL, else its title"""
+    return metadata.get('url') or metadata.get('title', '')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype='float32')
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _top_n(scores: np.ndarray, keys: List[str], n: int) -> List[List[Any]]:
+    """Best n (key, score) pairs of one score row, highest first"""
+    n = min(n, len(scores))
+    if n == 0:
+        return []
+    best = np.argpartition(-scores, n - 1)[:n]
+    best = best[np.argsort(-scores[best])]
+    return [[keys[i], round(float(scores[i]), 4)] for i in best]
+
+
+class MaterialMatches:
+    """Top-N product matches per catalog material, resolved to current product positions"""
+
+    def __init__(self, table: Dict[str, Any], product_keys: List[str]):
+        self.table = table
+        self.positions: Dict[str, int] = {}
+        for position, key in enumerate(product_keys):
+            self.positions.setdefault(key, position)
+
+    def __contains__(self, material: str) -> bool:
+        return material in self.table['matches']
+
+    def lookup(self, material: str, k: int = 1) -> List[Tuple[int, float]]:
+        """(product position, score) for the best k products matched to a catalog material"""
+        hits = []
+        for key, score in self.table['matches'].get(material, []):
+            if key in self.positions:
+                hits.append((self.positions[key], score))
+                if len(hits) == k:
+                    break
+        return hits
+
+    @staticmethod
+    def load_table(path: str = MATCHES_FILE) -> Dict[str, Any]:
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError):
+                pass
+        return {}
+
+    @classmethod
+    def refresh(cls, materials: List[str], product_keys: List[str], embeddings: np.ndarray,
+                encode: Callable[[List[str]], np.ndarray], model_name: str,
+                path: str = MATCHES_FILE, top_n: int = TOP_N) -> "MaterialMatches":
+        """Bring the stored table up to date with the current products and catalog, then save it"""
+        table = cls.load_table(path)
+        if table.get('model') != model_name or table.get('top_n') != top_n:
+            table = {}
+        matches: Dict[str, List[List[Any]]] = {m: table.get('matches', {}).get(m) for m in materials}
+
+        known = set(table.get('products', []))
+        current = set(product_keys)
+        removed = known - current
+        added = [i for i, key in enumerate(product_keys) if key not in known]
+
+        rematch = [m for m, hits in matches.items() if hits is None or any(key in removed for key, _ in hits)]
+        rematched = set(rematch)
+        extend = [m for m in materials if m not in rematched] if added else []
+
+        if (rematch or extend) and len(product_keys):
+            products = _normalize(embeddings)
+            if rematch:
+                scores = _normalize(encode(rematch)) @ products.T
+                for material, row in zip(rematch, scores):
+                    matches[material] = _top_n(row, product_keys, top_n)
+            if extend:
+                added_keys = [product_keys[i] for i in added]
+                scores = _normalize(encode(extend)) @ products[added].T
+                for material, row in zip(extend, scores):
+                    merged = {key: score for key, score in matches[material]}
+                    merged.update({key: score for key, score in _top_n(row, added_keys, top_n)})
+                    matches[material] = sorted(([k, s] for k, s in merged.items()), key=lambda hit: -hit[1])[:top_n]
+
+        table = {
+            'model': model_name,
+            'top_n': top_n,
+            'products': sorted(current),
+            'matches': {m: hits or [] for m, hits in matches.items()}
+        }
+        if rematch or extend or removed or not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(table, f, ensure_ascii=False)
+        return cls(table, product_keys)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Refresh the catalog material -> product match table")
+    parser.add_argument('--products', default='filtered_products.json', help="Product JSON file or directory to index")
+    args = parser.parse_args(argv)
+
+    from groqupdate import IndiaMART_RAG
+    rag = IndiaMART_RAG(json_file=args.products, require_api_key=False)
+    rag.load_and_process_json_files()
+    rag.build_faiss_index()
+    matched = sum(1 for hits in rag.material_matches.table['matches'].values() if hits)
+    print(f"{matched}/{len(rag.material_matches.table['matches'])} catalog materials matched to products in {MATCHES_FILE}")
+
+
+if __name__ == "__main__":
+    main()
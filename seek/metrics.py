@@ -0,0 +1,241 @@
+"""Process-wide counters, gauges and histograms in the Prometheus text exposition format.
+
+    metrics.QUERIES.inc(kind="query")
+    metrics.EMBED_BATCH_SIZE.observe(len(batch))
+
+start_http_server(port) serves every metric at http://127.0.0.1:<port>/metrics for a
+Prometheus scrape; SEEK_METRICS_PORT=<port> starts it from serve_from_env(). While
+the server runs, every finished tracing span is also observed into
+seek_stage_seconds{stage=...}, so per-stage latency histograms need no extra timers.
+"""
+import math
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import tracing
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Dict[str, str] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Read the value from function() at scrape time"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(values.items()) if value is not None]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, {'le': _number(bound)})} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+QUERIES = REGISTRY.counter('seek_queries_total', "Queries answered, by entry point", ['kind'])
+STAGE_SECONDS = REGISTRY.histogram('seek_stage_seconds', "Duration of traced stages", ['stage'])
+EMBED_BATCH_SIZE = REGISTRY.histogram('seek_embedding_batch_size', "Texts encoded per embedding call", buckets=SIZE_BUCKETS)
+INDEX_DOCUMENTS = REGISTRY.gauge('seek_index_documents', "Products in the served index")
+INDEX_SHARDS = REGISTRY.gauge('seek_index_shards', "Category shards in the served index")
+LLM_CALLS = REGISTRY.counter('seek_llm_calls_total', "LLM API calls by outcome (ok, error, rate_limited)", ['outcome'])
+LLM_RETRIES = REGISTRY.counter('seek_llm_retries_total', "LLM API calls retried after a 429")
+CACHE_LOOKUPS = REGISTRY.counter('seek_cache_lookups_total', "Cache lookups by cache and result (hit, miss)", ['cache', 'result'])
+SCRAPER_PAGES = REGISTRY.counter('seek_scraper_pages_total', "Pages fetched by the scrapers", ['scraper'])
+SCRAPER_PAGES_PER_MINUTE = REGISTRY.gauge('seek_scraper_pages_per_minute', "Scraper throughput over the current run", ['scraper'])
+ML_PREDICTIONS = REGISTRY.counter('seek_ml_predictions_total', "ML predictions by prediction_method", ['method'])
+CACHE_HIT_RATIO = REGISTRY.gauge('seek_cache_hit_ratio', "Share of cache lookups that hit, since process start", ['cache'])
+
+
+def cache_ratio(cache: str) -> Optional[float]:
+    hits = CACHE_LOOKUPS.value(cache=cache, result='hit')
+    total = hits + CACHE_LOOKUPS.value(cache=cache, result='miss')
+    return hits / total if total else None
+
+
+for _cache in ('query_embedding', 'material_matches'):
+    CACHE_HIT_RATIO.set_function(lambda cache=_cache: cache_ratio(cache), cache=_cache)
+
+
+def stage_name(span_name: str) -> str:
+    """'stage ml 3: Cement' -> 'stage ml', so per-material pipeline stages share one series"""
+    return re.sub(r'\s+\d+(?::.*)?$', '', span_name)
+
+
+def observe_span(span: "tracing.Span"):
+    STAGE_SECONDS.observe(span.duration_ms / 1000, stage=stage_name(span.name))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        payload = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers: Dict[int, ThreadingHTTPServer] = {}
+
+
+def start_http_server(port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread (once per port) and record stage latencies from tracing spans"""
+    if port in _servers:
+        return _servers[port]
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name=f"metrics-{port}", daemon=True).start()
+    _servers[port] = server
+    tracing.add_span_listener(observe_span)
+    tracing.enable()
+    return server
+
+
+def serve_from_env() -> Optional[ThreadingHTTPServer]:
+    port = os.getenv('SEEK_METRICS_PORT')
+    if not port:
+        return None
+    return start_http_server(int(port), os.getenv('SEEK_METRICS_HOST', '127.0.0.1'))
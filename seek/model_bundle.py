@@ -0,0 +1,106 @@
+"""Versioned model bundles written by train.py and loaded by the app and scorers.
+
+    models/
+      LATEST                       <- name of the bundle to serve
+      20250105-101500-3f9c2a1b/
+        bundle.joblib              <- featurizer, deterministic mapping, classifier, label encoder, regressor
+        manifest.json              <- version, training data hash, parameters, metrics, feature schema
+
+A bundle is written to a temporary directory and renamed into place, and LATEST is
+replaced atomically, so a reader never sees a half-written bundle. Loading checks the
+featurizer and both models against the manifest's feature schema, so a mismatched
+bundle fails once at load instead of garbling every prediction.
+"""
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+from feature_schema import FeatureSchema
+
+MODELS_DIR = os.getenv('SEEK_MODELS_DIR', 'models')
+BUNDLE_FILE = 'bundle.joblib'
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+
+
+def _replace_text(path: str, text: str):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def save_bundle(artifacts: Dict[str, Any], manifest: Dict[str, Any], models_dir: str = MODELS_DIR, make_latest: bool = True) -> str:
+    """Write artifacts and manifest under models_dir/<manifest['version']>; returns the bundle directory"""
+    import joblib
+    os.makedirs(models_dir, exist_ok=True)
+    target = os.path.join(models_dir, manifest['version'])
+    if os.path.exists(target):
+        raise FileExistsError(f"Bundle {target} already exists")
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=models_dir)
+    joblib.dump(artifacts, os.path.join(staging, BUNDLE_FILE))
+    with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.rename(staging, target)
+    if make_latest:
+        _replace_text(os.path.join(models_dir, LATEST_FILE), manifest['version'] + "\n")
+    return target
+
+
+def latest_version(models_dir: str = MODELS_DIR) -> Optional[str]:
+    path = os.path.join(models_dir, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def load_manifest(version: str, models_dir: str = MODELS_DIR) -> Dict[str, Any]:
+    with open(os.path.join(models_dir, version, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+MODEL_ARTIFACTS = ('lgb_classifier', 'lgb_regressor')
+
+
+class BoosterModel:
+    """A lightgbm Booster from lgb.train with the predict() and n_features_in_ of the sklearn models it replaces"""
+
+    def __init__(self, booster, objective: str):
+        self.booster = booster
+        self.objective = objective
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.booster.num_feature()
+
+    @property
+    def best_iteration_(self) -> int:
+        return self.booster.best_iteration
+
+    def predict(self, X):
+        """Encoded class labels for 'multiclass', values otherwise; uses the early-stopping best iteration"""
+        predictions = self.booster.predict(X)
+        return predictions.argmax(axis=1) if self.objective == 'multiclass' else predictions
+
+
+def validate_bundle(artifacts: Dict[str, Any], manifest: Dict[str, Any]):
+    """Raises FeatureSchemaError unless the featurizer and models all share the manifest's schema"""
+    schema = artifacts['featurizer'].schema
+    if 'feature_schema' in manifest:
+        FeatureSchema.from_dict(manifest['feature_schema']).validate(schema, f"Bundle {manifest['version']} featurizer")
+    for name in MODEL_ARTIFACTS:
+        if name in artifacts:
+            schema.validate_model(artifacts[name], name)
+
+
+def load_bundle(version: str = None, models_dir: str = MODELS_DIR) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(artifacts, manifest) of the given or LATEST bundle, validated; None when no bundle has been trained"""
+    version = version or latest_version(models_dir)
+    if version is None:
+        return None
+    import joblib
+    artifacts = joblib.load(os.path.join(models_dir, version, BUNDLE_FILE))
+    manifest = load_manifest(version, models_dir)
+    validate_bundle(artifacts, manifest)
+    return artifacts, manifest
@@ -0,0 +1,144 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import tracing
+
+
+class StageSkipped(Exception):
+    """Raised for a stage whose dependency failed"""
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+
+class Pipeline:
+    """Runs a DAG of stages on a thread pool, starting each stage as soon as its dependencies finish.
+
+    Stage functions receive the dict of results produced so far (all of their
+    dependencies are guaranteed to be in it). Completion events are handed back to
+    the caller's thread through events(), so UI updates never happen off-thread.
+    Stages run in a copy of the caller's context, so their spans nest under the
+    caller's current span.
+    """
+
+    def __init__(self, max_workers: int = 4, thread_initializer: Optional[Callable[[], None]] = None):
+        self.max_workers = max_workers
+        self.thread_initializer = thread_initializer
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timings: Dict[str, float] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._events: "queue.Queue[Tuple[str, float]]" = queue.Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._context: Optional[contextvars.Context] = None
+        self.completed = 0
+        self.wall_time = 0.0
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()) -> "Pipeline":
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = Stage(name, func, deps)
+        return self
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _run_stage(self, stage: Stage):
+        start = time.perf_counter()
+        try:
+            failed = [dep for dep in stage.deps if dep in self.errors]
+            if failed:
+                raise StageSkipped(f"dependency {failed[0]} failed")
+            with tracing.span(f"stage {stage.name}"):
+                result = stage.func(self.results)
+            with self._lock:
+                self.results[stage.name] = result
+        except Exception as e:
+            with self._lock:
+                self.errors[stage.name] = e
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.timings[stage.name] = elapsed
+            ready = []
+            for child in self._dependents[stage.name]:
+                self._pending[child] -= 1
+                if self._pending[child] == 0:
+                    ready.append(child)
+        for child in ready:
+            self._submit(self.stages[child])
+        self._events.put((stage.name, elapsed))
+
+    def _submit(self, stage: Stage):
+        # A Context can only be entered by one thread at a time, so every stage gets its own copy
+        self._executor.submit(self._context.copy().run, self._run_stage, stage)
+
+    def start(self) -> "Pipeline":
+        self._validate()
+        self._dependents = {name: [] for name in self.stages}
+        for stage in self.stages.values():
+            self._pending[stage.name] = len(stage.deps)
+            for dep in stage.deps:
+                self._dependents[dep].append(stage.name)
+        self._started_at = time.perf_counter()
+        self._context = contextvars.copy_context()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, initializer=self.thread_initializer)
+        for stage in self.stages.values():
+            if not stage.deps:
+                self._submit(stage)
+        return self
+
+    def events(self, poll_interval: Optional[float] = None) -> Iterator[Optional[Tuple[str, float]]]:
+        """Yield (stage, seconds) as stages finish. With poll_interval, also yields None on idle ticks."""
+        remaining = len(self.stages)
+        try:
+            while remaining:
+                try:
+                    event = self._events.get(timeout=poll_interval)
+                except queue.Empty:
+                    yield None
+                    continue
+                remaining -= 1
+                self.completed += 1
+                yield event
+        finally:
+            self.wall_time = time.perf_counter() - self._started_at
+            self._executor.shutdown(wait=remaining == 0)
+
+    def run(self) -> Dict[str, Any]:
+        self.start()
+        for _ in self.events():
+            pass
+        return self.results
+
+    @property
+    def progress(self) -> float:
+        """Fraction of stages whose completion has been handed to the caller"""
+        return self.completed / len(self.stages) if self.stages else 1.0
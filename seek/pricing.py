@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import numpy as np
+
+# Free-text price units -> (canonical unit, how many canonical units one of them is)
+UNIT_ALIASES = {
+    'kg': ('kg', 1.0), 'kgs': ('kg', 1.0), 'kilogram': ('kg', 1.0), 'kilo': ('kg', 1.0),
+    'g': ('kg', 0.001), 'gm': ('kg', 0.001), 'gram': ('kg', 0.001),
+    'tonne': ('kg', 1000.0), 'ton': ('kg', 1000.0), 'metric ton': ('kg', 1000.0), 'mt': ('kg', 1000.0),
+    'quintal': ('kg', 100.0),
+    'piece': ('piece', 1.0), 'pc': ('piece', 1.0), 'pcs': ('piece', 1.0), 'nos': ('piece', 1.0), 'no': ('piece', 1.0),
+    'number': ('piece', 1.0), 'unit': ('piece', 1.0), 'units': ('piece', 1.0), 'each': ('piece', 1.0),
+    'meter': ('m', 1.0), 'metre': ('m', 1.0), 'm': ('m', 1.0), 'rmt': ('m', 1.0), 'running meter': ('m', 1.0),
+    'feet': ('m', 0.3048), 'foot': ('m', 0.3048), 'ft': ('m', 0.3048), 'rft': ('m', 0.3048), 'km': ('m', 1000.0),
+    'square feet': ('sq ft', 1.0), 'sq ft': ('sq ft', 1.0), 'sqft': ('sq ft', 1.0), 'sft': ('sq ft', 1.0),
+    'square meter': ('sq ft', 10.7639), 'square metre': ('sq ft', 10.7639), 'sq m': ('sq ft', 10.7639), 'sqm': ('sq ft', 10.7639),
+    'litre': ('litre', 1.0), 'liter': ('litre', 1.0), 'l': ('litre', 1.0), 'ltr': ('litre', 1.0), 'ml': ('litre', 0.001),
+    'cubic meter': ('cu m', 1.0), 'cubic metre': ('cu m', 1.0), 'cu m': ('cu m', 1.0), 'cbm': ('cu m', 1.0),
+    'cubic feet': ('cu m', 0.0283168), 'cft': ('cu m', 0.0283168),
+}
+
+# Per-material-class sizes for pack units that otherwise stay as their own unit
+PACK_SIZES = {
+    'cement': {'bag': ('kg', 50.0)},
+}
+
+_PRICE_NUMBER = re.compile(r'(\d[\d,]*(?:\.\d+)?)(?:\s*(lakhs?|lacs?|crores?|cr)\b)?', re.IGNORECASE)
+# Indian number words after a price: '₹ 2.5 Lakh' is 250000
+SCALES = {'lakh': 1e5, 'lac': 1e5, 'crore': 1e7, 'cr': 1e7}
+_UNIT_PREFIX = re.compile(r'^(?:/|per\s+|a\s+)', re.IGNORECASE)
+
+
+def parse_price(text) -> Optional[float]:
+    """'₹ 1,250.50/Bag' -> 1250.5; '₹ 2.5 Lakh' -> 250000.0; a range '₹ 400 - 500' -> its midpoint;
+    None when there is no number"""
+    matches = [(float(n.replace(',', '')), scale.lower().rstrip('s')) for n, scale in _PRICE_NUMBER.findall(str(text or ''))]
+    matches = [(n, scale) for n, scale in matches if n > 0]
+    if not matches:
+        return None
+    if len(matches) >= 2 and re.search(r'\d\s*(?:-|to)\s*(?:₹|rs\.?)?\s*\d', str(text), re.IGNORECASE):
+        # '₹ 1 - 1.5 Lakh': the upper bound's scale applies to an unscaled lower bound
+        (low, low_scale), (high, high_scale) = matches[:2]
+        return (low * SCALES.get(low_scale or high_scale, 1.0) + high * SCALES.get(high_scale, 1.0)) / 2
+    number, scale = matches[0]
+    return number * SCALES.get(scale, 1.0)
+
+
+def _singular(unit: str) -> str:
+    if unit.endswith('es') and unit[:-2].endswith(('x', 'ch', 'sh')):
+        return unit[:-2]
+    return unit[:-1] if unit.endswith('s') and not unit.endswith('ss') else unit
+
+
+def normalize_unit(unit, material_class: str = '') -> Tuple[str, float]:
+    """Canonical unit and size for a free-text unit: 'Per Tonne' -> ('kg', 1000.0)"""
+    unit = _UNIT_PREFIX.sub('', str(unit or '').strip()).lower()
+    unit = ' '.join(re.sub(r'[^a-z\s]', ' ', unit).split())
+    if not unit or unit == 'n a':
+        return 'piece', 1.0
+    if unit in UNIT_ALIASES:
+        return UNIT_ALIASES[unit]
+    unit = _singular(unit)
+    for name, sizes in PACK_SIZES.items():
+        if name in material_class and unit in sizes:
+            return sizes[unit]
+    return UNIT_ALIASES.get(unit, (unit, 1.0))
+
+
+def normalize_price(item: Dict[str, Any], material_class: str = '') -> Dict[str, Any]:
+    """Numeric price fields for a scraped product: price_value, canonical_unit and unit_price"""
+    price = parse_price(item.get('price_text') or item.get('price'))
+    canonical_unit, size = normalize_unit(item.get('price_unit'), material_class.lower())
+    return {
+        'price_value': price,
+        'canonical_unit': canonical_unit,
+        'unit_price': price / size if price is not None and size else None
+    }
+
+
+def price_stats(prices: Iterable[float]) -> Optional[Dict[str, float]]:
+    prices = np.array([p for p in prices if p is not None], dtype='float64')
+    if not len(prices):
+        return None
+    p25, median, p75 = np.percentile(prices, [25, 50, 75])
+    return {'median': float(median), 'p25': float(p25), 'p75': float(p75), 'iqr': float(p75 - p25), 'n': int(len(prices))}
+
+
+class PriceIndex:
+    """Precomputed unit price distributions per catalog material and per product category.
+
+    Only prices in a group's most common canonical unit are pooled, so a material's
+    median never mixes Rupees per kg with Rupees per piece.
+    """
+
+    def __init__(self, materials: Dict[str, Dict[str, Any]], categories: Dict[str, Dict[str, Any]]):
+        self.materials = materials
+        self.categories = categories
+
+    @staticmethod
+    def _distribution(products: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        units = Counter(p['canonical_unit'] for p in products if p.get('unit_price') is not None)
+        if not units:
+            return None
+        unit = units.most_common(1)[0][0]
+        stats = price_stats(p['unit_price'] for p in products if p.get('canonical_unit') == unit)
+        return dict(stats, unit=unit) if stats else None
+
+    @classmethod
+    def build(cls, metadata: List[Dict[str, Any]], material_matches=None, top_k: int = 10) -> "PriceIndex":
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for meta in metadata:
+            by_category.setdefault(meta.get('category', 'general'), []).append(meta)
+        categories = {c: d for c, d in ((c, cls._distribution(p)) for c, p in by_category.items()) if d}
+
+        materials = {}
+        if material_matches is not None:
+            for material in material_matches.table['matches']:
+                products = [metadata[i] for i, _ in material_matches.lookup(material, top_k)]
+                distribution = cls._distribution(products)
+                if distribution:
+                    materials[material] = distribution
+        return cls(materials, categories)
+
+    def lookup(self, material: str = None, category: str = None) -> Optional[Dict[str, Any]]:
+        """Price distribution for a catalog material, falling back to its product category"""
+        return self.materials.get(material) or self.categories.get(category)
@@ -1,23 +1,30 @@
 import json
 import os
 import re
-from typing import List, Dict, Any
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import faiss
+from typing import List, Dict, Any, Iterator
 import numpy as np
-import ollama
 from datetime import datetime
 
+# sentence_transformers (torch), faiss and ollama are imported where first used, so
+# importing this module stays cheap for callers that never build an index or ask the LLM
+
 class IndiaMART_RAG:
     def __init__(self, json_dir: str = "json", embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
         self.json_dir = r"/home/subi/Documents/rag/vendor-rag-model/json"
         self.embedding_model_name = embedding_model
-        self.embedding_model = SentenceTransformer(embedding_model)
+        self._embedding_model = None
         self.index = None
         self.documents = []
         self.metadata = []
         
+    @property
+    def embedding_model(self):
+        """The sentence encoder, loaded on first use"""
+        if self._embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedding_model = SentenceTransformer(self.embedding_model_name)
+        return self._embedding_model
+    
     def load_and_process_json_files(self):
         """Load all JSON files from the directory and process them"""
         print("Loading JSON files...")
@@ -108,6 +115,7 @@ class IndiaMART_RAG:
         embeddings = self.embedding_model.encode(self.documents, show_progress_bar=True)
         
         # Create FAISS index
+        import faiss
         dimension = embeddings.shape[1]
         self.index = faiss.IndexFlatL2(dimension)
         self.index.add(np.array(embeddings).astype('float32'))
@@ -301,10 +309,9 @@ class IndiaMART_RAG:
         
         return materials
     
-    def generate_response(self, query: str, context: List[Dict[str, Any]], 
-                         requirements: Dict[str, Any] = None, 
-                         material_estimates: List[Dict[str, Any]] = None) -> str:
-        """Generate response using Ollama"""
+    def build_prompt(self, query: str, context: List[Dict[str, Any]], 
+                     material_estimates: List[Dict[str, Any]] = None) -> str:
+        """Build the answer prompt from retrieved context"""
         # Prepare context text
         context_text = ""
         for i, result in enumerate(context):
@@ -342,9 +349,15 @@ Instructions:
 
 Answer:
 """
-        
-        # Generate response using Ollama
+        return prompt
+    
+    def generate_response(self, query: str, context: List[Dict[str, Any]], 
+                         requirements: Dict[str, Any] = None, 
+                         material_estimates: List[Dict[str, Any]] = None) -> str:
+        """Generate response using Ollama"""
+        prompt = self.build_prompt(query, context, material_estimates)
         try:
+            import ollama
             response = ollama.chat(model='llama3:latest', messages=[
                 {
                     'role': 'user',
@@ -355,6 +368,23 @@ Answer:
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
+    def stream_response(self, query: str, context: List[Dict[str, Any]], 
+                        requirements: Dict[str, Any] = None, 
+                        material_estimates: List[Dict[str, Any]] = None) -> Iterator[str]:
+        """Generate response using Ollama, yielding text as it is produced"""
+        prompt = self.build_prompt(query, context, material_estimates)
+        try:
+            import ollama
+            for chunk in ollama.chat(model='llama3:latest', messages=[
+                {
+                    'role': 'user',
+                    'content': prompt,
+                },
+            ], stream=True):
+                yield chunk['message']['content']
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+    
     def format_material_table(self, materials: List[Dict[str, Any]]) -> str:
         """Format material estimates as a table"""
         if not materials:
@@ -370,8 +400,8 @@ Answer:
         
         return table
     
-    def query(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
-        """Main query function"""
+    def retrieve_context(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
+        """Extract requirements, estimate materials and retrieve filtered results"""
         # Extract project requirements if present
         requirements = self.extract_project_requirements(query)
         material_estimates = []
@@ -389,8 +419,20 @@ Answer:
         else:
             filtered_results = search_results
         
+        return {
+            'results': filtered_results,
+            'requirements': requirements,
+            'material_estimates': material_estimates
+        }
+    
+    def query(self, query: str, k: int = 10, apply_filters: bool = True) -> Dict[str, Any]:
+        """Main query function"""
+        context = self.retrieve_context(query, k=k, apply_filters=apply_filters)
+        filtered_results = context['results']
+        material_estimates = context['material_estimates']
+        
         # Generate response
-        response = self.generate_response(query, filtered_results, requirements, material_estimates)
+        response = self.generate_response(query, filtered_results, context['requirements'], material_estimates)
         
         # Extract sources
         sources = [result['metadata']['url'] for result in filtered_results if result['metadata']['url']]
@@ -408,6 +450,14 @@ Answer:
             'num_results': len(filtered_results),
             'material_estimates': material_estimates
         }
+    
+    def stream_query(self, query: str, k: int = 10, apply_filters: bool = True) -> Iterator[str]:
+        """Streaming variant of query(): yields the answer, then the material table"""
+        context = self.retrieve_context(query, k=k, apply_filters=apply_filters)
+        yield from self.stream_response(query, context['results'], context['requirements'], context['material_estimates'])
+        
+        if context['material_estimates']:
+            yield f"\n\nMaterial Estimates:\n{self.format_material_table(context['material_estimates'])}"
 
 # Example usage
 if __name__ == "__main__":
@@ -429,7 +479,8 @@ if __name__ == "__main__":
     
     for query in queries:
         print(f"\nQuery: {query}")
-        result = rag.query(query)
-        print(f"Answer: {result['answer']}")
-        print(f"Sources: {result['sources'][:3]}")  # Show first 3 sources only
+        print("Answer: ", end="", flush=True)
+        for token in rag.stream_query(query):
+            print(token, end="", flush=True)
+        print()
         print("-" * 80)
\ No newline at end of file
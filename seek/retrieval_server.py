@@ -0,0 +1,222 @@
+"""Standalone retrieval service: one warm index shared by any number of frontends.
+
+Usage (from the seek/ directory):
+    python retrieval_server.py --products filtered_products.json --port 8765
+
+Endpoints:
+    POST /search   {"query": "...", "k": 5, "filters": true}  -> {"results": [...]}
+    GET  /health   index size and snapshot version
+    GET  /metrics  request, batch and latency counters
+
+Concurrent /search requests are micro-batched: the first request of a batch waits up
+to --max-wait-ms for others, then the whole batch is encoded and searched in one call.
+The index is hot-reloaded when the product file changes, like the Streamlit app's.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+import metrics
+from snapshots import SnapshotManager
+
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 2048
+
+
+class MicroBatcher:
+    """Collects concurrent search requests for a few milliseconds and runs them as one batch"""
+
+    def __init__(self, snapshots: SnapshotManager, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.snapshots = snapshots
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, int, bool, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self._worker = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, query: str, k: int = 5, filters: bool = False) -> Future:
+        future: Future = Future()
+        self._queue.put((query, k, filters, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> List[Tuple[str, int, bool, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.snapshots.acquire() as rag:
+                    metrics.QUERIES.inc(len(batch), kind="retrieval_server")
+                    results = rag.search_batch([query for query, *_ in batch], k=max(k for _, k, *_ in batch))
+                    for (query, k, filters, future, _), hits in zip(batch, results):
+                        hits = hits[:k]
+                        future.set_result(rag.filter_by_criteria(hits, query) if filters else hits)
+            except Exception as e:
+                for *_, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._lock:
+                    self.errors += len(batch)
+            finished = time.perf_counter()
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self._latencies.extend(finished - submitted for *_, submitted in batch)
+                del self._latencies[:-LATENCY_WINDOW]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'queue_depth': self._queue.qsize(),
+                'latency_ms': {
+                    'p50': round(float(np.percentile(latencies, 50)), 2),
+                    'p95': round(float(np.percentile(latencies, 95)), 2),
+                    'p99': round(float(np.percentile(latencies, 99)), 2)
+                } if len(latencies) else {}
+            }
+
+
+def _serializable(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {'document': result['document'], 'metadata': result['metadata'], 'distance': float(result['distance'])}
+
+
+def make_handler(batcher: MicroBatcher, snapshots: SnapshotManager, timeout: float = 30.0):
+    class RetrievalHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict[str, Any]):
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                snapshot = snapshots.current
+                with snapshots.acquire() as rag:
+                    documents = len(rag.documents)
+                self._send(200, {
+                    'status': 'ok' if documents else 'empty',
+                    'documents': documents,
+                    'snapshot_version': snapshot.version,
+                    'snapshot_built_at': snapshot.built_at,
+                    'reload_error': str(snapshots.last_error) if snapshots.last_error else None
+                })
+            elif self.path == '/metrics':
+                self._send(200, batcher.metrics())
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/search':
+                self._send(404, {'error': f"Unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                query = str(request['query'])
+                k = int(request.get('k', 5))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {'error': f"Expected JSON with 'query' and optional 'k', 'filters': {e}"})
+                return
+            try:
+                results = batcher.submit(query, k, bool(request.get('filters', False))).result(timeout=timeout)
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+                return
+            self._send(200, {'query': query, 'results': [_serializable(r) for r in results]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return RetrievalHandler
+
+
+class RetrievalClient:
+    """search()/filtered search against a running retrieval server, with IndiaMART_RAG's result format"""
+
+    def __init__(self, base_url: str = f"http://127.0.0.1:{DEFAULT_PORT}", timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def search(self, query: str, k: int = 5, filters: bool = False) -> List[Dict[str, Any]]:
+        response = self.session.post(f"{self.base_url}/search", json={'query': query, 'k': k, 'filters': filters}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['results']
+
+    def health(self) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def serve(products: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT, max_batch: int = 32,
+          max_wait_ms: float = 5.0, poll_interval: float = 10.0, ready: Optional[threading.Event] = None):
+    from groqupdate import IndiaMART_RAG
+
+    def build() -> IndiaMART_RAG:
+        rag = IndiaMART_RAG(json_file=products, require_api_key=False)
+        rag.load_and_process_json_files()
+        rag.build_faiss_index()
+        return rag
+
+    metrics.serve_from_env()
+    snapshots = SnapshotManager(build, [products], poll_interval=poll_interval).start()
+    batcher = MicroBatcher(snapshots, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, snapshots))
+    print(f"Retrieval server on http://{host}:{port} ({len(snapshots.current.value.documents)} documents)")
+    if ready is not None:
+        ready.set()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        snapshots.stop()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Serve IndiaMART product retrieval over HTTP with micro-batching")
+    parser.add_argument('--products', default='filtered_products.json', help="Product JSON file or directory to index")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch', type=int, default=32, help="Most queries encoded and searched together")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="How long a query waits for others to batch with")
+    parser.add_argument('--poll-interval', type=float, default=10.0, help="Seconds between product file change checks")
+    args = parser.parse_args(argv)
+    serve(args.products, args.host, args.port, args.max_batch, args.max_wait_ms, args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Structured construction schedules: the JSON task schema the LLM is asked for, its
+validation, and a deterministic schedule from default lead times to fall back on.
+
+A task is a plain dict:
+
+    {'id': '4.1', 'section': '4. Mechanical & Electrical', 'task': 'Transformer Installation',
+     'kind': 'installation', 'start': '2026-12-01', 'finish': '2026-12-15',
+     'material': 'Transformer', 'notes': 'HV equipment'}
+
+Dates are ISO strings so tasks serialize as-is and convert to numpy datetime64 in one call.
+"""
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+KINDS = ('construction', 'procurement', 'installation')
+# Days from today to the construction start when a request does not give one
+PROJECT_START_OFFSET_DAYS = int(os.getenv('SEEK_PROJECT_START_OFFSET_DAYS', '0'))
+INSTALL_DAYS = 30
+DEFAULT_LEAD_WEEKS = 8
+# Inspection, unloading and staging between delivery and installation; timeline.py plans with the same buffer
+BUFFER_DAYS = 7
+
+# Industry-standard lead times by material keyword, first match wins
+LEAD_WEEKS = [
+    ('transformer', 50), ('switchgear', 40), ('generator', 36), ('dg set', 36), ('chiller', 30),
+    ('elevator', 30), ('lift', 30), ('hvac', 24), ('air handling', 24), ('cable', 20), ('ups', 16),
+    ('glazing', 12), ('glass', 12), ('pipe', 8), ('steel', 8), ('rebar', 6), ('insulation', 6),
+    ('brick', 4), ('tile', 4), ('paint', 2), ('sand', 1), ('aggregate', 1), ('concrete', 1), ('cement', 1),
+]
+# Keywords match whole words (plus a plural 's'), so 'tile' does not match "Textile" nor 'ups' "groups"
+LEAD_PATTERNS = [(re.compile(r'\b' + re.escape(keyword) + r's?\b'), weeks) for keyword, weeks in LEAD_WEEKS]
+
+# Materials fixed during structural work; everything else is installed in the M&E phase
+STRUCTURAL_KEYWORDS = ('steel', 'rebar', 'cement', 'concrete', 'brick', 'sand', 'aggregate', 'block')
+STRUCTURAL_PATTERN = re.compile(r'\b(?:' + '|'.join(STRUCTURAL_KEYWORDS) + r')s?\b')
+
+SECTIONS = {
+    'design': '1. Design & Engineering',
+    'site': '2. Site Preparation',
+    'structure': '3. Structural Work',
+    'mep': '4. Mechanical & Electrical',
+    'finishing': '5. Finishing & Commissioning',
+}
+
+# (id, section, task, offset from project start in days, duration in days, notes)
+BASE_TASKS = [
+    ('1.1', 'design', 'Conceptual Design', 0, 30, '30% Design'),
+    ('1.2', 'design', 'Detailed Design', 31, 45, '100% Design'),
+    ('1.3', 'design', 'Permits Approval', 59, 60, 'Regulatory'),
+    ('2.1', 'site', 'Land Clearing', 120, 15, 'Earthwork'),
+    ('2.2', 'site', 'Foundation Work', 135, 45, 'Excavation'),
+    ('3.1', 'structure', 'Steel Erection', 181, 60, 'Framework'),
+    ('3.2', 'structure', 'Concrete Work', 212, 75, 'Slabs & walls'),
+]
+MEP_START_DAY = 300
+FINISHING_TASKS = [
+    ('5.1', 'Interior Work', 90, 'Final touches'),
+    ('5.2', 'Testing', 30, 'Systems check'),
+    ('5.3', 'Handover', 15, 'Project completion'),
+]
+
+SCHEDULE_SCHEMA = {
+    'type': 'object',
+    'required': ['tasks'],
+    'properties': {
+        'tasks': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['id', 'section', 'task', 'kind', 'start', 'finish'],
+                'properties': {
+                    'id': {'type': 'string', 'description': "WBS id, e.g. '4.1'"},
+                    'section': {'type': 'string', 'description': "WBS level 2 phase, e.g. '4. Mechanical & Electrical'"},
+                    'task': {'type': 'string'},
+                    'kind': {'enum': list(KINDS)},
+                    'start': {'type': 'string', 'format': 'date', 'description': 'YYYY-MM-DD'},
+                    'finish': {'type': 'string', 'format': 'date', 'description': 'YYYY-MM-DD, not before start'},
+                    'material': {'type': 'string', 'description': 'Material this procurement/installation task is for'},
+                    'notes': {'type': 'string'},
+                },
+            },
+        },
+    },
+}
+
+_DATE_FORMATS = ('%Y-%m-%d', '%d-%b-%Y', '%b %d, %Y', '%d/%m/%Y')
+
+
+def keyword_lead_weeks(material: str) -> Optional[int]:
+    """Lead time of the first LEAD_WEEKS keyword in the material name, None when none matches"""
+    name = material.lower()
+    for pattern, weeks in LEAD_PATTERNS:
+        if pattern.search(name):
+            return weeks
+    return None
+
+
+def lead_weeks(material: str) -> int:
+    weeks = keyword_lead_weeks(material)
+    return DEFAULT_LEAD_WEEKS if weeks is None else weeks
+
+
+def parse_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def project_start(value=None) -> date:
+    """The construction start: value as a date or YYYY-MM-DD string, else today plus PROJECT_START_OFFSET_DAYS"""
+    return (parse_date(value) if value else None) or date.today() + timedelta(days=PROJECT_START_OFFSET_DAYS)
+
+
+def make_task(id_: str, section: str, task: str, kind: str, start: date, finish: date,
+              material: str = '', notes: str = '') -> Dict[str, Any]:
+    return {'id': id_, 'section': section, 'task': task, 'kind': kind, 'start': start.isoformat(),
+            'finish': finish.isoformat(), 'material': material, 'notes': notes}
+
+
+def validate_tasks(data) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Tasks that satisfy SCHEDULE_SCHEMA, normalized; and one message per rejected task"""
+    items = data.get('tasks') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return [], ["expected an object with a 'tasks' array"]
+    tasks, errors = [], []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(f"task {i}: not an object")
+            continue
+        name = str(item.get('task') or '').strip()
+        start, finish = parse_date(item.get('start')), parse_date(item.get('finish'))
+        if not name:
+            errors.append(f"task {i}: missing task name")
+        elif start is None or finish is None:
+            errors.append(f"task {i} ({name}): start/finish must be YYYY-MM-DD")
+        elif finish < start:
+            errors.append(f"task {i} ({name}): finish {finish} is before start {start}")
+        else:
+            kind = str(item.get('kind') or 'construction').lower()
+            tasks.append(make_task(str(item.get('id') or i + 1), str(item.get('section') or ''), name,
+                                   kind if kind in KINDS else 'construction', start, finish,
+                                   str(item.get('material') or ''), str(item.get('notes') or '')))
+    return tasks, errors
+
+
+def parse_schedule(text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Validated tasks from an LLM reply, tolerating code fences and prose around the JSON"""
+    text = re.sub(r'```(?:json)?', '', text or '')
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    if start < 0:
+        return [], ["no JSON in the response"]
+    end = max(text.rfind('}'), text.rfind(']'))
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        return [], [f"invalid JSON: {e}"]
+    return validate_tasks(data)
+
+
+def _covers(tasks: List[Dict[str, Any]], material: str, kind: str) -> bool:
+    name = material.lower()
+    return any(t['kind'] == kind and (name in t['material'].lower() or name in t['task'].lower()) for t in tasks)
+
+
+def material_tasks(material: str, index: int, start: date = None) -> List[Dict[str, Any]]:
+    """Procurement then installation for one material, ordered so it arrives when its phase needs it"""
+    start = project_start(start)
+    lead = lead_weeks(material)
+    structural = bool(STRUCTURAL_PATTERN.search(material.lower()))
+    section = 'structure' if structural else 'mep'
+    need = start + timedelta(days=181 if structural else MEP_START_DAY)
+    order_by = max(start, need - timedelta(weeks=lead, days=BUFFER_DAYS))
+    delivery = order_by + timedelta(weeks=lead)
+    install_start = max(delivery + timedelta(days=BUFFER_DAYS), need)
+    prefix = '3' if structural else '4'
+    return [
+        make_task(f"{prefix}.P{index}", SECTIONS[section], f"Procure {material}", 'procurement', order_by, delivery,
+                  material, f"{lead} weeks lead time"),
+        make_task(f"{prefix}.I{index}", SECTIONS[section], f"Install {material}", 'installation', install_start,
+                  install_start + timedelta(days=INSTALL_DAYS), material),
+    ]
+
+
+def _finishing(tasks: List[Dict[str, Any]], start: date) -> List[Dict[str, Any]]:
+    begin = max([parse_date(t['finish']) for t in tasks] + [start + timedelta(days=MEP_START_DAY)]) + timedelta(days=1)
+    result = []
+    for id_, name, days, notes in FINISHING_TASKS:
+        finish = begin + timedelta(days=days)
+        result.append(make_task(id_, SECTIONS['finishing'], name, 'construction', begin, finish, notes=notes))
+        begin = finish + timedelta(days=1)
+    return result
+
+
+def default_schedule(materials: List[str], start: date = None) -> List[Dict[str, Any]]:
+    """A complete schedule from BASE_TASKS and LEAD_WEEKS alone, no LLM involved"""
+    start = project_start(start)
+    tasks = [make_task(id_, SECTIONS[section], name, 'construction', start + timedelta(days=offset),
+                       start + timedelta(days=offset + days), notes=notes)
+             for id_, section, name, offset, days, notes in BASE_TASKS]
+    for i, material in enumerate(materials, 1):
+        tasks.extend(material_tasks(material, i, start))
+    return tasks + _finishing(tasks, start)
+
+
+def complete_schedule(tasks: List[Dict[str, Any]], materials: List[str], start: date = None) -> Tuple[List[Dict[str, Any]], str]:
+    """LLM tasks with every uncovered material filled in from default lead times.
+
+    Returns the tasks and their source: 'llm', 'llm+default' or 'default'.
+    """
+    start = project_start(start)
+    if not tasks:
+        return default_schedule(materials, start), 'default'
+    filled = list(tasks)
+    for i, material in enumerate(materials, 1):
+        for task in material_tasks(material, i, start):
+            if not _covers(tasks, material, task['kind']):
+                filled.append(task)
+    return sorted(filled, key=lambda t: (t['start'], t['id'])), 'llm' if len(filled) == len(tasks) else 'llm+default'
+
+
+def to_markdown(tasks: List[Dict[str, Any]]) -> str:
+    """The schedule as one Markdown table per WBS section"""
+    sections: Dict[str, List[Dict[str, Any]]] = {}
+    for task in tasks:
+        sections.setdefault(task['section'] or 'Other', []).append(task)
+    lines = []
+    for section, rows in sorted(sections.items()):
+        lines += [f"**WBS Level 2: {section}**", "", "| ID | Task | Duration | Start | Finish | Notes |", "|----|------|----------|-------|--------|-------|"]
+        for t in rows:
+            days = (parse_date(t['finish']) - parse_date(t['start'])).days
+            lines.append(f"| {t['id']} | {t['task']} | {days} days | {t['start']} | {t['finish']} | {t['notes']} |")
+        lines.append("")
+    return "\n".join(lines)
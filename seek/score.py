@@ -0,0 +1,113 @@
+"""Bulk-score invoice lines with the served model bundle.
+
+Usage (from the seek/ directory):
+    python score.py clean_test_full.csv --out submission_lgb.csv --n-jobs 8
+
+Predicts like run_ml_prediction in the app. MasterItemNo comes from the deterministic
+mapping when the cleaned description is in it, and from the classifier otherwise.
+QtyShipped comes from the regressor. The input is read in chunks, and each chunk is
+featurized in one vectorized pass. Chunks go to a pool of worker processes, each of
+which loads the bundle once; results are written in input order.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+import features
+import model_bundle
+
+OUTPUT_COLUMNS = ['id', 'MasterItemNo', 'QtyShipped', 'prediction_method']
+SCORE_CHUNK_ROWS = 20000
+
+# Bundle loaded by each worker process in _init_worker
+_artifacts: Dict[str, Any] = None
+
+
+def score_chunk(artifacts: Dict[str, Any], df: pd.DataFrame) -> pd.DataFrame:
+    """One output row per input row: deterministic mapping first, classifier for the rest"""
+    X = artifacts['featurizer'].transform(df)
+    master_item_no = features.clean_text(df['ItemDescription']).map(artifacts['det_items'])
+    deterministic = master_item_no.notna().to_numpy()
+    rest = np.flatnonzero(~deterministic)
+    if len(rest):
+        predicted = artifacts['lgb_classifier'].predict(X[rest])
+        master_item_no.iloc[rest] = artifacts['label_encoder'].inverse_transform(predicted.astype(int))
+    qty_shipped = np.maximum(1, artifacts['lgb_regressor'].predict(X).astype(int))
+    return pd.DataFrame({
+        'id': df['id'].to_numpy() if 'id' in df else df.index.to_numpy(),
+        'MasterItemNo': master_item_no.to_numpy(),
+        'QtyShipped': qty_shipped,
+        'prediction_method': np.where(deterministic, 'deterministic', 'classification_model')
+    })
+
+
+def _init_worker(version: str, models_dir: str):
+    global _artifacts
+    # One LightGBM thread per worker; the pool already spreads chunks across cores
+    os.environ['OMP_NUM_THREADS'] = '1'
+    _artifacts, _ = model_bundle.load_bundle(version, models_dir)
+
+
+def _score_in_worker(df: pd.DataFrame) -> pd.DataFrame:
+    return score_chunk(_artifacts, df)
+
+
+def score(input_csv: str, out: str, version: str, models_dir: str, n_jobs: int, chunk_rows: int) -> Counter:
+    """Scores input_csv into out; returns rows per prediction method"""
+    methods = Counter()
+
+    def write(result: pd.DataFrame, f, first: bool):
+        result.to_csv(f, header=first, index=False)
+        methods.update(result['prediction_method'])
+
+    chunks = features.read_chunks(input_csv, chunk_rows)
+    with open(out, 'w', encoding='utf-8', newline='') as f:
+        if n_jobs == 1:
+            artifacts, _ = model_bundle.load_bundle(version, models_dir)
+            for i, chunk in enumerate(chunks):
+                write(score_chunk(artifacts, chunk), f, i == 0)
+            return methods
+        # At most two chunks per worker in flight, so the input is never read far ahead of the output
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(version, models_dir)) as pool:
+            pending, written = deque(), 0
+            for chunk in chunks:
+                pending.append(pool.submit(_score_in_worker, chunk))
+                if len(pending) >= 2 * n_jobs:
+                    write(pending.popleft().result(), f, written == 0)
+                    written += 1
+            while pending:
+                write(pending.popleft().result(), f, written == 0)
+                written += 1
+    return methods
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Predict MasterItemNo and QtyShipped for every row of an invoice CSV")
+    parser.add_argument('input', help="Invoice lines CSV, e.g. clean_test_full.csv")
+    parser.add_argument('--out', default='predictions.csv', help="Output CSV: " + ", ".join(OUTPUT_COLUMNS))
+    parser.add_argument('--models-dir', default=model_bundle.MODELS_DIR)
+    parser.add_argument('--version', help="Bundle to score with (default: LATEST)")
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--chunk-rows', type=int, default=SCORE_CHUNK_ROWS, help="Rows featurized and scored per task")
+    args = parser.parse_args(argv)
+
+    version = args.version or model_bundle.latest_version(args.models_dir)
+    if version is None:
+        sys.exit(f"No model bundle in {args.models_dir}; train one with `python train.py`")
+
+    start = time.perf_counter()
+    methods = score(args.input, args.out, version, args.models_dir, args.n_jobs, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    rows = sum(methods.values())
+    print(f"Scored {rows} rows with bundle {version} in {elapsed:.1f}s: {rows / elapsed if elapsed else 0:.0f} rows/sec "
+          f"({', '.join(f'{method} {count}' for method, count in methods.most_common())})")
+    print(f"Predictions written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Per-category product index shards with an intent router.
+
+Every product category (one json/<category>_links.json file) gets its own FAISS
+index holding global product ids, so a shard can be rebuilt on its own and a
+category-scoped query only scans the shards it names. Unscoped queries fan out to
+every shard in parallel threads and the per-shard top-k lists are merged by distance,
+which gives the same results as one flat index over all products.
+
+Vectors are L2-normalized and searched by inner product, and distances are reported
+as cosine distance (1 - similarity). Shards can store them compressed: 'fp16' halves
+and 'sq8' quarters the 1.5 KB a 384-dim fp32 MiniLM vector takes, and pca_dims
+projects to fewer dimensions first. bench_index.py reports the memory, latency and
+recall trade-off of each setting.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import faiss
+import numpy as np
+from gazetteer import normalize_text
+from intent import KeywordAutomaton, QueryIntent
+
+# Catalog material -> shards routing reads this many precomputed product matches per material
+ROUTE_MATCHES = 10
+
+# Shard storage: fp32 vectors, or faiss scalar quantizer codes
+COMPRESSION = {
+    'fp32': None,
+    'fp16': faiss.ScalarQuantizer.QT_fp16,
+    'sq8': faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.array(vectors, dtype='float32', copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _word_forms(word: str) -> List[str]:
+    forms = [word]
+    if word.endswith('s') and len(word) > 3:
+        forms.append(word[:-1])
+    else:
+        forms.append(word + 's')
+    return forms
+
+
+def shard_phrases(name: str) -> List[str]:
+    """Query phrases that name a shard: 'ht_switch_gear' -> 'ht switch gear', 'ht switch gears'"""
+    words = normalize_text(name.replace('_', ' ')).split()
+    if not words:
+        return []
+    return [' '.join(words[:-1] + [form]) for form in _word_forms(words[-1])]
+
+
+class ShardedIndex:
+    """FAISS-compatible search over per-category shards: search(vectors, k) -> (distances, ids)"""
+
+    def __init__(self, dimension: int, compression: str = 'fp32', pca_dims: int = None, max_workers: int = None):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown index compression {compression!r}; expected one of {sorted(COMPRESSION)}")
+        self.input_d = dimension
+        self.compression = compression
+        self.pca_dims = pca_dims if pca_dims and pca_dims < dimension else None
+        self.d = self.pca_dims or dimension
+        self.pca = None
+        self._storage = None
+        self.shards: Dict[str, faiss.Index] = {}
+        self.material_shards: Dict[str, List[str]] = {}
+        self.router = KeywordAutomaton()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1),
+                                            thread_name_prefix="shard-search")
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards.values())
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._storage is not None
+
+    def train(self, vectors: np.ndarray):
+        """Fit the PCA projection and the quantizer once on the whole corpus; every shard shares them"""
+        vectors = normalize(vectors)
+        if self.pca_dims and len(vectors) >= self.pca_dims:
+            self.pca, self.d = faiss.PCAMatrix(self.input_d, self.pca_dims), self.pca_dims
+            self.pca.train(vectors)
+        else:
+            self.pca, self.d = None, self.input_d
+        qtype = COMPRESSION[self.compression]
+        if qtype is None:
+            self._storage = faiss.IndexFlatIP(self.d)
+        else:
+            self._storage = faiss.IndexScalarQuantizer(self.d, qtype, faiss.METRIC_INNER_PRODUCT)
+            self._storage.train(self._project(vectors))
+
+    def _project(self, normalized: np.ndarray) -> np.ndarray:
+        if self.pca is None:
+            return normalized
+        return normalize(self.pca.apply_py(normalized))
+
+    def prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Raw embeddings -> the normalized (and projected) vectors the shards store"""
+        return self._project(normalize(vectors))
+
+    @classmethod
+    def build(cls, metadata: List[Dict[str, Any]], embeddings: np.ndarray, material_matches=None,
+              compression: str = 'fp32', pca_dims: int = None) -> "ShardedIndex":
+        embeddings = np.asarray(embeddings, dtype='float32')
+        index = cls(embeddings.shape[1], compression, pca_dims)
+        index.train(embeddings)
+        by_category: Dict[str, List[int]] = {}
+        for position, meta in enumerate(metadata):
+            by_category.setdefault(meta.get('category', 'general'), []).append(position)
+        for category, positions in by_category.items():
+            index.rebuild_shard(category, positions, embeddings[positions])
+        if material_matches is not None:
+            index.route_materials(metadata, material_matches)
+        return index
+
+    def rebuild_shard(self, name: str, ids: Sequence[int], vectors: np.ndarray):
+        """Replace (or add) one shard from raw embeddings; the other shards are untouched"""
+        if not self.is_trained:
+            self.train(vectors)
+        shard = faiss.IndexIDMap(faiss.clone_index(self._storage))
+        if len(ids):
+            shard.add_with_ids(self.prepare(vectors), np.asarray(ids, dtype='int64'))
+        is_new = name not in self.shards
+        self.shards[name] = shard
+        if is_new:
+            self._rebuild_router()
+
+    def drop_shard(self, name: str):
+        if self.shards.pop(name, None) is not None:
+            self._rebuild_router()
+
+    def route_materials(self, metadata: List[Dict[str, Any]], material_matches):
+        """Catalog material -> the shards holding its precomputed best products"""
+        self.material_shards = {}
+        for material in material_matches.table['matches']:
+            categories = {metadata[i].get('category', 'general') for i, _ in material_matches.lookup(material, ROUTE_MATCHES)}
+            if categories:
+                self.material_shards[material] = sorted(categories)
+
+    def _rebuild_router(self):
+        self.router = KeywordAutomaton()
+        for name in self.shards:
+            for phrase in shard_phrases(name):
+                self.router.add(phrase, name)
+        self.router.build()
+
+    def route(self, query) -> Optional[List[str]]:
+        """Shards a query is scoped to (by category name or catalog material), or None for all shards"""
+        if query is None:
+            return None
+        intent = query if isinstance(query, QueryIntent) else None
+        text = intent.text if intent is not None else str(query)
+        selected = {name for _, _, name in self.router.find(normalize_text(text).split())}
+        if intent is not None:
+            for material in intent.materials:
+                selected.update(self.material_shards.get(material, []))
+        return sorted(selected) if selected else None
+
+    def _search_shard(self, name: str, vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        shard = self.shards[name]
+        similarities, ids = shard.search(vectors, min(k, shard.ntotal))
+        return 1.0 - similarities, ids
+
+    def search(self, vectors: np.ndarray, k: int, shards: List[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (cosine distances, global ids) over the given shards, or all of them; rows are padded with -1 ids"""
+        vectors = self.prepare(vectors)
+        names = [n for n in (shards or self.shards) if n in self.shards and self.shards[n].ntotal]
+        # A scope too small to fill k falls back to every shard
+        if shards and sum(self.shards[n].ntotal for n in names) < k:
+            names = [n for n in self.shards if self.shards[n].ntotal]
+
+        distances = np.full((len(vectors), k), np.inf, dtype='float32')
+        ids = np.full((len(vectors), k), -1, dtype='int64')
+        if not names:
+            return distances, ids
+
+        if len(names) == 1:
+            parts = [self._search_shard(names[0], vectors, k)]
+        else:
+            parts = list(self._executor.map(lambda name: self._search_shard(name, vectors, k), names))
+
+        all_distances = np.hstack([d for d, _ in parts])
+        all_ids = np.hstack([i for _, i in parts])
+        all_distances[all_ids < 0] = np.inf
+        top = min(k, all_distances.shape[1])
+        best = np.argsort(all_distances, axis=1, kind='stable')[:, :top]
+        distances[:, :top] = np.take_along_axis(all_distances, best, axis=1)
+        ids[:, :top] = np.take_along_axis(all_ids, best, axis=1)
+        ids[~np.isfinite(distances)] = -1
+        return distances, ids
+
+    def stats(self) -> Dict[str, int]:
+        return {name: shard.ntotal for name, shard in sorted(self.shards.items())}
+
+    def memory_bytes(self) -> int:
+        """Serialized size of every shard plus the PCA projection"""
+        size = sum(len(faiss.serialize_index(shard)) for shard in self.shards.values())
+        if self.pca is not None:
+            size += self.pca.A.size() * 4 + self.pca.b.size() * 4
+        return size
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def fingerprint(paths: List[str]) -> Tuple:
+    """(path, mtime, size) for every file under the given files/directories; changes when any of them does"""
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    stat = os.stat(full)
+                    entries.append((full, stat.st_mtime_ns, stat.st_size))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            entries.append((path, stat.st_mtime_ns, stat.st_size))
+        else:
+            entries.append((path, None, None))
+    return tuple(entries)
+
+
+class Snapshot(Generic[T]):
+    def __init__(self, value: T, version: int, source_fingerprint: Tuple):
+        self.value = value
+        self.version = version
+        self.fingerprint = source_fingerprint
+        self.built_at = time.time()
+        self.refs = 0
+        self.retired = False
+
+
+class SnapshotManager(Generic[T]):
+    """Holds one read-only snapshot shared by every session and swaps in rebuilt ones.
+
+    Readers pin the current snapshot with acquire(); a background watcher rebuilds
+    when the source files change and swaps the new snapshot in under a lock that is
+    only held for the pointer swap. A replaced snapshot is dropped as soon as the last
+    query still using it finishes, so at most one old snapshot lives alongside the new one.
+    """
+
+    def __init__(self, build: Callable[[], T], sources: List[str], poll_interval: float = 10.0):
+        self.build = build
+        self.sources = list(sources)
+        self.poll_interval = poll_interval
+        self.last_error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._current: Optional[Snapshot[T]] = None
+        self._retired: List[Snapshot[T]] = []
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._version = 0
+
+    @property
+    def current(self) -> Optional[Snapshot[T]]:
+        return self._current
+
+    @property
+    def retired_count(self) -> int:
+        """Replaced snapshots still pinned by in-flight queries"""
+        with self._lock:
+            return len(self._retired)
+
+    def reload(self) -> Snapshot[T]:
+        """Build a snapshot from the current sources and swap it in"""
+        source_fingerprint = fingerprint(self.sources)
+        value = self.build()
+        with self._lock:
+            self._version += 1
+            snapshot = Snapshot(value, self._version, source_fingerprint)
+            previous, self._current = self._current, snapshot
+            if previous is not None:
+                previous.retired = True
+                if previous.refs:
+                    self._retired.append(previous)
+        return snapshot
+
+    @contextmanager
+    def acquire(self) -> Iterator[T]:
+        """Pin the current snapshot for the duration of a query"""
+        with self._lock:
+            snapshot = self._current
+            if snapshot is None:
+                raise RuntimeError("No snapshot loaded yet")
+            snapshot.refs += 1
+        try:
+            yield snapshot.value
+        finally:
+            with self._lock:
+                snapshot.refs -= 1
+                if snapshot.retired and snapshot.refs == 0 and snapshot in self._retired:
+                    self._retired.remove(snapshot)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self._current is None or fingerprint(self.sources) != self._current.fingerprint:
+                    self.reload()
+                    self.last_error = None
+            except Exception as e:
+                # Keep serving the previous snapshot; retry on the next change
+                self.last_error = e
+                if self._current is not None:
+                    self._current.fingerprint = fingerprint(self.sources)
+
+    def start(self) -> "SnapshotManager[T]":
+        if self._current is None:
+            self.reload()
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,80 @@
+"""Row-appendable CSR matrices on disk, read back as memory maps.
+
+    store/
+      data.f32       <- nonzero values
+      indices.i32    <- column of each value
+      indptr.i64     <- row boundaries into data/indices
+      label.f32      <- one target per row (optional)
+      meta.json      <- shape and nnz
+
+SparseWriter appends featurized chunks as they are produced, so a matrix larger than RAM
+is never assembled in memory. open_csr() wraps the files in np.memmap; scipy and LightGBM
+read the pages they touch and the OS evicts them again under memory pressure.
+"""
+import json
+import os
+from typing import Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+ARRAYS = {'data': ('data.f32', np.float32), 'indices': ('indices.i32', np.int32),
+          'indptr': ('indptr.i64', np.int64), 'label': ('label.f32', np.float32)}
+META_FILE = 'meta.json'
+
+
+class SparseWriter:
+    def __init__(self, directory: str, n_cols: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.n_cols = n_cols
+        self.n_rows, self.nnz = 0, 0
+        self.files = {name: open(os.path.join(directory, filename), 'wb') for name, (filename, _) in ARRAYS.items()}
+        self.files['indptr'].write(np.zeros(1, dtype=np.int64).tobytes())
+        self.has_label = None
+
+    def append(self, X: sparse.csr_matrix, label: np.ndarray = None):
+        if X.shape[1] != self.n_cols:
+            raise ValueError(f"Chunk has {X.shape[1]} columns, store has {self.n_cols}")
+        if self.has_label is None:
+            self.has_label = label is not None
+        elif self.has_label != (label is not None):
+            raise ValueError("Either every chunk has a label or none does")
+        X = X.tocsr()
+        X.sort_indices()
+        self.files['data'].write(np.asarray(X.data, dtype=np.float32).tobytes())
+        self.files['indices'].write(np.asarray(X.indices, dtype=np.int32).tobytes())
+        self.files['indptr'].write((self.nnz + np.asarray(X.indptr[1:], dtype=np.int64)).tobytes())
+        if label is not None:
+            self.files['label'].write(np.asarray(label, dtype=np.float32).tobytes())
+        self.n_rows += X.shape[0]
+        self.nnz += X.nnz
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        meta = {'shape': [self.n_rows, self.n_cols], 'nnz': self.nnz, 'has_label': bool(self.has_label)}
+        with open(os.path.join(self.directory, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def __enter__(self) -> "SparseWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _memmap(directory: str, name: str, length: int) -> np.ndarray:
+    filename, dtype = ARRAYS[name]
+    if length == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(os.path.join(directory, filename), dtype=dtype, mode='r', shape=(length,))
+
+
+def open_csr(directory: str) -> Tuple[sparse.csr_matrix, Optional[np.ndarray]]:
+    """(matrix, labels or None) backed by read-only memory maps of the store's files"""
+    with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    n_rows, n_cols = meta['shape']
+    matrix = sparse.csr_matrix((_memmap(directory, 'data', meta['nnz']), _memmap(directory, 'indices', meta['nnz']),
+                                _memmap(directory, 'indptr', n_rows + 1)), shape=(n_rows, n_cols), copy=False)
+    return matrix, _memmap(directory, 'label', n_rows) if meta['has_label'] else None
@@ -0,0 +1,71 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+import llm_client
+
+DELTAS = ["Order ", "the transformer ", "first."]
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    """OpenAI-style streaming chat completions; any path ending in /error answers 500"""
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests_seen.append({'path': self.path, 'headers': dict(self.headers), 'json': body})
+        if self.path.endswith('/error'):
+            self.send_response(500)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{"error": {"message": "overloaded"}}')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        events = [': keep-alive', json.dumps({'choices': [{'delta': {'role': 'assistant'}}]})]
+        events += [json.dumps({'choices': [{'delta': {'content': delta}}]}) for delta in DELTAS]
+        for event in events + ['[DONE]', json.dumps({'choices': [{'delta': {'content': 'after done'}}]})]:
+            line = event if event.startswith(':') else f"data: {event}"
+            self.wfile.write(f"{line}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    MockChatHandler.requests_seen = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield base, monkeypatch
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_chat_completion_yields_deltas_until_done(mock_server):
+    base, monkeypatch = mock_server
+    monkeypatch.setattr(llm_client, 'GROQ_API_URL', f"{base}/v1/chat/completions")
+
+    deltas = list(llm_client.stream_chat_completion("test-key", "What should I order first?", max_tokens=64))
+
+    assert deltas == DELTAS
+    request = MockChatHandler.requests_seen[0]
+    assert request['headers']['Authorization'] == "Bearer test-key"
+    assert request['json']['stream'] is True
+    assert request['json']['max_tokens'] == 64
+    assert request['json']['messages'] == [{'role': 'user', 'content': "What should I order first?"}]
+
+
+def test_stream_chat_completion_raises_on_http_error(mock_server):
+    base, monkeypatch = mock_server
+    monkeypatch.setattr(llm_client, 'GROQ_API_URL', f"{base}/v1/chat/completions/error")
+
+    with pytest.raises(requests.HTTPError):
+        list(llm_client.stream_chat_completion("test-key", "prompt"))
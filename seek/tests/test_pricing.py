@@ -0,0 +1,27 @@
+import pytest
+from pricing import normalize_price, parse_price
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('₹ 1,250.50/Bag', 1250.5),
+    ('₹ 0.75 / Piece', 0.75),
+    ('₹ 400 - 500', 450.0),
+    ('₹ 400 to ₹ 600', 500.0),
+    ('₹ 2.5 Lakh/Piece', 250000.0),
+    ('Rs 3 Lacs', 300000.0),
+    ('₹ 1.2 Crore / Unit', 12000000.0),
+    ('₹ 2 Cr', 20000000.0),
+    ('₹ 1 - 1.5 Lakh', 125000.0),
+    ('₹ 45 / Crate', 45.0),
+    ('Ask Price', None),
+    (None, None),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == (None if expected is None else pytest.approx(expected))
+
+
+def test_normalize_price_scales_before_dividing_by_unit_size():
+    price = normalize_price({'price_text': '₹ 1.1 Lakh/Tonne', 'price_unit': 'Tonne'})
+    assert price['canonical_unit'] == 'kg'
+    assert price['price_value'] == pytest.approx(110000.0)
+    assert price['unit_price'] == pytest.approx(110.0)
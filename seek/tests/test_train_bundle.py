@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("lightgbm")
+import model_bundle
+import score
+import train
+
+
+def invoices(n_per_class: int = 40, seed: int = 0) -> "pd.DataFrame":
+    """Three MasterItemNos: one with descriptions unique to it, two sharing descriptions told apart by UOM and price"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_per_class):
+        rows.append({'ItemDescription': 'copper power cable roll', 'MasterItemNo': 11111.0, 'UOM': 'rl',
+                     'UnitPrice': 900 + rng.normal(0, 20), 'QtyShipped': 4})
+        rows.append({'ItemDescription': f'steel stud 20ga lot {i % 4}', 'MasterItemNo': 22222.0, 'UOM': 'ea',
+                     'UnitPrice': 5 + rng.normal(0, 0.5), 'QtyShipped': 200})
+        rows.append({'ItemDescription': f'steel stud 20ga lot {i % 4}', 'MasterItemNo': 33333.0, 'UOM': 'bx',
+                     'UnitPrice': 400 + rng.normal(0, 10), 'QtyShipped': 3})
+    df = pd.DataFrame(rows)
+    df['ExtendedQuantity'] = df['QtyShipped']
+    df['ExtendedPrice'] = df['UnitPrice'] * df['QtyShipped']
+    df['invoiceTotal'] = df['ExtendedPrice'] * 10
+    df['invoiceDate'] = '2024-03-01'
+    df['PROJECT_CITY'] = 'mumbai'
+    df.insert(0, 'id', range(len(df)))
+    return df
+
+
+def test_train_save_load_score_round_trip(tmp_path):
+    data = tmp_path / 'invoices.csv'
+    invoices().to_csv(data, index=False)
+    params = {**train.LGB_PARAMS, 'n_estimators': 20}
+
+    # No validation rows: early stopping is off, so the models keep all 20 rounds
+    artifacts, manifest = train.train(str(data), str(tmp_path / 'work'), 1, 0.0, 0.2, 42, params, chunk_rows=50)
+    model_bundle.save_bundle(artifacts, manifest, str(tmp_path / 'models'))
+    loaded, loaded_manifest = model_bundle.load_bundle(models_dir=str(tmp_path / 'models'))
+
+    assert loaded_manifest['version'] == manifest['version']
+    assert loaded_manifest['data']['rows'] == 120
+    assert 'copper power cable roll' in loaded['det_items'].index
+
+    batch = invoices(n_per_class=5, seed=1)
+    scored = score.score_chunk(loaded, batch)
+
+    assert list(scored.columns) == score.OUTPUT_COLUMNS
+    assert len(scored) == len(batch)
+    assert list(scored['id']) == list(batch['id'])
+    assert set(scored['prediction_method']) == {'deterministic', 'classification_model'}
+    copper = scored[batch['ItemDescription'].to_numpy() == 'copper power cable roll']
+    assert (copper['prediction_method'] == 'deterministic').all()
+    assert (copper['MasterItemNo'] == '11111').all()
+    assert scored['MasterItemNo'].isin(['11111', '22222', '33333']).all()
+    assert (scored['QtyShipped'] >= 1).all()
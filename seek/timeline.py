@@ -0,0 +1,214 @@
+"""Procurement timeline by backward scheduling from lead-time tables, no LLM involved.
+
+Every material belongs to a class: the first estimation.TRADES trade its name mentions
+(steel, electrical, hvac, ...), or its data.json catalog category when it mentions none.
+The lead-time table holds, per class, a lead time and the P25/P50/P75 number of days
+after CONSTRUCTION_START_DATE that the class was first invoiced across the historical
+projects in clean_train_full.csv.
+
+Planning a material works backwards from the date it is needed on site: the start of
+its installation task in the construction schedule, or otherwise the construction start
+plus its class's median first-invoice offset. Order-by = need date - lead time - buffer,
+with the schedule.BUFFER_DAYS buffer the construction schedule also leaves; slack =
+order-by - plan date. Materials with no slack are on the critical path: ordering them
+any later delays the schedule day for day.
+
+Rebuild the table after the invoices or the catalog change (from the seek/ directory):
+    python timeline.py --invoices clean_train_full.csv --catalog data.json
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Any, List
+import pandas as pd
+import schedule
+from estimation import TRADES, catalog_materials, trades
+
+LEAD_TIMES_CSV = 'lead_times.csv'
+
+# Lead time in weeks per material class; schedule.LEAD_WEEKS keywords (transformer, chiller, ...) take precedence
+TRADE_LEAD_WEEKS = {
+    'steel': 6, 'concrete': 2, 'drywall': 3, 'insulation': 4, 'glazing': 12, 'flooring': 4, 'finishes': 2,
+    'electrical': 16, 'cabling': 8, 'security': 8, 'hvac': 20, 'fire': 10, 'sealing': 2, 'doors': 6,
+}
+CATEGORY_LEAD_WEEKS = {
+    'Structural_Materials': 6, 'Envelope_Materials': 10, 'Interior_Materials': 4, 'Specialized_Components': 20,
+}
+
+OFFSET_QUANTILES = {'p25': 0.25, 'p50': 0.5, 'p75': 0.75}
+
+
+def load_invoice_offsets(invoices_csv: str) -> pd.DataFrame:
+    """One row per (project, item description) invoice line with its days after construction start"""
+    columns = ['PROJECTNUMBER', 'ItemDescription', 'invoiceDate', 'CONSTRUCTION_START_DATE']
+    df = pd.read_csv(invoices_csv, usecols=columns).dropna()
+    invoiced = pd.to_datetime(df['invoiceDate'], errors='coerce')
+    started = pd.to_datetime(df['CONSTRUCTION_START_DATE'], errors='coerce')
+    df['offset_days'] = (invoiced.dt.normalize() - started.dt.normalize()).dt.days
+    return df.dropna(subset=['offset_days'])
+
+
+def catalog_classes(catalog: Dict[str, Any]) -> Dict[str, str]:
+    """Material class -> the data.json category its catalog materials most often fall under"""
+    votes: Dict[str, Counter] = {}
+    for facility in catalog:
+        for category, name in catalog_materials(catalog, facility):
+            for cls in trades(name) or [category]:
+                votes.setdefault(cls, Counter())[category] += 1
+    return {cls: counts.most_common(1)[0][0] for cls, counts in votes.items()}
+
+
+def build_lead_times(invoices_csv: str = 'clean_train_full.csv', catalog: Dict[str, Any] = None) -> pd.DataFrame:
+    """One row per material class: category, lead time and first-invoice offset quantiles"""
+    classes = catalog_classes(catalog or {})
+    for trade in TRADES:
+        classes.setdefault(trade, '')
+    for category in CATEGORY_LEAD_WEEKS:
+        classes.setdefault(category, category)
+
+    df = load_invoice_offsets(invoices_csv)
+    item_classes = {d: sorted(trades(d)) for d in df['ItemDescription'].unique()}
+    df = df.assign(cls=df['ItemDescription'].map(item_classes)).explode('cls').dropna(subset=['cls'])
+    # First delivery of each class on each project, then its spread across projects
+    first = df.groupby(['cls', 'PROJECTNUMBER'])['offset_days'].min()
+    offsets = pd.DataFrame({f"offset_{name}": first.groupby(level='cls').quantile(q) for name, q in OFFSET_QUANTILES.items()})
+    offsets['n_projects'] = first.groupby(level='cls').size()
+
+    # Category rows cover materials that mention no trade; their offsets pool every class in the category
+    table = pd.DataFrame({'cls': list(classes), 'category': list(classes.values())}).set_index('cls').join(offsets)
+    for category in CATEGORY_LEAD_WEEKS:
+        members = [cls for cls, cat in classes.items() if cat == category and cls in offsets.index]
+        if members and pd.isna(table.at[category, 'offset_p50']):
+            pooled = first[first.index.get_level_values('cls').isin(members)]
+            for name, q in OFFSET_QUANTILES.items():
+                table.at[category, f"offset_{name}"] = pooled.quantile(q)
+            table.at[category, 'n_projects'] = pooled.index.get_level_values('PROJECTNUMBER').nunique()
+    table['lead_weeks'] = [TRADE_LEAD_WEEKS.get(cls, CATEGORY_LEAD_WEEKS.get(category, schedule.DEFAULT_LEAD_WEEKS))
+                           for cls, category in zip(table.index, table['category'])]
+    table['n_projects'] = table['n_projects'].fillna(0).astype(int)
+    return table.reset_index()
+
+
+class TimelineEngine:
+    """Backward-schedules procurement from the lead-time table.
+
+    The table is held as dicts of per-class values, so planning a project is a handful of
+    date subtractions per material: milliseconds for any realistic material list.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        rows = table.set_index('cls')
+        self.category = rows['category'].fillna('').to_dict()
+        self.lead = rows['lead_weeks'].astype(int).to_dict()
+        self.offset = rows['offset_p50'].dropna().to_dict()
+        default = table['offset_p50'].median()
+        self.default_offset = float(default) if not pd.isna(default) else float(schedule.MEP_START_DAY)
+
+    @classmethod
+    def load(cls, catalog: Dict[str, Any], path: str = LEAD_TIMES_CSV, invoices_csv: str = 'clean_train_full.csv') -> "TimelineEngine":
+        """Read the lead-time table, rebuilding it when missing or older than the invoices"""
+        if os.path.exists(path) and (not os.path.exists(invoices_csv) or os.path.getmtime(path) >= os.path.getmtime(invoices_csv)):
+            table = pd.read_csv(path)
+        else:
+            table = build_lead_times(invoices_csv, catalog)
+            table.to_csv(path, index=False)
+        return cls(table)
+
+    def material_class(self, material: str, category: str = '') -> str:
+        material_trades = trades(material)
+        for trade in TRADES:
+            if trade in material_trades and trade in self.lead:
+                return trade
+        return category if category in self.lead else ''
+
+    def lead_weeks(self, material: str, cls: str) -> int:
+        weeks = schedule.keyword_lead_weeks(material)
+        if weeks is not None:
+            return weeks
+        return int(self.lead.get(cls, schedule.DEFAULT_LEAD_WEEKS))
+
+    def plan(self, materials: List[Dict[str, Any]], start: date = None, today: date = None,
+             tasks: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """One timeline row per material, most urgent first.
+
+        tasks is a construction schedule (see schedule.py); a material's installation task in
+        it fixes its need date, otherwise the class's historical first-invoice offset does.
+        start is the construction start (schedule.project_start() when None); pass the one the
+        schedule was built from so need dates and slack share the same calendar.
+        """
+        start = schedule.project_start(start)
+        today = today or date.today()
+        installs = {}
+        for task in tasks or []:
+            if task['kind'] == 'installation':
+                key = (task.get('material') or task['task']).lower()
+                installs[key] = min(installs.get(key, task['start']), task['start'])
+
+        rows = []
+        for mat in materials:
+            name = mat['Material/Equipment']
+            cls = self.material_class(name, mat.get('category', ''))
+            weeks = self.lead_weeks(name, cls)
+            scheduled = installs.get(name.lower()) or next((d for key, d in installs.items() if name.lower() in key), None)
+            if scheduled:
+                need, basis = schedule.parse_date(scheduled), 'schedule'
+            else:
+                need, basis = start + timedelta(days=max(0, round(self.offset.get(cls, self.default_offset)))), 'invoice history'
+            order_by = need - timedelta(weeks=weeks, days=schedule.BUFFER_DAYS)
+            slack = (order_by - today).days
+            rows.append({
+                'material': name,
+                'class': cls or 'unclassified',
+                'category': self.category.get(cls) or mat.get('category') or 'Other',
+                'lead_weeks': weeks,
+                'order_by': order_by.isoformat(),
+                'delivery': (order_by + timedelta(weeks=weeks)).isoformat(),
+                'need_by': need.isoformat(),
+                'need_basis': basis,
+                'slack_days': slack,
+                'critical': slack <= 0,
+                'projected_delay_days': max(0, -slack)
+            })
+        return sorted(rows, key=lambda r: (r['slack_days'], r['material']))
+
+
+def to_markdown(rows: List[Dict[str, Any]]) -> str:
+    """The timeline as one Markdown table per category, critical items flagged"""
+    categories: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        categories.setdefault(row['category'].replace('_', ' '), []).append(row)
+    lines = []
+    for i, (category, items) in enumerate(sorted(categories.items()), 1):
+        lines += [f"**{i}. {category}**", "", "| Item | Lead Time | Order By | Delivery | Need By | Slack | Notes |",
+                  "|------|-----------|----------|----------|---------|-------|-------|"]
+        for r in items:
+            notes = f"CRITICAL: {r['projected_delay_days']} days late" if r['critical'] else f"Class {r['class']}"
+            lines.append(f"| {r['material']} | {r['lead_weeks']} weeks | {r['order_by']} | {r['delivery']} | "
+                         f"{r['need_by']} ({r['need_basis']}) | {r['slack_days']} days | {notes} |")
+        lines.append("")
+    critical = [r['material'] for r in rows if r['critical']]
+    if critical:
+        lines.append(f"Critical path: {', '.join(critical)} must be ordered now to hold the schedule.")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Build the per-class lead-time table from the catalog and invoice history")
+    parser.add_argument('--invoices', default='clean_train_full.csv')
+    parser.add_argument('--catalog', default='data.json')
+    parser.add_argument('--out', default=LEAD_TIMES_CSV)
+    args = parser.parse_args(argv)
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    table = build_lead_times(args.invoices, catalog)
+    table.to_csv(args.out, index=False)
+    print(f"Wrote lead times for {len(table)} material classes to {args.out} "
+          f"({int((table['n_projects'] > 0).sum())} seeded from invoice history)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Lightweight nested spans for finding where a request's time goes.
+
+    with tracing.span("rag.search", k=k) as s:
+        ...
+        s.set_attribute("results", len(results))
+
+    @tracing.traced("ml.predict")
+    def run_ml_prediction(...): ...
+
+Spans nest through a contextvar, so concurrent requests and pipeline threads each
+build their own tree. When a root span ends its whole trace is handed to the
+exporters (structured log lines and/or OpenTelemetry-compatible OTLP JSON) and kept
+in `recent` for the UI.
+
+Tracing is off unless SEEK_TRACING=1 (or enable() is called); disabled, span()
+returns a shared no-op and traced() functions call straight through.
+SEEK_TRACE_FILE=<path> appends one OTLP JSON document per trace to that file, and
+SEEK_TRACE_LOG=1 logs one JSON line per span to the 'seek.tracing' logger.
+"""
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+SERVICE_NAME = "seek"
+RECENT_TRACES = 50
+
+logger = logging.getLogger('seek.tracing')
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class _NoopSpan:
+    """What span() returns while tracing is disabled"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_enabled = os.getenv('SEEK_TRACING', '').lower() in ('1', 'true', 'yes')
+_current: ContextVar[Optional[Span]] = ContextVar('seek_current_span', default=None)
+_exporters: List[Callable[[List[Span]], None]] = []
+_span_listeners: List[Callable[[Span], None]] = []
+recent: "deque[List[Span]]" = deque(maxlen=RECENT_TRACES)
+
+
+def _start(name: str, attributes: Dict[str, Any], parent: Optional[Span]) -> Span:
+    trace = parent.trace if parent is not None else Trace()
+    return Span(name, trace, parent.span_id if parent is not None else None, attributes)
+
+
+def _finish(span: Span, error: Optional[BaseException] = None):
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    span.trace.add(span)
+    for listener in _span_listeners:
+        listener(span)
+    if span.parent_id is None:
+        spans = sorted(span.trace.spans, key=lambda s: s.start_ns)
+        recent.append(spans)
+        for exporter in list(_exporters):
+            try:
+                exporter(spans)
+            except Exception as e:
+                logger.warning("Trace exporter %r failed: %s", exporter, e)
+
+
+class _SpanScope:
+    __slots__ = ('name', 'attributes', 'span', 'token')
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = _start(self.name, self.attributes, _current.get())
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self.token)
+        _finish(self.span, exc)
+        return False
+
+
+def span(name: str, **attributes):
+    """Context manager timing a block as a child of the current span (or as a new trace)"""
+    if not _enabled:
+        return NOOP_SPAN
+    return _SpanScope(name, attributes)
+
+
+def traced(name: str = None):
+    """Decorator: run every call of the function inside a span"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _SpanScope(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_iter(name: str, iterable: Iterable[Any], **attributes) -> Iterator[Any]:
+    """Span from the first to the last item of a stream, parented where the stream was created.
+
+    Unlike span(), this never touches the current-span contextvar, so the stream can be
+    consumed from another thread or interleaved with other work.
+    """
+    if not _enabled:
+        return iter(iterable)
+    parent = _current.get()
+
+    def generate():
+        current = _start(name, attributes, parent)
+        items = 0
+        try:
+            for item in iterable:
+                items += 1
+                yield item
+        except BaseException as e:
+            current.set_attribute('items', items)
+            _finish(current, e)
+            raise
+        current.set_attribute('items', items)
+        _finish(current)
+    return generate()
+
+
+def current_span():
+    """The innermost open span, or a no-op when there is none"""
+    return (_current.get() if _enabled else None) or NOOP_SPAN
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(*exporters: Callable[[List[Span]], None]):
+    global _enabled
+    _enabled = True
+    for exporter in exporters:
+        if exporter not in _exporters:
+            _exporters.append(exporter)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def add_exporter(exporter: Callable[[List[Span]], None]):
+    if exporter not in _exporters:
+        _exporters.append(exporter)
+
+
+def add_span_listener(listener: Callable[[Span], None]):
+    """Call listener(span) as each span finishes, before its trace is complete"""
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/JSON (ExportTraceServiceRequest) for one trace; any OpenTelemetry collector accepts it"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'seek.tracing'},
+                'spans': [{
+                    'traceId': s.trace.trace_id,
+                    'spanId': s.span_id,
+                    'parentSpanId': s.parent_id or '',
+                    'name': s.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(s.start_ns),
+                    'endTimeUnixNano': str(s.end_ns),
+                    'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in s.attributes.items()],
+                    'status': {'code': 2, 'message': s.error} if s.error else {'code': 1}
+                } for s in spans]
+            }]
+        }]
+    }
+
+
+def log_exporter(spans: List[Span]):
+    """One structured JSON log line per span"""
+    for s in spans:
+        logger.info(json.dumps(s.to_dict(), default=str))
+
+
+class OtlpFileExporter:
+    """Appends one OTLP JSON document per trace to a file (JSON lines)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, spans: List[Span]):
+        line = json.dumps(to_otlp(spans), default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+def waterfall(spans: List[Span]) -> List[Dict[str, Any]]:
+    """Rows for a waterfall chart: each span's depth, offset from the trace start and duration in ms"""
+    if not spans:
+        return []
+    depth = {}
+    by_id = {s.span_id: s for s in spans}
+    for s in sorted(spans, key=lambda s: s.start_ns):
+        depth[s.span_id] = depth.get(s.parent_id, -1) + 1 if s.parent_id in by_id else 0
+    origin = min(s.start_ns for s in spans)
+    return [{
+        'span': s.name,
+        'depth': depth[s.span_id],
+        'start_ms': (s.start_ns - origin) / 1e6,
+        'duration_ms': s.duration_ms,
+        'error': s.error,
+        'attributes': s.attributes
+    } for s in sorted(spans, key=lambda s: s.start_ns)]
+
+
+if os.getenv('SEEK_TRACE_FILE'):
+    add_exporter(OtlpFileExporter(os.environ['SEEK_TRACE_FILE']))
+if os.getenv('SEEK_TRACE_LOG', '').lower() in ('1', 'true', 'yes'):
+    add_exporter(log_exporter)
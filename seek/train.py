@@ -0,0 +1,274 @@
+"""Train the MasterItemNo classifier and QtyShipped regressor into a versioned model bundle.
+
+Replaces the external notebook: features come from features.Featurizer fitted on the
+training invoices, the deterministic mapping (descriptions that always map to one
+MasterItemNo) is rebuilt from the same rows, and both LightGBM models train on all
+cores. Everything is written as one bundle plus a manifest recording the data hash,
+parameters, test-split metrics and feature schema (see model_bundle.py).
+
+Training runs out of core, so it scales with disk rather than RAM. The CSV is streamed
+twice in chunks. The first pass fits the featurizer and counts labels. The second
+featurizes each chunk and appends it to memory-mapped sparse stores (sparse_store.py),
+one per model and split. Each training store becomes a LightGBM Dataset binary that
+lgb.train loads directly, so memory holds LightGBM's binned features, never the CSV
+or the float matrix.
+
+Usage (from the seek/ directory):
+    python train.py --data clean_train_full.csv --n-jobs 8
+    python train.py --data invoices.csv --chunk-rows 200000 --work-dir /scratch/seek-train
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import features
+import model_bundle
+import sparse_store
+from features import Featurizer, FeaturizerFit
+from model_bundle import BoosterModel
+
+TARGET_CLASS = 'MasterItemNo'
+TARGET_QTY = 'QtyShipped'
+
+# Classes with fewer training rows than this are left to the deterministic mapping
+MIN_CLASS_ROWS = 5
+
+LGB_PARAMS = {'n_estimators': 400, 'learning_rate': 0.05, 'num_leaves': 63, 'min_child_samples': 10,
+              'subsample': 0.8, 'subsample_freq': 1, 'colsample_bytree': 0.8, 'verbose': -1}
+# Hundreds of classes with a dozen rows each: with LGB_PARAMS the Newton steps of rare classes
+# blow up and the validation loss is lowest after one round. Smaller, regularized trees with
+# capped leaf steps train for ~100 rounds instead.
+CLASSIFIER_PARAMS = {'learning_rate': 0.1, 'num_leaves': 15, 'min_child_samples': 20, 'max_delta_step': 1.0, 'reg_lambda': 1.0}
+EARLY_STOPPING_ROUNDS = 30
+# A model early-stopped before this many rounds is effectively untrained; train.py refuses to save it
+MIN_BOOSTING_ROUNDS = 10
+
+# One store per model and split under the work directory; see write_stores(). 'valid' drives
+# early stopping, 'test' is never seen during training and gives the reported metrics
+SPLITS = ('train', 'valid', 'test')
+STORES = tuple(f"{model}_{split}" for model in ('class', 'reg') for split in SPLITS)
+DATASET_FILE = 'train.bin'
+PREDICT_CHUNK_ROWS = 100000
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def master_item_labels(values: pd.Series) -> pd.Series:
+    """'58211.0' / 58211.0 -> '58211'; missing stays NaN"""
+    numbers = pd.to_numeric(values, errors='coerce')
+    return numbers.map(lambda v: str(int(v)) if not np.isnan(v) else np.nan)
+
+
+def deterministic_mapping(descriptions: pd.Series, labels: pd.Series) -> pd.Series:
+    """Cleaned description -> MasterItemNo, for descriptions only ever invoiced as one item"""
+    pairs = pd.DataFrame({'description': descriptions, 'label': labels}).dropna()
+    counts = pairs.groupby('description')['label'].nunique()
+    unique = pairs[pairs['description'].isin(counts.index[counts == 1])]
+    return unique.groupby('description')['label'].first()
+
+
+def scan(data: str, chunk_rows: int) -> Tuple[Featurizer, pd.Series, pd.Series, int]:
+    """First pass: fitted featurizer, rows per MasterItemNo, deterministic mapping and row count"""
+    fitter = FeaturizerFit()
+    label_counts = pd.Series(dtype=float)
+    pairs = []
+    n_rows = 0
+    for chunk in features.read_chunks(data, chunk_rows):
+        fitter.update(chunk)
+        labels = master_item_labels(chunk[TARGET_CLASS])
+        label_counts = label_counts.add(labels.value_counts(), fill_value=0)
+        pairs.append(pd.DataFrame({'description': features.clean_text(chunk['ItemDescription']), 'label': labels}).dropna().drop_duplicates())
+        n_rows += len(chunk)
+    pairs = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    return fitter.result(), label_counts, deterministic_mapping(pairs['description'], pairs['label']), n_rows
+
+
+def write_stores(data: str, chunk_rows: int, featurizer: Featurizer, encoder, work_dir: str,
+                 valid_fraction: float, test_fraction: float, seed: int, n_jobs: int) -> Dict[str, str]:
+    """Second pass: featurize each chunk and append its rows to the store of their model and split"""
+    rng = np.random.default_rng(seed)
+    stores = {name: os.path.join(work_dir, name) for name in STORES}
+    writers = {name: sparse_store.SparseWriter(path, featurizer.n_features) for name, path in stores.items()}
+    try:
+        for chunk in features.read_chunks(data, chunk_rows):
+            X = featurizer.transform(chunk, n_jobs=n_jobs)
+            draw = rng.random(len(chunk))
+            valid = draw < valid_fraction
+            test = (draw >= valid_fraction) & (draw < valid_fraction + test_fraction)
+            splits = {'train': ~(valid | test), 'valid': valid, 'test': test}
+            labels = master_item_labels(chunk[TARGET_CLASS])
+            # Classes too rare for the classifier are left to the deterministic mapping
+            known = labels.isin(encoder.classes_).to_numpy()
+            y_class = np.full(len(chunk), -1.0)
+            y_class[known] = encoder.transform(labels[known])
+            quantity = pd.to_numeric(chunk[TARGET_QTY], errors='coerce').to_numpy(dtype=float)
+            for model, rows, y in (('class', known, y_class), ('reg', ~np.isnan(quantity), quantity)):
+                for split, mask in splits.items():
+                    picked = np.flatnonzero(rows & mask)
+                    writers[f"{model}_{split}"].append(X[picked], y[picked])
+    finally:
+        for writer in writers.values():
+            writer.close()
+    print("Feature stores: " + ", ".join(f"{name} {writer.n_rows} rows" for name, writer in writers.items()))
+    return stores
+
+
+def dataset_binary(store: str) -> str:
+    """Convert a training store into a LightGBM Dataset binary; lgb.train then bins nothing in RAM"""
+    import lightgbm as lgb
+    path = os.path.join(store, DATASET_FILE)
+    X, y = sparse_store.open_csr(store)
+    lgb.Dataset(X, label=y, params={'verbose': -1}).save_binary(path)
+    return path
+
+
+def predict_chunks(model, X, rows: int = PREDICT_CHUNK_ROWS) -> np.ndarray:
+    return np.concatenate([model.predict(X[i:i + rows]) for i in range(0, X.shape[0], rows)])
+
+
+def train_model(stores: Dict[str, str], model: str, objective: str, params: Dict[str, Any], seed: int, n_jobs: int,
+                **extra) -> Tuple[BoosterModel, int]:
+    """Booster trained from the model's Dataset binary, early-stopped on its memory-mapped validation store;
+    returns it with the number of rows it was trained and early-stopped on"""
+    import lightgbm as lgb
+    params = dict(params)
+    rounds = params.pop('n_estimators')
+    train_set = lgb.Dataset(dataset_binary(stores[f"{model}_train"]), params={'verbose': -1})
+    X_valid, y_valid = sparse_store.open_csr(stores[f"{model}_valid"])
+    valid_sets, callbacks = [], []
+    if X_valid.shape[0]:
+        valid_sets = [lgb.Dataset(X_valid, label=y_valid, reference=train_set)]
+        callbacks = [lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+    booster = lgb.train({**params, 'objective': objective, 'seed': seed, 'num_threads': n_jobs, **extra},
+                        train_set, num_boost_round=rounds, valid_sets=valid_sets, callbacks=callbacks)
+    best_iteration = booster.best_iteration or rounds
+    if best_iteration < min(MIN_BOOSTING_ROUNDS, rounds):
+        raise RuntimeError(f"The {model} model early-stopped after {best_iteration} round(s) (minimum {MIN_BOOSTING_ROUNDS}): "
+                           f"its validation loss got worse from the start; adjust the parameters instead of saving it")
+    return BoosterModel(booster, objective), train_set.num_data() + X_valid.shape[0]
+
+
+def train_classifier(stores: Dict[str, str], encoder, params: Dict[str, Any], seed: int, n_jobs: int):
+    model, rows = train_model(stores, 'class', 'multiclass', {**params, **CLASSIFIER_PARAMS}, seed, n_jobs,
+                              num_class=len(encoder.classes_))
+    # Scored on the test store, which neither training nor early stopping has seen
+    X_test, y_test = sparse_store.open_csr(stores['class_test'])
+    accuracy = float((predict_chunks(model, X_test) == y_test).mean()) if X_test.shape[0] else None
+    return model, {'rows': int(rows), 'test_rows': int(X_test.shape[0]), 'classes': int(len(encoder.classes_)),
+                   'test_accuracy': accuracy, 'best_iteration': int(model.best_iteration_ or params['n_estimators'])}
+
+
+def train_regressor(stores: Dict[str, str], params: Dict[str, Any], seed: int, n_jobs: int):
+    model, rows = train_model(stores, 'reg', 'regression', params, seed, n_jobs)
+    X_test, y_test = sparse_store.open_csr(stores['reg_test'])
+    mae = float(np.abs(predict_chunks(model, X_test) - y_test).mean()) if X_test.shape[0] else None
+    return model, {'rows': int(rows), 'test_rows': int(X_test.shape[0]), 'test_mae': mae,
+                   'best_iteration': int(model.best_iteration_ or params['n_estimators'])}
+
+
+def train(data: str, work_dir: str, n_jobs: int, valid_fraction: float, test_fraction: float, seed: int, params: Dict[str, Any],
+          chunk_rows: int = features.CSV_CHUNK_ROWS) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    from sklearn.preprocessing import LabelEncoder
+    timings = {}
+    start = time.perf_counter()
+    featurizer, label_counts, det_items, n_rows = scan(data, chunk_rows)
+    encoder = LabelEncoder().fit(label_counts.index[label_counts >= MIN_CLASS_ROWS])
+    timings['scan'] = time.perf_counter() - start
+    print(f"Scanned {n_rows} rows: {featurizer.n_features} feature columns, {len(encoder.classes_)} classes "
+          f"in {timings['scan']:.1f}s")
+
+    start = time.perf_counter()
+    stores = write_stores(data, chunk_rows, featurizer, encoder, work_dir, valid_fraction, test_fraction, seed, n_jobs)
+    timings['featurize'] = time.perf_counter() - start
+    print(f"Featurized into {work_dir} in {timings['featurize']:.1f}s")
+
+    start = time.perf_counter()
+    classifier, classifier_metrics = train_classifier(stores, encoder, params, seed, n_jobs)
+    timings['classifier'] = time.perf_counter() - start
+    print(f"Classifier: {classifier_metrics} in {timings['classifier']:.1f}s")
+
+    start = time.perf_counter()
+    regressor, regressor_metrics = train_regressor(stores, params, seed, n_jobs)
+    timings['regressor'] = time.perf_counter() - start
+    print(f"Regressor: {regressor_metrics} in {timings['regressor']:.1f}s")
+
+    # Fail here rather than at load time if a model saw a different column count
+    featurizer.schema.validate_model(classifier, 'lgb_classifier')
+    featurizer.schema.validate_model(regressor, 'lgb_regressor')
+    
+    data_hash = file_sha256(data)
+    artifacts = {
+        'featurizer': featurizer,
+        'det_items': det_items,
+        'lgb_classifier': classifier,
+        'label_encoder': encoder,
+        'lgb_regressor': regressor
+    }
+    manifest = {
+        'version': f"{datetime.now():%Y%m%d-%H%M%S}-{data_hash[:8]}",
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'code_commit': git_commit(),
+        'data': {'path': os.path.abspath(data), 'sha256': data_hash, 'rows': n_rows},
+        'params': {'lgb': params, 'lgb_classifier': CLASSIFIER_PARAMS, 'min_boosting_rounds': MIN_BOOSTING_ROUNDS,
+                   'min_class_rows': MIN_CLASS_ROWS, 'valid_fraction': valid_fraction,
+                   'test_fraction': test_fraction, 'seed': seed,
+                   'chunk_rows': chunk_rows,
+                   'tfidf': {k: str(v) for k, v in features.TFIDF_PARAMS.items()}},
+        'metrics': {'classifier': classifier_metrics, 'regressor': regressor_metrics,
+                    'deterministic_descriptions': int(len(det_items))},
+        'feature_schema': featurizer.schema.to_dict(),
+        'seconds': {name: round(seconds, 2) for name, seconds in timings.items()}
+    }
+    return artifacts, manifest
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Train the MasterItemNo classifier and QtyShipped regressor into a model bundle")
+    parser.add_argument('--data', default='clean_train_full.csv', help="Training invoices CSV")
+    parser.add_argument('--models-dir', default=model_bundle.MODELS_DIR)
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1, help="Cores for featurization and LightGBM")
+    parser.add_argument('--valid-fraction', type=float, default=0.1, help="Rows held out for early stopping")
+    parser.add_argument('--test-fraction', type=float, default=0.1, help="Rows held out for the reported metrics")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-estimators', type=int, default=LGB_PARAMS['n_estimators'])
+    parser.add_argument('--chunk-rows', type=int, default=features.CSV_CHUNK_ROWS, help="CSV rows read and featurized at a time")
+    parser.add_argument('--work-dir', help="Keep the feature stores and Dataset binaries here (default: a temporary "
+                                           "directory under --models-dir, removed after training)")
+    parser.add_argument('--no-latest', action='store_true', help="Write the bundle without making it the served one")
+    args = parser.parse_args(argv)
+
+    params = {**LGB_PARAMS, 'n_estimators': args.n_estimators}
+    os.makedirs(args.models_dir, exist_ok=True)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='.train-', dir=args.models_dir)
+    try:
+        artifacts, manifest = train(args.data, work_dir, args.n_jobs, args.valid_fraction, args.test_fraction, args.seed,
+                                    params, args.chunk_rows)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    path = model_bundle.save_bundle(artifacts, manifest, args.models_dir, make_latest=not args.no_latest)
+    print(f"Wrote bundle {manifest['version']} to {path}" + ("" if args.no_latest else " (now LATEST)"))
+
+
+if __name__ == "__main__":
+    main()
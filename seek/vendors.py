@@ -0,0 +1,146 @@
+import os
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
+import numpy as np
+
+
+def _clean(value) -> str:
+    value = str(value or '').strip()
+    return '' if value.upper() in ('N/A', 'NOT AVAILABLE') else value
+
+
+def vendor_key(metadata: Dict[str, Any]) -> str:
+    """Identify a vendor by seller name + GST number, falling back to website, then product URL"""
+    seller_info = metadata.get('seller_info', {}) or {}
+    company_info = metadata.get('company_info', {}) or {}
+    name = _clean(seller_info.get('seller_name')).lower()
+    gst = _clean(seller_info.get('gst_number') or company_info.get('gst')).upper()
+    if name or gst:
+        return f"{name}|{gst}"
+    website = _clean(seller_info.get('website'))
+    if website:
+        return urlparse(website).netloc.lower() or website
+    return metadata.get('url', '') or metadata.get('title', '')
+
+
+def vendor_name(metadata: Dict[str, Any]) -> str:
+    seller_info = metadata.get('seller_info', {}) or {}
+    name = _clean(seller_info.get('seller_name'))
+    if name:
+        return name
+    website = _clean(seller_info.get('website'))
+    if website:
+        return urlparse(website).netloc.replace('www.', '') or website
+    return 'N/A'
+
+
+def overall_rating(metadata: Dict[str, Any]) -> Optional[float]:
+    """Overall rating from reviews, falling back to the seller box rating"""
+    values = [review.get('value') for review in metadata.get('reviews', []) or [] if review.get('type') == 'overall_rating']
+    values.append((metadata.get('seller_info', {}) or {}).get('rating'))
+    for value in values:
+        try:
+            return float(str(value).strip())
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def vendor_record(metadata: Dict[str, Any], distance: float = None) -> Dict[str, Any]:
+    """Structured vendor fields for one product listing, straight from scraped metadata"""
+    seller_info = metadata.get('seller_info', {}) or {}
+    company_info = metadata.get('company_info', {}) or {}
+    return {
+        'vendor_key': vendor_key(metadata),
+        'company': vendor_name(metadata),
+        'address': _clean(seller_info.get('full_address')) or _clean(company_info.get('full_address')) or 'N/A',
+        'gst': _clean(seller_info.get('gst_number') or company_info.get('gst')) or 'N/A',
+        'gst_registration_date': _clean(company_info.get('gst_registration_date')) or 'N/A',
+        'rating': overall_rating(metadata),
+        'contact': _clean(seller_info.get('contact_person')) or 'N/A',
+        'price': metadata.get('price') or 'N/A',
+        'price_unit': metadata.get('price_unit') or '',
+        'product': metadata.get('title', ''),
+        'url': metadata.get('url', ''),
+        'distance': distance
+    }
+
+
+def format_vendor_record(record: Dict[str, Any]) -> str:
+    rating = record['rating'] if record['rating'] is not None else 'N/A'
+    price_info = f"{record['price']} {record['price_unit']}".strip()
+    return (f"Company: {record['company']}, Address: {record['address']}, GST: {record['gst']}, "
+            f"Rating: {rating}, Contact: {record['contact']}, Price Info: {price_info}")
+
+
+def category_from_filename(path: str) -> str:
+    """`json/ht_switch_gear_links.json` -> `ht_switch_gear`"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'_links$', '', stem)
+
+
+class VendorIndex:
+    """One vector per vendor (seller name + GST), built from that vendor's product embeddings.
+
+    Supplier queries search this instead of the product index, so a single prolific
+    seller takes one slot in the top-k instead of all of them.
+    """
+
+    def __init__(self, vendors: List[Dict[str, Any]], vectors: np.ndarray):
+        import faiss
+        self.vendors = vendors
+        self.index = faiss.IndexFlatIP(vectors.shape[1])
+        if len(vendors):
+            self.index.add(vectors)
+
+    def __len__(self) -> int:
+        return len(self.vendors)
+
+    @classmethod
+    def build(cls, metadata: List[Dict[str, Any]], embeddings: np.ndarray) -> "VendorIndex":
+        normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        groups: Dict[str, List[int]] = {}
+        for product_id, meta in enumerate(metadata):
+            groups.setdefault(vendor_key(meta), []).append(product_id)
+
+        vendors = []
+        vectors = np.zeros((len(groups), embeddings.shape[1]), dtype='float32')
+        for i, (key, product_ids) in enumerate(groups.items()):
+            vector = normalized[product_ids].mean(axis=0)
+            vectors[i] = vector / max(np.linalg.norm(vector), 1e-12)
+
+            first = vendor_record(metadata[product_ids[0]])
+            prices = [metadata[pid]['price_value'] for pid in product_ids if metadata[pid].get('price_value') is not None]
+            ratings = [r for r in (overall_rating(metadata[pid]) for pid in product_ids) if r is not None]
+            locations = Counter(_clean((metadata[pid].get('seller_info', {}) or {}).get('location')) for pid in product_ids)
+            locations.pop('', None)
+            vendors.append({
+                'vendor_key': key,
+                'company': first['company'],
+                'gst': first['gst'],
+                'address': first['address'],
+                'location': locations.most_common(1)[0][0] if locations else 'N/A',
+                'rating': max(ratings) if ratings else None,
+                'product_ids': product_ids,
+                'product_count': len(product_ids),
+                'category_counts': dict(Counter(metadata[pid].get('category', 'general') for pid in product_ids)),
+                'min_price': min(prices) if prices else None,
+                'median_price': float(np.median(prices)) if prices else None
+            })
+        return cls(vendors, vectors)
+
+    def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        if not self.vendors:
+            return []
+        query = np.array(query_embedding, dtype='float32').reshape(1, -1)
+        query = query / max(np.linalg.norm(query), 1e-12)
+        scores, indices = self.index.search(query, min(k, len(self.vendors)))
+        return [(self.vendors[i], float(score)) for i, score in zip(indices[0], scores[0]) if i >= 0]
+
+    def best_product(self, vendor: Dict[str, Any], embeddings: np.ndarray, query_embedding: np.ndarray) -> int:
+        """The vendor's product closest to the query"""
+        product_ids = vendor['product_ids']
+        scores = embeddings[product_ids] @ np.array(query_embedding, dtype='float32').reshape(-1)
+        return product_ids[int(np.argmax(scores))]